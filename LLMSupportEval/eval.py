@@ -1,6 +1,38 @@
-# Install if needed: pip install evaluate datasets transformers torch sentencepiece
-import evaluate
-from datasets import Dataset
+# Install if needed: pip install datasets transformers torch sentencepiece
+#
+# Usage:
+#   python eval.py                                   # Score the built-in sample pairs
+#   python eval.py --input transcripts.jsonl --output scores.jsonl [--batch-size 64]
+#   python eval.py --no-bertscore                    # Skip BERTScore (no torch/transformers import)
+#   python eval.py --input transcripts.jsonl --metric-workers 8   # BLEU/ROUGE processes
+#   python eval.py --input transcripts.jsonl --batch-api   # Judge via the Message Batches API (half price)
+#
+# Batch mode streams rows from JSONL or Parquet ({"prediction": ..., "reference": ...};
+# reference may be a string or a list of strings), scores them batch by batch with
+# datasets.map(batched=True), and writes one JSON line of scores per row as it goes,
+# so memory stays flat regardless of input size.
+#
+# BLEU, ROUGE-1/2/L and BERTScore come from one engine (llmkit.metrics): each
+# batch is tokenized once, per-row and corpus scores are computed together,
+# and BLEU/ROUGE run vectorized across --metric-workers processes.
+#
+# With --batch-api the judge prompts go through the Message Batches API instead:
+# the metrics are written first, then all judge requests are submitted, polled
+# and merged back into the output by row. Progress is kept in <output>.batch.json;
+# rerunning the same command after a crash resumes from it without resubmitting.
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root, for llmkit
+from llmkit.batches import POLL_INTERVAL, BatchRun
+from llmkit.client import make_client, print_cache_stats, print_scheduler_stats
+from llmkit.metrics import MetricsEngine, as_reference_list
+from llmkit.similarity import make_scorer
+from llmkit.telemetry import in_context, traced, tracer
 
 # Sample data: LLM predictions vs. human references (list of strings)
 predictions = [
@@ -12,51 +44,220 @@ references = [
     ["The authentication error is due to missing video access permissions on your API key. Navigate to Settings > API Keys in your dashboard, select the appropriate key, and enable the 'Video API' permission. Allow approximately 5 minutes for the permission changes to propagate through our system before retrying your request."]
 ]
 
-# Wrap in Dataset for batching (optional but efficient)
-dataset = Dataset.from_dict({"predictions": predictions, "references": references})
-
-# Load metrics
-bleu = evaluate.load("bleu")
-rouge = evaluate.load("rouge")
-bertscore = evaluate.load("bertscore")
-
-# Compute scores
-bleu_score = bleu.compute(predictions=predictions, references=references)
-rouge_score = rouge.compute(predictions=predictions, references=references)
-bertscore_results = bertscore.compute(predictions=predictions, references=references, lang="en")
-
-# Print results
-print("\n=== Evaluation Results ===\n")
-print(f"Overall BLEU Score: {bleu_score['bleu']:.4f}")
-print(f"Overall ROUGE-1: {rouge_score['rouge1']:.4f}")
-print(f"Overall ROUGE-2: {rouge_score['rouge2']:.4f}")
-print(f"Overall ROUGE-L: {rouge_score['rougeL']:.4f}")
-print(f"Overall BERTScore F1 (avg): {sum(bertscore_results['f1'])/len(bertscore_results['f1']):.4f}")
-
-print("\n=== Individual Scores ===\n")
-for i, (pred, ref) in enumerate(zip(predictions, references)):
-    print(f"Example {i+1}:")
-    print(f"  BERTScore F1: {bertscore_results['f1'][i]:.4f}")
-    print()
-
-# For LLM-as-judge (using Claude)
-import anthropic
-client = anthropic.Anthropic(api_key="")
-
-def llm_judge(llm_output, human_ref, prompt="Rate tech support helpfullness  from 1-10. Reply with only the number."):
-    response = client.messages.create(
+def make_metrics(use_bertscore=True, workers=1):
+    """BLEU/ROUGE engine; BERTScore's model (torch/transformers) is only loaded when it first scores."""
+    return MetricsEngine(workers=workers, scorer=make_scorer() if use_bertscore else None)
+
+# For LLM-as-judge (using Claude, with on-disk response cache)
+client = make_client()
+
+JUDGE_PROMPT = "Rate tech support helpfullness  from 1-10. Reply with only the number."
+
+def judge_request(llm_output, human_ref, prompt=JUDGE_PROMPT):
+    """Messages API parameters for one judge call (shared by direct calls and --batch-api)."""
+    return dict(
         model="claude-3-5-haiku-20241022",
         max_tokens=1024,
         messages=[{"role": "user", "content": f"{prompt}\nLLM: {llm_output}\nHuman: {human_ref}"}]
     )
-    import re
-    text = response.content[0].text.strip()
+
+def parse_judge_score(text):
     match = re.search(r'\d+\.?\d*', text)
-    score = float(match.group()) if match else 0.0
-    return score
-
-# Example
-print("\n=== LLM Judge ===\n")
-for i, (pred, ref) in enumerate(zip(predictions, references)):
-    judge_score = llm_judge(pred, ref[0])
-    print(f"Example {i+1} - LLM Judge Score: {judge_score}/10")
\ No newline at end of file
+    return float(match.group()) if match else 0.0
+
+def llm_judge(llm_output, human_ref, prompt=JUDGE_PROMPT):
+    response = client.messages.create(**judge_request(llm_output, human_ref, prompt))
+    return parse_judge_score(response.content[0].text.strip())
+
+def run_sample(use_bertscore=True, metric_workers=1):
+    """Score the hardcoded sample pairs and print corpus + per-example results."""
+    # Compute scores: per example and corpus in one pass
+    metrics = make_metrics(use_bertscore, metric_workers)
+    scores = metrics.score(predictions, references)
+    corpus = metrics.corpus()
+
+    # Print results
+    print("\n=== Evaluation Results ===\n")
+    print(f"Overall BLEU Score: {corpus['bleu']:.4f}")
+    print(f"Overall ROUGE-1: {corpus['rouge1']:.4f}")
+    print(f"Overall ROUGE-2: {corpus['rouge2']:.4f}")
+    print(f"Overall ROUGE-L: {corpus['rougeL']:.4f}")
+    if use_bertscore:
+        print(f"Overall BERTScore F1 (avg): {corpus['bertscore_f1']:.4f}")
+
+    print("\n=== Individual Scores ===\n")
+    for i in range(len(predictions)):
+        print(f"Example {i+1}:")
+        print(f"  BLEU: {scores['bleu'][i]:.4f}")
+        print(f"  ROUGE-1 / ROUGE-2 / ROUGE-L: {scores['rouge1'][i]:.4f} / {scores['rouge2'][i]:.4f} / "
+              f"{scores['rougeL'][i]:.4f}")
+        if use_bertscore:
+            print(f"  BERTScore F1: {scores['bertscore_f1'][i]:.4f}")
+        print()
+    print(metrics.report())
+    metrics.close()
+
+    # Example
+    print("\n=== LLM Judge ===\n")
+    for i, (pred, ref) in enumerate(zip(predictions, references)):
+        judge_score = llm_judge(pred, ref[0])
+        print(f"Example {i+1} - LLM Judge Score: {judge_score}/10")
+
+# Batch mode: stream a dataset, score per batch, write per-row scores incrementally
+def make_batch_scorer(prediction_field, reference_field, metrics, judge_pool=None):
+    """Build the datasets.map(batched=True) function that scores one batch."""
+    @traced("batch")
+    def score_batch(batch):
+        preds = batch[prediction_field]
+        refs = [as_reference_list(r) for r in batch[reference_field]]
+
+        scores = metrics.score(preds, refs)
+        if judge_pool is not None:
+            # Judge calls for the whole batch are in flight at once
+            scores['llm_judge'] = list(judge_pool.map(in_context(llm_judge), preds, [r[0] for r in refs]))
+        return scores
+    return score_batch
+
+def score_rows(dataset, output_path, metric_names, batch_size, metrics, judge_pool,
+               prediction_field, reference_field):
+    """Write one JSON line of scores per row; returns (rows, totals)."""
+    totals = dict.fromkeys(metric_names, 0.0)
+    rows = 0
+    scored = dataset.map(
+        make_batch_scorer(prediction_field, reference_field, metrics, judge_pool),
+        batched=True,
+        batch_size=batch_size,
+    )
+    with open(output_path, "w") as out:
+        for row in scored:
+            record = {'row': rows}
+            record.update({name: row[name] for name in metric_names})
+            out.write(json.dumps(record) + "\n")
+            for name in metric_names:
+                totals[name] += row[name]
+            rows += 1
+            if rows % batch_size == 0:
+                out.flush()
+                print(f"Scored {rows} rows...", flush=True)
+    return rows, totals
+
+def judge_with_batches(batch_run, dataset, output_path, prediction_field="prediction", reference_field="reference",
+                       judge_workers=8):
+    """
+    Judge every row through the Message Batches API and merge the scores into
+    `output_path` by row. Rows whose batch request failed are judged directly.
+    Returns the sum of the judge scores.
+    """
+    def requests():
+        for i, row in enumerate(dataset):
+            reference = as_reference_list(row[reference_field])[0]
+            yield {'custom_id': f"row-{i}", 'params': judge_request(row[prediction_field], reference)}
+
+    if batch_run.resumed:
+        print(f"Resuming from {batch_run.state_path} ({batch_run.state['submitted']} requests already submitted)")
+    batch_run.submit(requests())
+    batch_run.wait()
+
+    scores, failed = {}, []
+    for custom_id, result in batch_run.results():
+        row = int(custom_id.split("-", 1)[1])
+        if result.type == "succeeded":
+            scores[row] = parse_judge_score(result.message.content[0].text.strip())
+        else:
+            failed.append(row)
+
+    if failed:
+        print(f"{len(failed)} batch requests did not succeed; judging them directly...")
+        wanted = set(failed)
+        retry_rows = [(i, row) for i, row in enumerate(dataset) if i in wanted]
+        with ThreadPoolExecutor(max_workers=judge_workers) as pool:
+            retried = pool.map(in_context(llm_judge), [row[prediction_field] for _, row in retry_rows],
+                               [as_reference_list(row[reference_field])[0] for _, row in retry_rows])
+            scores.update(zip([i for i, _ in retry_rows], retried))
+
+    # Rewrite the metrics file with the judge column; the replace is atomic
+    tmp_path = output_path + ".tmp"
+    with open(output_path) as src, open(tmp_path, "w") as out:
+        for line in src:
+            record = json.loads(line)
+            record['llm_judge'] = scores.get(record['row'], 0.0)
+            out.write(json.dumps(record) + "\n")
+    os.replace(tmp_path, output_path)
+    return sum(scores.values())
+
+def run_batch(input_path, output_path, batch_size=64, judge_workers=8, use_judge=True, use_bertscore=True,
+              prediction_field="prediction", reference_field="reference", batch_api=False,
+              poll_interval=POLL_INTERVAL, metric_workers=1):
+    """Stream `input_path` (JSONL or Parquet) through the metrics and write per-row scores to `output_path`."""
+    from datasets import load_dataset
+
+    data_format = "parquet" if input_path.endswith((".parquet", ".pq")) else "json"
+    dataset = load_dataset(data_format, data_files=input_path, split="train", streaming=True)
+
+    metrics = make_metrics(use_bertscore, metric_workers)
+    metric_names = metrics.metric_names
+
+    if use_judge and batch_api:
+        # Metrics first, then the judge column from the batch; progress survives a crash
+        batch_run = BatchRun(client, output_path + ".batch.json", poll_interval=poll_interval)
+        if not batch_run.state.get('metrics_done'):
+            rows, totals = score_rows(dataset, output_path, metric_names, batch_size, metrics, None,
+                                      prediction_field, reference_field)
+            batch_run.state.update(metrics_done=True, rows=rows, totals=totals, corpus=metrics.corpus())
+            batch_run.save()
+        rows, totals, corpus = batch_run.state['rows'], batch_run.state['totals'], batch_run.state.get('corpus', {})
+        totals['llm_judge'] = judge_with_batches(batch_run, dataset, output_path, prediction_field, reference_field,
+                                                 judge_workers)
+        metric_names.append('llm_judge')
+        batch_run.cleanup()
+    else:
+        metric_names += ['llm_judge'] if use_judge else []
+        judge_pool = ThreadPoolExecutor(max_workers=judge_workers) if use_judge else None
+        try:
+            rows, totals = score_rows(dataset, output_path, metric_names, batch_size, metrics, judge_pool,
+                                      prediction_field, reference_field)
+        finally:
+            if judge_pool is not None:
+                judge_pool.shutdown()
+        corpus = metrics.corpus()
+    metrics.close()
+
+    print(f"\n=== Batch Evaluation Results ({rows} rows) ===\n")
+    for name in metric_names:
+        print(f"Mean {name}: {totals[name] / rows if rows else 0.0:.4f}")
+    if corpus:
+        print(f"Corpus BLEU: {corpus['bleu']:.4f}")
+    if metrics.examples:
+        print(metrics.report())
+    print(f"\nPer-row scores written to {output_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score LLM support answers against human references.")
+    parser.add_argument("--input", help="JSONL or Parquet file of predictions/references (omit to run the sample)")
+    parser.add_argument("--output", default="scores.jsonl", help="Where to write per-row scores (JSONL)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Rows per datasets.map batch")
+    parser.add_argument("--judge-workers", type=int, default=8, help="Concurrent LLM judge calls")
+    parser.add_argument("--no-judge", action="store_true", help="Skip the LLM judge")
+    parser.add_argument("--no-bertscore", action="store_true", help="Skip BERTScore (no torch/transformers import)")
+    parser.add_argument("--metric-workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes that share each batch's BLEU/ROUGE (1 = score in this process)")
+    parser.add_argument("--prediction-field", default="prediction")
+    parser.add_argument("--reference-field", default="reference")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Judge through the Message Batches API (half price, results within 24h; resumable)")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL,
+                        help="Seconds between batch status checks")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.input:
+        run_batch(args.input, args.output, batch_size=args.batch_size, judge_workers=args.judge_workers,
+                  use_judge=not args.no_judge, use_bertscore=not args.no_bertscore, prediction_field=args.prediction_field,
+                  reference_field=args.reference_field, batch_api=args.batch_api, poll_interval=args.poll_interval,
+                  metric_workers=args.metric_workers)
+    else:
+        run_sample(use_bertscore=not args.no_bertscore, metric_workers=args.metric_workers)
+    print_cache_stats(client)
+    print_scheduler_stats(client)
+    print(tracer.report())
@@ -1,61 +1,104 @@
+import argparse
 import os
-import anthropic
-import evaluate
-from datasets import Dataset
-import random
 from dotenv import load_dotenv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root, for llmkit
+from llmkit.checkpoint import checkpointed, checkpoints
+from llmkit.client import make_client, print_cache_stats, print_scheduler_stats
+from llmkit.dedup import dedup_index, deduplicated
+from llmkit.halving import halving_stats, successive_halving
+from llmkit.similarity import BACKENDS, make_scorer, score_async
+from llmkit.streaming import stream_stats, stream_text
+from llmkit.structured import criteria_schema, parse_stats, structured_call
+from llmkit.telemetry import span, traced, tracer
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Initialize Anthropic client (with on-disk response cache)
+client = make_client()
 
-# Load BERTScore for supplementary eval (semantic similarity to reference)
-bertscore = evaluate.load("bertscore")
+# BERTScore for supplementary eval (semantic similarity to reference).
+# Loaded once on first use (torch/transformers are only imported then);
+# reference embeddings and scores are cached. Skipped with --no-bertscore.
+# --scorer embedding (or SIMILARITY_SCORER) swaps in a faster sentence-embedding
+# cosine with the same interface (llmkit.similarity).
+bertscore = make_scorer()
 
 # Step 1: Define the task (e.g., generate a product description; reference is human-written)
 task_prompt = "Generate a engaging 50-word description for a wireless earbuds product."
 reference_output = "I like Bose earbuds"
 
+# Generation: stream (reports time-to-first-token) and optionally stop past a word budget
+STREAMING = True
+WORD_BUDGET = None  # e.g. 60 for the 50-word task; None = let the model finish
+
+# Successive halving: rank variants by BERTScore (cheap, local) and only
+# send the top HALVING_KEEP fraction - at most JUDGE_BUDGET - to the judge.
+# Needs BERTScore; 1.0 / None judges every variant.
+HALVING_KEEP = 1.0
+JUDGE_BUDGET = None
+
 # Initial prompt (to optimize)
 initial_prompt = task_prompt  # Start simple; we'll refine it
 
 # Step 2: LLM-as-Judge with CoT (scores on relevance, fluency, similarity to ref: 1-10 scale)
+@traced("judge.cot")
+@deduplicated("judge.cot")
+@checkpointed("judge.cot")
 def llm_judge_with_cot(generated_output, reference, criteria="relevance, fluency, similarity"):
-    cot_prompt = f"""
+    criteria_names = [c.strip().replace(" ", "_") for c in criteria.split(",")]
+    # The rubric is the same for every candidate, so it goes in the system block
+    cot_rubric = f"""
     You are an expert evaluator. Use Chain of Thought: Step 1: Read the generated output and reference.
     Step 2: Assess on {criteria} (1-10 scale each).
-    Step 3: Compute average score.
-    Step 4: Output ONLY the final average score as a number (e.g., 8.5).
-
-    Reference: {reference}
-    Generated: {generated_output}
+    Step 3: Record your reasoning and each score with the submit_scores tool.
     """
-    response = client.messages.create(
+    # Structured output: typed per-criterion scores, strict parsing, retries only on parse failure
+    verdict = structured_call(
+        client,
+        tool_name="submit_scores",
+        description="Record the step-by-step assessment and one score per criterion.",
+        schema=criteria_schema(criteria_names),
         model="claude-3-5-haiku-20241022",  # Using Claude 3.5 Haiku
         max_tokens=1024,
-        messages=[{"role": "user", "content": cot_prompt}],
+        system=cot_rubric.strip(),  # ~70 tokens: far below the caching minimum, so no cache_control
+        messages=[{"role": "user", "content": f"Reference: {reference}\nGenerated: {generated_output}"}],
         temperature=0.1
     )
-    try:
-        score = float(response.content[0].text.strip())
-        return score
-    except ValueError:
-        return 0.0  # Fallback on parse error
+    return sum(verdict[name] for name in criteria_names) / len(criteria_names)
 
 # Step 3: Generate output from a prompt
-def generate_output(prompt, model="claude-3-5-haiku-20241022"):
-    response = client.messages.create(
+@traced("generate")
+@deduplicated("generate")
+@checkpointed("generate")
+def generate_output(prompt, model="claude-3-5-haiku-20241022", priority="explore"):
+    # priority: "final" for the prompt being kept, "explore" for candidate variants
+    request = dict(
         model=model,
         max_tokens=1024,
         messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
+        temperature=0.7,
+        priority=priority
     )
+    if STREAMING:
+        return stream_text(client, word_budget=WORD_BUDGET, **request)['text']
+    response = client.messages.create(**request)
     return response.content[0].text.strip()
 
+@checkpointed("refine.reason")
+def suggest_variants(reason_prompt):
+    reason_response = client.messages.create(
+        model="claude-3-5-haiku-20241022",
+        max_tokens=1024,
+        messages=[{"role": "user", "content": reason_prompt}],
+        temperature=0.5
+    )
+    return reason_response.content[0].text.strip()
+
 # Step 4: ReAct-like Agent for Refinement (Reason + Act)
-def react_refine_prompt(current_prompt, current_output, reference, num_variants=3):
+@traced("refine")
+def react_refine_prompt(current_prompt, current_output, reference, num_variants=3, use_bertscore=True):
     # Reason (CoT): Analyze why it's not great
     reason_prompt = f"""
     Current Prompt: {current_prompt}
@@ -66,62 +109,109 @@ def react_refine_prompt(current_prompt, current_output, reference, num_variants=
     Action: Suggest {num_variants} refined prompt variants (shorter, more specific).
     Output ONLY the list of variants, numbered 1-{num_variants}.
     """
-    reason_response = client.messages.create(
-        model="claude-3-5-haiku-20241022",
-        max_tokens=1024,
-        messages=[{"role": "user", "content": reason_prompt}],
-        temperature=0.5
-    )
-    variants_text = reason_response.content[0].text.strip()
+    variants_text = suggest_variants(reason_prompt)
     variants = [v.strip() for v in variants_text.split('\n') if v.strip().startswith(tuple(f"{i}." for i in range(1, num_variants+1)))]
 
-    # Act: Generate & evaluate variants
-    variant_scores = []
-    for i, variant in enumerate(variants[:num_variants], 1):
-        new_output = generate_output(variant)
-        judge_score = llm_judge_with_cot(new_output, reference)
-        bert_score = bertscore.compute(predictions=[new_output], references=[reference], lang='en')['f1'][0]
-        combined_score = (judge_score + bert_score * 10) / 2  # Normalize BERT (0-1) to 0-10
-        variant_scores.append((variant, new_output, combined_score))
-        print(f"Variant {i} Score: {combined_score:.2f}")
+    variants = variants[:num_variants]
+    if use_bertscore and len(variants) > 1 and (HALVING_KEEP < 1.0 or JUDGE_BUDGET is not None):
+        variant_scores = evaluate_variants_halving(variants, reference)
+    else:
+        variant_scores = evaluate_variants(variants, reference, use_bertscore)
 
     # Re-rank: Sort by score, pick top
     best_variant = max(variant_scores, key=lambda x: x[2])
     return best_variant[0], best_variant[1], best_variant[2]  # New prompt, output, score
 
+def evaluate_variants(variants, reference, use_bertscore=True):
+    """Generate and judge every variant; returns [(variant, output, combined_score)]."""
+    # Act: Generate every variant, then judge them while BERTScore runs in the background
+    outputs = []
+    for i, variant in enumerate(variants, 1):
+        with span("variant", index=i):
+            outputs.append(generate_output(variant))
+    bert_future = score_async(bertscore, outputs, reference) if use_bertscore else None  # One batched pass
+    judge_scores = [llm_judge_with_cot(output, reference) for output in outputs]
+    bert_f1s = bert_future.result()['f1'] if use_bertscore else [None] * len(variants)
+
+    variant_scores = []
+    for i, (variant, new_output, judge_score, bert_score) in enumerate(zip(variants, outputs, judge_scores, bert_f1s), 1):
+        if bert_score is None:
+            combined_score = judge_score  # Judge-only run
+        else:
+            combined_score = (judge_score + bert_score * 10) / 2  # Normalize BERT (0-1) to 0-10
+        variant_scores.append((variant, new_output, combined_score))
+        print(f"Variant {i} Score: {combined_score:.2f}")
+    return variant_scores
+
+def evaluate_variants_halving(variants, reference):
+    """Generate every variant, BERTScore all outputs, then judge only the best (llmkit.halving)."""
+    outputs = []
+    for i, variant in enumerate(variants, 1):
+        with span("variant", index=i):
+            outputs.append(generate_output(variant))
+    bert_f1s = bertscore.score(outputs, reference)['f1']  # One batched pass
+
+    def judge_stage(indices):
+        return [llm_judge_with_cot(outputs[i], reference) for i in indices]
+
+    judged, scores = successive_halving(range(len(variants)),
+                                        [("bertscore", lambda indices: [bert_f1s[i] for i in indices], 0),
+                                         ("judge", judge_stage, 1)],
+                                        keep=HALVING_KEEP, budget=JUDGE_BUDGET)
+    variant_scores = []
+    for i in range(len(variants)):
+        if i not in judged:
+            print(f"Variant {i + 1} BERTScore F1: {bert_f1s[i]:.4f} (cut before judging)")
+            continue
+        combined_score = (scores[i]['judge'] + bert_f1s[i] * 10) / 2  # Normalize BERT (0-1) to 0-10
+        variant_scores.append((variants[i], outputs[i], combined_score))
+        print(f"Variant {i + 1} Score: {combined_score:.2f}")
+    return variant_scores
+
 # Step 5: Iterative Loop (Run for N iterations)
-def optimization_loop(initial_prompt, reference, max_iterations=3):
+def optimization_loop(initial_prompt, reference, max_iterations=3, use_bertscore=True):
     current_prompt = initial_prompt
     best_score = 0
     history = []
 
     for iteration in range(max_iterations):
-        print(f"\n--- Iteration {iteration + 1} ---")
-        current_output = generate_output(current_prompt)
-        initial_judge_score = llm_judge_with_cot(current_output, reference)
+        with span("iteration", index=iteration + 1):
+            print(f"\n--- Iteration {iteration + 1} ---")
+            current_output = generate_output(current_prompt, priority="final")
+            initial_judge_score = llm_judge_with_cot(current_output, reference)
         
-        # ReAct refinement
-        new_prompt, new_output, new_score = react_refine_prompt(current_prompt, current_output, reference)
+            # ReAct refinement
+            new_prompt, new_output, new_score = react_refine_prompt(current_prompt, current_output, reference,
+                                                                    use_bertscore=use_bertscore)
         
-        history.append({
-            'iteration': iteration + 1,
-            'prompt': current_prompt,
-            'output': current_output,
-            'score': initial_judge_score
-        })
-        print(history)
-        if new_score > best_score:
-            current_prompt = new_prompt
-            best_score = new_score
-            print(f"Improved! New best score: {best_score:.2f}")
-        else:
-            print("No improvement; stopping early.")
-            break
+            history.append({
+                'iteration': iteration + 1,
+                'prompt': current_prompt,
+                'output': current_output,
+                'score': initial_judge_score
+            })
+            print(history)
+            if new_score > best_score:
+                current_prompt = new_prompt
+                best_score = new_score
+                print(f"Improved! New best score: {best_score:.2f}")
+            else:
+                print("No improvement; stopping early.")
+                break
 
     # Final best
-    final_output = generate_output(current_prompt)
+    final_output = generate_output(current_prompt, priority="final")
+    bert_future = score_async(bertscore, [final_output], reference) if use_bertscore else None
     final_judge_score = llm_judge_with_cot(final_output, reference)
-    final_bert_score = bertscore.compute(predictions=[final_output], references=[reference], lang='en')
+    if use_bertscore:
+        final_bert_score = bert_future.result()
+        bert_precision = final_bert_score['precision'][0]
+        bert_recall = final_bert_score['recall'][0]
+        bert_f1 = final_bert_score['f1'][0]
+        combined_score = (final_judge_score + bert_f1 * 10) / 2
+    else:
+        bert_precision = bert_recall = bert_f1 = None
+        combined_score = final_judge_score
 
     print(f"\n{'='*60}")
     print(f"FINAL RESULTS")
@@ -133,19 +223,69 @@ def optimization_loop(initial_prompt, reference, max_iterations=3):
     print(f"EVALUATION METRICS")
     print(f"{'='*60}")
     print(f"LLM Judge Score (CoT):     {final_judge_score:.2f}/10")
-    print(f"BERTScore Precision:       {final_bert_score['precision'][0]:.4f}")
-    print(f"BERTScore Recall:          {final_bert_score['recall'][0]:.4f}")
-    print(f"BERTScore F1:              {final_bert_score['f1'][0]:.4f}")
-    print(f"Combined Score:            {(final_judge_score + final_bert_score['f1'][0] * 10) / 2:.2f}/10")
+    if use_bertscore:
+        print(f"BERTScore Precision:       {bert_precision:.4f}")
+        print(f"BERTScore Recall:          {bert_recall:.4f}")
+        print(f"BERTScore F1:              {bert_f1:.4f}")
+    else:
+        print(f"BERTScore:                 skipped (--no-bertscore)")
+    print(f"Combined Score:            {combined_score:.2f}/10")
     print(f"{'='*60}\n")
+    print_cache_stats(client)
+    print_scheduler_stats(client)
+    if STREAMING:
+        print(stream_stats.report())
+    print(parse_stats.report())
+    print(tracer.report())
+    if use_bertscore and hasattr(bertscore, "report"):
+        print(bertscore.report())
+    if halving_stats.runs:
+        print(halving_stats.report())
+    if dedup_index.active:
+        print(dedup_index.report())
+    if checkpoints.active:
+        print(checkpoints.report())
 
     return history, final_output, {
         'judge_score': final_judge_score,
-        'bert_precision': final_bert_score['precision'][0],
-        'bert_recall': final_bert_score['recall'][0],
-        'bert_f1': final_bert_score['f1'][0],
-        'combined_score': (final_judge_score + final_bert_score['f1'][0] * 10) / 2
+        'bert_precision': bert_precision,
+        'bert_recall': bert_recall,
+        'bert_f1': bert_f1,
+        'combined_score': combined_score
     }
 
 # Run the loop
-history, final_output, metrics = optimization_loop(initial_prompt, reference_output)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize a prompt with an LLM judge (+ BERTScore).")
+    parser.add_argument("--no-bertscore", action="store_true",
+                        help="Judge-only run: skip BERTScore and never import torch/transformers")
+    parser.add_argument("--scorer", choices=BACKENDS,
+                        help="Similarity backend (default: SIMILARITY_SCORER, else bertscore)")
+    parser.add_argument("--no-stream", action="store_true", help="Generate with blocking messages.create calls")
+    parser.add_argument("--word-budget", type=int, default=WORD_BUDGET,
+                        help="Stop each streamed generation once it passes this many words")
+    parser.add_argument("--halving-keep", type=float, default=HALVING_KEEP,
+                        help="Judge only this fraction of each round's variants, best BERTScore first")
+    parser.add_argument("--judge-budget", type=int, default=JUDGE_BUDGET,
+                        help="Judge at most this many variants per round (best BERTScore first)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Reuse earlier results (this run or past runs) for near-duplicate prompts and outputs")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="--dedup: cosine similarity that counts as a duplicate (default depends on the embedder)")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a crashed run: replay its recorded steps, then make the missing calls")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not record this run's steps")
+    args = parser.parse_args()
+    STREAMING = not args.no_stream
+    bertscore = make_scorer(args.scorer)
+    WORD_BUDGET = args.word_budget
+    params = {'initial_prompt': initial_prompt, 'reference': reference_output, 'use_bertscore': not args.no_bertscore,
+              'halving_keep': args.halving_keep, 'judge_budget': args.judge_budget}
+    if args.dedup:
+        dedup_index.open(threshold=args.dedup_threshold)
+    if not args.no_checkpoint:
+        params = checkpoints.open(resume=args.resume, params=params)  # A resumed run keeps its own settings
+    HALVING_KEEP = params.get('halving_keep', HALVING_KEEP)
+    JUDGE_BUDGET = params.get('judge_budget', JUDGE_BUDGET)
+    history, final_output, metrics = optimization_loop(params['initial_prompt'], params['reference'],
+                                                       use_bertscore=params['use_bertscore'])
\ No newline at end of file
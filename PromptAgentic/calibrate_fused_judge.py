@@ -0,0 +1,117 @@
+"""
+Calibration report: fused dual judge vs. separate Minto/Feynman judges.
+
+Scores every fixture (prompt, output) pair both ways and reports, per judge:
+  - mean absolute difference and mean bias (fused - separate)
+  - Pearson correlation of the scores
+  - Spearman rank correlation (does the fused judge order outputs the same way?)
+and the number of judge requests each mode needed.
+
+Usage:
+    python calibrate_fused_judge.py [--fixtures fixtures/judge_calibration.jsonl] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import simpePrompt as sp
+
+
+def pearson(xs, ys):
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    return cov / (var_x * var_y) ** 0.5 if var_x and var_y else float("nan")
+
+
+def ranks(values):
+    """Average ranks (ties share the mean rank)."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    result = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            result[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return result
+
+
+def spearman(xs, ys):
+    return pearson(ranks(xs), ranks(ys))
+
+
+def score_fixture(fixture):
+    output, prompt = fixture['output'], fixture['prompt']
+    separate_minto, _ = sp.minto_judge_output(output, prompt)
+    separate_feynman, _ = sp.feynman_judge_output(output, prompt)
+    (fused_minto, _), (fused_feynman, _) = sp.dual_judge_output(output, prompt)
+    return {
+        'id': fixture['id'],
+        'separate': {'minto': separate_minto, 'feynman': separate_feynman},
+        'fused': {'minto': fused_minto, 'feynman': fused_feynman},
+    }
+
+
+def compare(rows, judge):
+    separate = [row['separate'][judge] for row in rows]
+    fused = [row['fused'][judge] for row in rows]
+    diffs = [f - s for f, s in zip(fused, separate)]
+    return {
+        'mean_abs_diff': sum(abs(d) for d in diffs) / len(diffs),
+        'mean_bias': sum(diffs) / len(diffs),
+        'pearson': pearson(separate, fused),
+        'spearman': spearman(separate, fused),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fused vs. separate judge scores on a fixture set.")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           "fixtures", "judge_calibration.jsonl"))
+    parser.add_argument("--output", help="Optional path for the JSON report")
+    parser.add_argument("--workers", type=int, default=sp.MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        rows = list(pool.map(score_fixture, fixtures))
+
+    report = {
+        'fixtures': len(rows),
+        'requests': {'separate': 2 * len(rows), 'fused': len(rows)},
+        'minto': compare(rows, 'minto'),
+        'feynman': compare(rows, 'feynman'),
+        'rows': rows,
+    }
+
+    print(f"\n{'='*70}")
+    print(f"FUSED vs SEPARATE JUDGE CALIBRATION ({len(rows)} fixtures)")
+    print(f"{'='*70}")
+    print(f"{'Fixture':<22}{'Minto sep':>10}{'Minto fus':>10}{'Feyn sep':>10}{'Feyn fus':>10}")
+    for row in rows:
+        print(f"{row['id']:<22}{row['separate']['minto']:>10.2f}{row['fused']['minto']:>10.2f}"
+              f"{row['separate']['feynman']:>10.2f}{row['fused']['feynman']:>10.2f}")
+    for judge in ('minto', 'feynman'):
+        stats = report[judge]
+        print(f"\n{judge.capitalize()}: |diff| {stats['mean_abs_diff']:.2f} | bias {stats['mean_bias']:+.2f} | "
+              f"pearson {stats['pearson']:.3f} | spearman {stats['spearman']:.3f}")
+    print(f"\nJudge requests: separate {report['requests']['separate']} | fused {report['requests']['fused']}")
+    print(sp.parse_stats.report())
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,32 @@
+import argparse
+import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from crewai import Agent, Task, Crew, Process
-from anthropic import Anthropic
-import evaluate
-from typing import List, Dict
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root, for llmkit
+from llmkit.client import make_client, print_cache_stats, print_scheduler_stats
+from llmkit.similarity import BACKENDS, make_scorer, score_async
+from llmkit.structured import criteria_schema, parse_stats, structured_call
+from llmkit.telemetry import in_context, span, tracer
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize Anthropic client for our custom tools
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Initialize Anthropic client for our custom tools (with on-disk response cache)
+client = make_client()
 
 # Set a dummy OpenAI key for CrewAI (won't be used since we provide custom tools)
 # This prevents the "openai_api_key" error
 os.environ["OPENAI_API_KEY"] = "sk-dummy-key-not-used"
 
-# Load BERTScore
-bertscore = evaluate.load("bertscore")
+# BERTScore (model loaded once on first use; reference embeddings cached).
+# --scorer embedding (or SIMILARITY_SCORER) uses a faster sentence-embedding cosine.
+bertscore = make_scorer()
 
 # Sample data
 task_prompt = "Generate a engaging 50-word description for a wireless earbuds product."
@@ -25,6 +35,8 @@ initial_prompt = task_prompt
 MAX_ITERATIONS = 3
 NUM_VARIANTS = 3
 SCORE_THRESHOLD = 7.0  # Stop if >=7/10
+MAX_TASK_RETRIES = 2  # Reruns of a single task whose output does not parse
+EXECUTION_MODE = "crew"  # "crew": CrewAI agents decide the tool calls; "direct": run the task pipeline on the tools
 
 # Custom Tools (wrapped for CrewAI)
 def generate_output_tool(prompt: str) -> str:
@@ -37,32 +49,41 @@ def generate_output_tool(prompt: str) -> str:
     )
     return response.content[0].text.strip()
 
-def judge_output_tool(output: str, reference: str) -> float:
-    """Tool: LLM judge with CoT (returns score 0-10)."""
+JUDGE_CRITERIA = ["relevance", "fluency", "similarity"]
+
+def judge_verdict(output: str, reference: str) -> dict:
+    """The CoT judge's structured verdict: reasoning plus one 1-10 score per criterion."""
     cot_prompt = f"""
     You are an expert evaluator. Use Chain of Thought:
     Step 1: Read generated output and reference.
     Step 2: Assess relevance, fluency, similarity (1-10 each).
-    Step 3: Average score.
-    Step 4: Output ONLY the final average score as a number (e.g., 8.5).
+    Step 3: Record your reasoning and scores with the submit_scores tool.
 
     Reference: {reference}
     Generated: {output}
     """
-    response = client.messages.create(
+    return structured_call(
+        client,
+        tool_name="submit_scores",
+        description="Record the step-by-step assessment and one score per criterion.",
+        schema=criteria_schema(JUDGE_CRITERIA),
         model="claude-3-haiku-20240307",
-        max_tokens=50,
+        max_tokens=400,  # Room for the reasoning field in the tool call
         temperature=0.1,
         messages=[{"role": "user", "content": cot_prompt}]
     )
-    try:
-        return float(response.content[0].text.strip())
-    except ValueError:
-        return 0.0
+
+def judge_score(verdict: dict) -> float:
+    """Mean of the criterion scores (0-10)."""
+    return sum(verdict[name] for name in JUDGE_CRITERIA) / len(JUDGE_CRITERIA)
+
+def judge_output_tool(output: str, reference: str) -> float:
+    """Tool: LLM judge with CoT (returns score 0-10)."""
+    return judge_score(judge_verdict(output, reference))
 
 def compute_bertscore_tool(output: str, reference: str) -> float:
     """Tool: BERTScore F1 (0-1, scaled to 0-10)."""
-    results = bertscore.compute(predictions=[output], references=[reference], lang="en")
+    results = bertscore.score([output], reference)
     return results['f1'][0] * 10  # Normalize to 0-10
 
 # Agents (using custom Claude-based tools)
@@ -93,92 +114,262 @@ refiner_agent = Agent(
     allow_delegation=True  # Can delegate to generator/evaluator
 )
 
-# Dynamic Tasks (updated per iteration via crew kickoff)
-def create_optimization_crew(current_prompt: str, reference: str, iteration: int, history: List[Dict]) -> Crew:
+# Typed task outputs: each task answers with JSON for its model, which is
+# validated and goes straight into history (no scraping of free text)
+class GenerationResult(BaseModel):
+    output: str = Field(description="The generated 50-word product description")
+
+class EvaluationResult(BaseModel):
+    judge_score: float = Field(ge=0, le=10, description="CoT judge score from judge_output_tool")
+    bert_f1: Optional[float] = Field(default=None, ge=0, le=10,
+                                     description="BERTScore F1 (0-10) from compute_bertscore_tool")
+    feedback: str = Field(description="Strengths and weaknesses of the output")
+
+    @property
+    def combined(self):
+        return self.judge_score if self.bert_f1 is None else (self.judge_score + self.bert_f1) / 2
+
+class RefinementResult(BaseModel):
+    new_prompt: str = Field(description="The best refined prompt, or the current prompt if no refinement is needed")
+    new_output: str = Field(description="The output generated from new_prompt")
+    score: float = Field(ge=0, le=10, description="Combined score of new_output")
+
+class TaskOutputError(ValueError):
+    """A task's answer is not valid JSON for its output model."""
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+def json_instruction(model):
+    return f"Reply with only a JSON object matching this JSON schema: {json.dumps(model.model_json_schema())}"
+
+def parse_task_output(text, model):
+    """Validate a task's answer (JSON, possibly wrapped in prose or a code fence) against `model`."""
+    match = JSON_OBJECT.search(text or "")
+    if match is None:
+        raise TaskOutputError(f"no JSON object in {model.__name__} output")
+    try:
+        return model.model_validate_json(match.group())
+    except ValidationError as exc:
+        raise TaskOutputError(f"invalid {model.__name__}: {exc}") from exc
+
+# Tasks: descriptions are templates filled per kickoff ({current_prompt}, {reference});
+# the crew itself is built once
+TASK_SPECS = {
     # Task 1: Generate
-    generate_task = Task(
-        description=f"Using the current prompt: '{current_prompt}', generate a 50-word product description.",
-        agent=generator_agent,
-        expected_output="A generated text output."
-    )
-    
+    "generate": (generator_agent, GenerationResult,
+                 "Using the current prompt: '{current_prompt}', generate a 50-word product description."),
     # Task 2: Evaluate
-    evaluate_task = Task(
-        description=f"Evaluate the generated output against reference: '{reference}'. Use CoT for judge score and BERTScore. Provide combined score and feedback.",
-        agent=evaluator_agent,
-        expected_output="Score (0-10), feedback, and combined metric."
-    )
-    
+    "evaluate": (evaluator_agent, EvaluationResult,
+                 "Evaluate the generated output against reference: '{reference}'. "
+                 "Use CoT for judge score and BERTScore. Provide both scores and feedback."),
     # Task 3: Refine (conditional: if score < threshold)
-    refine_task = Task(
-        description=f"""If score < {SCORE_THRESHOLD}, use ReAct: 
+    "refine": (refiner_agent, RefinementResult,
+               f"""If the combined score < {SCORE_THRESHOLD}, use ReAct:
         - Thought (CoT): Analyze issues from evaluation.
         - Action: Generate {NUM_VARIANTS} prompt variants (more specific, e.g., add features).
         - Evaluate each variant's output with judge + BERTScore.
         - Re-rank and select the best variant as new prompt.
-        If score >= {SCORE_THRESHOLD}, output 'No refinement needed.'""",
-        agent=refiner_agent,
-        expected_output="New refined prompt (or current if no change), new output, and updated score."
-    )
-    
+        If the combined score >= {SCORE_THRESHOLD}, return the current prompt '{{current_prompt}}' and its output unchanged."""),
+}
+
+def create_optimization_crew() -> Crew:
+    tasks = [Task(description=template, agent=agent, expected_output=f"A {model.__name__} JSON object.")
+             for agent, model, template in TASK_SPECS.values()]
+
     # Crew: Sequential process (generate → evaluate → refine)
     return Crew(
         agents=[generator_agent, evaluator_agent, refiner_agent],
-        tasks=[generate_task, evaluate_task, refine_task],
+        tasks=tasks,
         process=Process.sequential,  # Linear delegation
         verbose=2  # Detailed logs for explainability
     )
 
+def run_crew(crew: Crew, **inputs) -> dict:
+    """
+    Kick off the crew with `inputs` filled into the task descriptions and
+    return each task's typed output by name. A task whose output does not
+    parse is rerun with the same context, and so is every task after it,
+    since those already consumed the bad output. Earlier tasks are kept.
+    """
+    for (_, model, template), task in zip(TASK_SPECS.values(), crew.tasks):
+        task.description = f"{template.format(**inputs)}\n\n{json_instruction(model)}"
+        task.tools = list(task.agent.tools)  # kickoff adds the delegation tools again on every run
+    with span("crew.kickoff"):  # Self time = CrewAI overhead outside the tool calls
+        crew.kickoff()
+
+    results = {}
+    context = None
+    rerun = False  # Set once a task is retried: the tasks after it must see the new output
+    for (name, (_, model, _)), task in zip(TASK_SPECS.items(), crew.tasks):
+        if rerun:
+            with span("crew.task.rerun", task=name):
+                text = task.execute(context)
+        else:
+            text = task.output.result
+        for attempt in range(MAX_TASK_RETRIES + 1):
+            try:
+                results[name] = parse_task_output(text, model)
+                break
+            except TaskOutputError as exc:
+                if attempt == MAX_TASK_RETRIES:
+                    raise
+                print(f"Task '{name}' output did not parse ({exc}); rerunning it and the tasks after it")
+                with span("crew.task.retry", task=name, attempt=attempt + 1):
+                    text = task.execute(context)
+                rerun = True
+        context = text
+    return results
+
+# Direct mode: the same three tasks, run in order straight on the agents' tools.
+# No planning turns: one Claude call per tool use plus one to write the variants.
+VARIANTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis": {"type": "string", "description": "Thought: why the current prompt underperforms"},
+        "variants": {"type": "array", "items": {"type": "string"}, "description": f"{NUM_VARIANTS} refined prompts"},
+    },
+    "required": ["analysis", "variants"],
+}
+
+def direct_generate(results, current_prompt, reference, use_bertscore):
+    return GenerationResult(output=generate_output_tool(current_prompt))
+
+def direct_evaluate(results, current_prompt, reference, use_bertscore):
+    output = results['generate'].output
+    # BERTScore runs in the background (a thread, or worker processes with --scorer bertscore-pool)
+    # while the judge call is in flight
+    bert_future = score_async(bertscore, [output], reference) if use_bertscore else None
+    verdict = judge_verdict(output, reference)
+    bert_f1 = bert_future.result()['f1'][0] * 10 if use_bertscore else None
+    # The judge's own reasoning, so direct_refine knows what to fix (as the evaluator agent reports it in crew mode)
+    scores = ", ".join(f"{name} {verdict[name]:.1f}/10" for name in JUDGE_CRITERIA)
+    feedback = f"{verdict['reasoning']}\nScores: {scores}"
+    if bert_f1 is not None:
+        feedback += f", BERTScore F1 {bert_f1:.1f}/10"
+    return EvaluationResult(judge_score=judge_score(verdict), bert_f1=bert_f1, feedback=feedback)
+
+def evaluate_variant(variant, reference, use_bertscore):
+    output = generate_output_tool(variant)
+    evaluation = direct_evaluate({'generate': GenerationResult(output=output)}, variant, reference, use_bertscore)
+    return RefinementResult(new_prompt=variant, new_output=output, score=evaluation.combined)
+
+def direct_refine(results, current_prompt, reference, use_bertscore):
+    current = RefinementResult(new_prompt=current_prompt, new_output=results['generate'].output,
+                               score=results['evaluate'].combined)
+    if current.score >= SCORE_THRESHOLD:
+        return current  # No refinement needed
+    # ReAct: Thought + Action (variants) in one call, then Observe every variant's scores
+    plan = structured_call(
+        client,
+        tool_name="submit_variants",
+        description="Record the analysis and the refined prompt variants.",
+        schema=VARIANTS_SCHEMA,
+        model="claude-3-haiku-20240307",
+        max_tokens=600,
+        temperature=0.7,
+        messages=[{"role": "user", "content": (
+            f"Prompt: {current_prompt}\nOutput: {current.new_output}\n"
+            f"Score: {current.score:.1f}/10 against the reference: {reference}\n"
+            f"Feedback: {results['evaluate'].feedback}\n\n"
+            f"Analyze what limits this prompt, then write {NUM_VARIANTS} prompt variants "
+            f"(more specific, e.g., add features). Record them with the submit_variants tool.")}]
+    )
+    variants = plan['variants'][:NUM_VARIANTS]
+    with ThreadPoolExecutor(max_workers=max(1, len(variants))) as pool:
+        scored = list(pool.map(in_context(evaluate_variant), variants, [reference] * len(variants),
+                               [use_bertscore] * len(variants)))
+    return max(scored + [current], key=lambda result: result.score)  # Re-rank: keep the best
+
+DIRECT_STEPS = {"generate": direct_generate, "evaluate": direct_evaluate, "refine": direct_refine}
+
+def run_direct(current_prompt: str, reference: str, use_bertscore: bool = True) -> dict:
+    """The crew's tasks (TASK_SPECS) in order, each executed directly with its agent's tools."""
+    results = {}
+    for name in TASK_SPECS:
+        with span("crew.task", task=name, mode="direct"):
+            results[name] = DIRECT_STEPS[name](results, current_prompt, reference, use_bertscore)
+    return results
+
 # Main Loop: Orchestrate Crew Iteratively
-def run_crewai_optimization(initial_prompt: str, reference: str, max_iterations: int = MAX_ITERATIONS):
+def run_crewai_optimization(initial_prompt: str, reference: str, max_iterations: int = MAX_ITERATIONS,
+                            mode: str = EXECUTION_MODE, use_bertscore: bool = True):
+    """
+    mode="crew" runs the CrewAI process; mode="direct" runs the same tasks on
+    the tools without agent deliberation. use_bertscore applies to direct mode
+    (in crew mode the evaluator agent picks its own tools).
+    """
     current_prompt = initial_prompt
     history = []
     best_score = 0.0
+    crew = create_optimization_crew() if mode == "crew" else None  # Built once; the prompt goes in per kickoff
     
     for iteration in range(max_iterations):
-        print(f"\n--- CrewAI Iteration {iteration + 1} ---")
-        
-        # Kickoff crew with current state
-        crew = create_optimization_crew(current_prompt, reference, iteration, history)
-        result = crew.kickoff()  # Runs tasks collaboratively
+        with span("iteration", index=iteration + 1):
+            print(f"\n--- CrewAI Iteration {iteration + 1} ---")
         
-        # Parse result (CrewAI outputs as string; in prod, use structured parsing)
-        lines = result.split('\n')
-        current_output = next((line for line in lines if 'Generated Output:' in line), 'N/A').split(': ')[1].strip()
-        current_judge_score = float(next((line for line in lines if 'Judge Score:' in line), '0').split(': ')[1])
-        bert_f1 = float(next((line for line in lines if 'BERT F1:' in line), '0').split(': ')[1])
-        combined_score = (current_judge_score + bert_f1) / 2
-        new_prompt = next((line for line in lines if 'New Prompt:' in line), current_prompt).split(': ')[1].strip()
+            # Kickoff crew with current state
+            if mode == "direct":
+                results = run_direct(current_prompt, reference, use_bertscore)
+            else:
+                results = run_crew(crew, current_prompt=current_prompt, reference=reference)
+            evaluation = results['evaluate']
+            combined_score = evaluation.combined
+            new_prompt = results['refine'].new_prompt
         
-        history.append({
-            'iteration': iteration + 1,
-            'prompt': current_prompt,
-            'output': current_output,
-            'judge_score': current_judge_score,
-            'bert_f1': bert_f1,
-            'combined': combined_score
-        })
+            history.append({
+                'iteration': iteration + 1,
+                'prompt': current_prompt,
+                'output': results['generate'].output,
+                'judge_score': evaluation.judge_score,
+                'bert_f1': evaluation.bert_f1,
+                'combined': combined_score
+            })
         
-        print(f"Combined Score: {combined_score:.2f}")
+            print(f"Combined Score: {combined_score:.2f}")
         
-        if combined_score > best_score:
-            current_prompt = new_prompt
-            best_score = combined_score
-            print(f"Improved! New best: {best_score:.2f}")
-        else:
-            print("No improvement; stopping.")
-            break
+            if combined_score > best_score:
+                current_prompt = new_prompt
+                best_score = combined_score
+                print(f"Improved! New best: {best_score:.2f}")
+            else:
+                print("No improvement; stopping.")
+                break
     
-    # Final run for best
-    final_crew = create_optimization_crew(current_prompt, reference, max_iterations, history)
-    final_result = final_crew.kickoff()
-    final_output = next((line for line in final_result.split('\n') if 'Final Output:' in line), 'N/A').split(': ')[1].strip()
+    # Final run for best: only the generation task is needed
+    with span("crew.task", task="generate", mode=mode, final=True):
+        if mode == "direct":
+            final_output = generate_output_tool(current_prompt)
+        else:
+            generate_task = crew.tasks[0]
+            generate_task.description = (f"{TASK_SPECS['generate'][2].format(current_prompt=current_prompt)}\n\n"
+                                         f"{json_instruction(GenerationResult)}")
+            final_output = parse_task_output(generate_task.execute(), GenerationResult).output
     final_combined = best_score
     
     print(f"\nFinal Prompt: {current_prompt}")
     print(f"Final Output: {final_output}")
     print(f"Final Combined Score: {final_combined:.2f}")
+    print_cache_stats(client)
+    print_scheduler_stats(client)
+    print(parse_stats.report())
+    print(tracer.report())
+    if hasattr(bertscore, "report"):
+        print(bertscore.report())
     return history, final_output
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimize a prompt with a generate/evaluate/refine crew.")
+    parser.add_argument("--mode", choices=["crew", "direct"], default=EXECUTION_MODE,
+                        help="crew: CrewAI agents; direct: the same tasks run straight on the tools (fewer LLM calls)")
+    parser.add_argument("--max-iterations", type=int, default=MAX_ITERATIONS)
+    parser.add_argument("--scorer", choices=BACKENDS,
+                        help="Similarity backend for the BERTScore tool (default: SIMILARITY_SCORER, else bertscore)")
+    parser.add_argument("--no-bertscore", action="store_true", help="Direct mode: skip BERTScore (judge score only)")
+    return parser.parse_args()
+
 # Run
-history, final_output = run_crewai_optimization(initial_prompt, reference_output)
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args()
+    bertscore = make_scorer(args.scorer)
+    history, final_output = run_crewai_optimization(initial_prompt, reference_output, args.max_iterations,
+                                                    mode=args.mode, use_bertscore=not args.no_bertscore)
@@ -82,42 +82,67 @@ Cohere Rerank ensures SEMANTIC RELEVANCE
 Together = Structure + Truth + Query Alignment = Maximum Impact Prompts
 """
 
+import argparse
 import os
-from anthropic import Anthropic
-import cohere
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from difflib import SequenceMatcher
 from dotenv import load_dotenv
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))  # repo root, for llmkit
+from llmkit.checkpoint import checkpointed, checkpoints
+from llmkit.client import make_client, make_cohere_client, print_cache_stats, print_scheduler_stats
+from llmkit.dedup import dedup_index, deduplicated
+from llmkit.halving import halving_stats, successive_halving
+from llmkit.jobs import JobRunner, load_jobs
+from llmkit.pipeline import Stage, pipeline_stats, run_pipeline
+from llmkit.prompt_cache import cached_system
+from llmkit.rerank import make_reranker
+from llmkit.streaming import stream_stats, stream_text
+from llmkit.structured import JudgeParseError, parse_stats, score_field, structured_call
+from llmkit.telemetry import in_context, in_span, span, start_span, traced, tracer
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Anthropic client
-client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+# Initialize Anthropic client (with on-disk response cache)
+client = make_client()
 
-# Initialize Cohere client for reranking
-co = cohere.Client(api_key=os.getenv("COHERE_API_KEY"))
+# Cohere client for reranking - created on first use, so runs that never
+# rerank don't pay for importing the SDK
+_co = None
+
+def get_cohere_client():
+    global _co
+    if _co is None:
+        _co = make_cohere_client()  # Rate-limited rerank (COHERE_RPM)
+    return _co
+
+# Reranker: Cohere (chunked, scores cached per query+document) or a local
+# cross-encoder when no COHERE_API_KEY is set / RERANKER=local
+reranker = make_reranker(get_cohere_client)
 
 # User input: The prompt to refine (no reference needed)
 user_prompt = "Generate a engaging 50-word description for a wireless earbuds product."  # Your starting point
 MAX_ITERATIONS = 3
 NUM_VARIANTS = 3
 SCORE_THRESHOLD = 9.0  # Intrinsic quality target (0-10) - High bar to see refinement in action!
-
-# Step 1: Minto Judge - Uses Minto Pyramid Principle (Conclusion → Supporting Arguments)
-def minto_judge_output(generated_output, original_prompt):
-    """
-    Minto Pyramid Principle: Start with the answer, then provide supporting logic.
-    Structure: Main Point → Key Arguments → Supporting Details
-    """
-    minto_prompt = f"""
-    You are the "Minto Judge" using the Minto Pyramid Principle for evaluation.
-
-    EVALUATE THIS OUTPUT USING PYRAMID STRUCTURE:
-
-    Original Prompt: {original_prompt}
-    Generated Output: {generated_output}
-
-    FORMAT YOUR RESPONSE AS:
-
+MAX_CONCURRENCY = 6  # Max Claude calls in flight while testing variants
+BEAM_WIDTH = 1  # Prompts kept per iteration; >1 switches to beam search (see beam_optimization_loop)
+BEAM_DEDUP_THRESHOLD = 0.9  # Prompts at least this similar (0-1) count as duplicates in the beam
+FUSED_JUDGE = False  # True: one Claude call returns both Minto and Feynman verdicts (halves judge requests)
+STREAMING = True  # Stream generations (reports time-to-first-token)
+WORD_BUDGET = None  # Stop a streamed generation past this many words (e.g. 60 for the 50-word task); None = no limit
+HALVING_KEEP = 1.0  # <1.0: successive halving - keep this fraction after the rerank, then after Minto (Feynman judges the rest)
+JUDGE_BUDGET = None  # Max variants per round that reach the last judge (None = no cap); also turns halving on
+PIPELINE = False  # True: variants stream through generate → judge → rerank stages with bounded queues (llmkit.pipeline)
+GENERATE_WORKERS = 3  # Pipeline: generations in flight
+JUDGE_WORKERS = 3  # Pipeline: outputs being judged at once (Minto and Feynman run side by side, or one fused call)
+PIPELINE_QUEUE_SIZE = 2  # Pipeline: items waiting between two stages before the upstream stage blocks
+JUDGE_FLOOR_SCORE = 0.0  # Score for a variant whose judge never returned a valid verdict
+RUN_STATS = True  # Print cache/scheduler/telemetry stats after each run (--prompts prints them once at the end)
+
+# Rubrics are shared by the separate judges and the fused dual judge
+MINTO_RUBRIC = """
     1. MAIN CONCLUSION (Top of Pyramid): Overall quality score (0-10) and verdict in ONE sentence.
 
     2. KEY SUPPORTING ARGUMENTS (Middle Layer):
@@ -127,43 +152,9 @@ def minto_judge_output(generated_output, original_prompt):
 
     3. SUPPORTING DETAILS (Base Layer):
        - Specific evidence from the text supporting each argument
+"""
 
-    IMPORTANT: Start your response with ONLY the numeric score on the first line (e.g., 8.5).
-    Then provide the pyramid structure explanation.
-    """
-
-    response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=300,
-        temperature=0.1,
-        messages=[{"role": "user", "content": minto_prompt}]
-    )
-    content = response.content[0].text.strip()
-
-    try:
-        lines = content.split('\n')
-        score = float(lines[0].strip())
-        explanation = '\n'.join(lines[1:]).strip()
-        return score, explanation
-    except (ValueError, IndexError):
-        return 0.0, "Parse error in Minto evaluation."
-
-# Step 2: Feynman Judge - Uses ReAct (Reason + Act + Observe)
-def feynman_judge_output(generated_output, original_prompt):
-    """
-    Feynman Method with ReAct:
-    - Reason: Form hypothesis about quality
-    - Act: Test it (simplify, verify claims, check understanding)
-    - Observe: Did tests pass? What's the verdict?
-    """
-    feynman_prompt = f"""
-    You are the "Feynman Judge" - a scientist using the ReAct method to evaluate.
-
-    USE REACT - REASON, ACT, OBSERVE:
-
-    Original Prompt: {original_prompt}
-    Generated Output: {generated_output}
-
+FEYNMAN_RUBRIC = """
     STEP 1 - REASON (Form Hypothesis):
     - What is the core message of this output?
     - Hypothesis: Is this message clear, truthful, and simple?
@@ -188,33 +179,213 @@ def feynman_judge_output(generated_output, original_prompt):
 
     STEP 3 - OBSERVE (Draw Conclusion):
     • Based on test results, what's the scientific verdict?
-    • Average the 3 test scores
+"""
 
-    OUTPUT FORMAT:
-    First line: Overall score (0-10) as a number only (e.g., 7.5)
-    Following lines: Show your Reasoning, Actions taken, and Observations for each test
+JUDGE_MODEL = "claude-3-haiku-20240307"
+
+# Judge instructions are static, so they go in a system block; only the
+# prompt/output slots in the user message change from call to call.
+# cached_system marks the block for prompt caching only once the prefix (tool
+# schema + system block) clears JUDGE_MODEL's minimum. These rubrics are well
+# under Haiku's 2048 tokens, so for now the judges run uncached.
+MINTO_SYSTEM = f"""
+    You are the "Minto Judge" using the Minto Pyramid Principle for evaluation.
+
+    EVALUATE THE OUTPUT BELOW USING PYRAMID STRUCTURE:
+{MINTO_RUBRIC}
+    Record your evaluation with the submit_minto_verdict tool.
+"""
+
+FEYNMAN_SYSTEM = f"""
+    You are the "Feynman Judge" - a scientist using the ReAct method to evaluate.
+
+    USE REACT - REASON, ACT, OBSERVE:
+{FEYNMAN_RUBRIC}
+    Record your tests with the submit_feynman_verdict tool.
+"""
+
+DUAL_SYSTEM = f"""
+    You are TWO independent judges evaluating the same output. Apply each rubric on its own terms.
+
+    === JUDGE 1: The "Minto Judge" (Minto Pyramid Principle) ===
+{MINTO_RUBRIC}
+    === JUDGE 2: The "Feynman Judge" (scientist using ReAct: Reason, Act, Observe) ===
+{FEYNMAN_RUBRIC}
+    Record both evaluations with the submit_dual_verdict tool.
+"""
+
+def judge_slots(generated_output, original_prompt):
+    """The per-candidate part of every judge request."""
+    return f"Original Prompt: {original_prompt}\nGenerated Output: {generated_output}"
+
+# Judges answer through a forced tool call; the schemas below are the verdicts
+MINTO_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "verdict": {"type": "string", "description": "Main conclusion: overall verdict in ONE sentence"},
+        "overall_score": score_field(description="Overall quality (top of the pyramid)"),
+        "fluency_clarity": score_field(description="Argument A: Fluency & Clarity"),
+        "relevance_to_intent": score_field(description="Argument B: Relevance to Intent"),
+        "engagement_impact": score_field(description="Argument C: Engagement & Impact"),
+        "evidence": {"type": "string", "description": "Specific evidence from the text supporting each argument"},
+    },
+    "required": ["verdict", "overall_score", "fluency_clarity", "relevance_to_intent", "engagement_impact", "evidence"],
+}
+
+FEYNMAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "core_message": {"type": "string", "description": "Reason: the core message and your hypothesis about it"},
+        "simple_version": {"type": "string", "description": "Simplicity test: the message in one sentence a 12-year-old understands"},
+        "simplicity_score": score_field(description="Action A - simplicity/clarity"),
+        "truth_score": score_field(description="Action B - claims specific and defensible"),
+        "elegance_score": score_field(description="Action C - no fluff"),
+        "observations": {"type": "string", "description": "Observe: conclusions drawn from the three tests"},
+    },
+    "required": ["core_message", "simple_version", "simplicity_score", "truth_score", "elegance_score", "observations"],
+}
+
+# Step 1: Minto Judge - Uses Minto Pyramid Principle (Conclusion → Supporting Arguments)
+@traced("judge.minto")
+@deduplicated("judge.minto")
+@checkpointed("judge.minto")
+def minto_judge(generated_output, original_prompt):
     """
+    Minto Pyramid Principle: Start with the answer, then provide supporting logic.
+    Structure: Main Point → Key Arguments → Supporting Details
+    Returns the validated verdict dict (MINTO_SCHEMA).
+    """
+    return structured_call(
+        client,
+        tool_name="submit_minto_verdict",
+        description="Record the Minto pyramid evaluation of the generated output.",
+        schema=MINTO_SCHEMA,
+        model=JUDGE_MODEL,
+        max_tokens=500,
+        temperature=0.1,
+        system=cached_system(MINTO_SYSTEM, model=JUDGE_MODEL, tool_schema=MINTO_SCHEMA),
+        messages=[{"role": "user", "content": judge_slots(generated_output, original_prompt)}]
+    )
 
-    response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=400,
+def format_minto(verdict):
+    """Minto verdict as (score, explanation)."""
+    explanation = (
+        f"{verdict['verdict']}\n"
+        f"- Fluency & Clarity: {verdict['fluency_clarity']:.1f}/10\n"
+        f"- Relevance to Intent: {verdict['relevance_to_intent']:.1f}/10\n"
+        f"- Engagement & Impact: {verdict['engagement_impact']:.1f}/10\n"
+        f"Evidence: {verdict['evidence']}"
+    )
+    return float(verdict['overall_score']), explanation
+
+def minto_judge_output(generated_output, original_prompt):
+    """Minto judge as (score, explanation)."""
+    return format_minto(minto_judge(generated_output, original_prompt))
+
+# Step 2: Feynman Judge - Uses ReAct (Reason + Act + Observe)
+@traced("judge.feynman")
+@deduplicated("judge.feynman")
+@checkpointed("judge.feynman")
+def feynman_judge(generated_output, original_prompt):
+    """
+    Feynman Method with ReAct:
+    - Reason: Form hypothesis about quality
+    - Act: Test it (simplify, verify claims, check understanding)
+    - Observe: Did tests pass? What's the verdict?
+    Returns the validated verdict dict (FEYNMAN_SCHEMA).
+    """
+    return structured_call(
+        client,
+        tool_name="submit_feynman_verdict",
+        description="Record the Feynman ReAct test results for the generated output.",
+        schema=FEYNMAN_SCHEMA,
+        model=JUDGE_MODEL,
+        max_tokens=600,
+        temperature=0.1,
+        system=cached_system(FEYNMAN_SYSTEM, model=JUDGE_MODEL, tool_schema=FEYNMAN_SCHEMA),
+        messages=[{"role": "user", "content": judge_slots(generated_output, original_prompt)}]
+    )
+
+def feynman_overall(verdict):
+    """Overall Feynman score: the average of the 3 test scores."""
+    return (verdict['simplicity_score'] + verdict['truth_score'] + verdict['elegance_score']) / 3
+
+def format_feynman(verdict):
+    """Feynman verdict as (score, explanation)."""
+    explanation = (
+        f"Reason: {verdict['core_message']}\n"
+        f"Act A - Simplicity: {verdict['simplicity_score']:.1f}/10 ({verdict['simple_version']})\n"
+        f"Act B - Truth: {verdict['truth_score']:.1f}/10\n"
+        f"Act C - Elegance: {verdict['elegance_score']:.1f}/10\n"
+        f"Observe: {verdict['observations']}"
+    )
+    return feynman_overall(verdict), explanation
+
+def feynman_judge_output(generated_output, original_prompt):
+    """Feynman judge as (score, explanation)."""
+    return format_feynman(feynman_judge(generated_output, original_prompt))
+
+# Step 2b: Fused Dual Judge - both rubrics, one call
+DUAL_SCHEMA = {
+    "type": "object",
+    "properties": {"minto": MINTO_SCHEMA, "feynman": FEYNMAN_SCHEMA},
+    "required": ["minto", "feynman"],
+}
+
+@traced("judge.dual")
+@deduplicated("judge.dual")
+@checkpointed("judge.dual")
+def dual_judge(generated_output, original_prompt):
+    """
+    Minto and Feynman evaluations in ONE structured response.
+    The output and prompt are sent once instead of twice.
+    Returns (minto_verdict, feynman_verdict).
+    """
+    verdict = structured_call(
+        client,
+        tool_name="submit_dual_verdict",
+        description="Record the Minto pyramid evaluation and the Feynman ReAct test results.",
+        schema=DUAL_SCHEMA,
+        model=JUDGE_MODEL,
+        max_tokens=1100,
         temperature=0.1,
-        messages=[{"role": "user", "content": feynman_prompt}]
+        system=cached_system(DUAL_SYSTEM, model=JUDGE_MODEL, tool_schema=DUAL_SCHEMA),
+        messages=[{"role": "user", "content": judge_slots(generated_output, original_prompt)}]
     )
-    content = response.content[0].text.strip()
+    return verdict['minto'], verdict['feynman']
 
-    try:
-        lines = content.split('\n')
-        score = float(lines[0].strip())
-        explanation = '\n'.join(lines[1:]).strip()
-        return score, explanation
-    except (ValueError, IndexError):
-        return 0.0, "Parse error in Feynman evaluation."
+def dual_judge_output(generated_output, original_prompt):
+    """Fused judge as ((minto_score, minto_explanation), (feynman_score, feynman_explanation))."""
+    minto_verdict, feynman_verdict = dual_judge(generated_output, original_prompt)
+    return format_minto(minto_verdict), format_feynman(feynman_verdict)
+
+def judge_both(generated_output, original_prompt):
+    """Both judges, fused into one call or as two separate calls depending on FUSED_JUDGE."""
+    if FUSED_JUDGE:
+        return dual_judge_output(generated_output, original_prompt)
+    return minto_judge_output(generated_output, original_prompt), feynman_judge_output(generated_output, original_prompt)
+
+def variant_judge(judge_fn):
+    """
+    `judge_fn` for one variant of a round: a verdict that still fails to parse
+    after the retries scores JUDGE_FLOOR_SCORE instead of aborting the round
+    (the failure is printed and counted in the structured-judge stats).
+    """
+    def judge(generated_output, original_prompt):
+        try:
+            return judge_fn(generated_output, original_prompt)
+        except JudgeParseError as exc:
+            print(f"⚠️  {exc} - scoring this variant {JUDGE_FLOOR_SCORE}")
+            failed = (JUDGE_FLOOR_SCORE, f"No valid verdict: {exc}")
+            return (failed, failed) if judge_fn is dual_judge_output else failed
+    return judge
 
 # Step 3: Cohere Rerank - Replaces Taylor Swift creativity judge
+@checkpointed("rerank")
 def cohere_rerank_candidates(candidates, query):
     """
     Cohere Rerank: Uses rerank-english-v3.0 for semantic reranking
+    (or a local cross-encoder when running offline)
 
     Replaces the Taylor Swift creativity judge with Cohere's reranking model
     which provides semantic similarity scoring based on query relevance.
@@ -230,37 +401,203 @@ def cohere_rerank_candidates(candidates, query):
     # Extract outputs from candidates
     documents = [candidate['output'] for candidate in candidates]
 
-    # Use Cohere Rerank v3.0
-    # Model: rerank-english-v3.0 (state-of-the-art semantic reranking)
-    results = co.rerank(
-        model="rerank-english-v3.0",
-        query=query,
-        documents=documents,
-        top_n=len(documents)  # Return all candidates, ranked
-    )
-
-    # Extract scores and return as (index, score) tuples
-    # Cohere returns results sorted by relevance score (descending)
-    ranked_results = []
-    for result in results.results:
-        # result.index is the original index in the documents list
-        # result.relevance_score is the relevance score (0-1, higher = more relevant)
-        ranked_results.append((result.index, result.relevance_score))
-
-    return ranked_results
+    # Scores are cached per (query, document), so only outputs that have
+    # not been reranked before are sent; large sets are chunked to fit
+    # the API's per-request document limit
+    return reranker.rerank(query, documents)
 
 # Step 4: Generate output from a prompt
-def generate_output(prompt):
-    """Generate text output using Claude"""
-    response = client.messages.create(
+@traced("generate")
+@deduplicated("generate")
+@checkpointed("generate")
+def generate_output(prompt, priority="explore"):
+    """Generate text output using Claude ("final" for the prompt being kept, "explore" for variants)"""
+    request = dict(
         model="claude-3-haiku-20240307",
         max_tokens=100,
         temperature=0.7,
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": prompt}],
+        priority=priority
     )
+    if STREAMING:
+        return stream_text(client, word_budget=WORD_BUDGET, **request)['text']
+    response = client.messages.create(**request)
     return response.content[0].text.strip()
 
+# Step 4: Concurrent variant evaluation
+def evaluate_variants(variants, original_user_prompt, max_concurrency=MAX_CONCURRENCY):
+    """
+    Fan out all variant generations at once and start each output's Minto
+    and Feynman judges as soon as that generation completes, so judging
+    overlaps the slower generations. Results keep the variants' order.
+    """
+    if not variants:
+        return []
+    if len(variants) > 1 and (HALVING_KEEP < 1.0 or JUDGE_BUDGET is not None):
+        return evaluate_variants_halving(variants, original_user_prompt, max_concurrency)
+    if PIPELINE:
+        return evaluate_variants_pipelined(variants, original_user_prompt)
+
+    # One span per variant, covering its generation and judges across pool threads
+    variant_spans = [start_span("variant", index=i + 1) for i in range(len(variants))]
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        # Phase 1: generate every variant's output in parallel
+        generation_futures = {pool.submit(in_context(in_span(variant_spans[i], generate_output)), variant): i
+                              for i, variant in enumerate(variants)}
+
+        # Phase 2: judge each output the moment it is ready
+        # (one fused call per output when FUSED_JUDGE is on)
+        outputs = [None] * len(variants)
+        judge_futures = [None] * len(variants)
+        for future in as_completed(generation_futures):
+            i = generation_futures[future]
+            outputs[i] = future.result()
+            judge = lambda judge_fn: pool.submit(in_context(in_span(variant_spans[i], variant_judge(judge_fn))),
+                                                 outputs[i], original_user_prompt)
+            if FUSED_JUDGE:
+                judge_futures[i] = judge(dual_judge_output)
+            else:
+                judge_futures[i] = (judge(minto_judge_output), judge(feynman_judge_output))
+
+        variant_results = []
+        for i, (variant, output, futures, variant_span) in enumerate(zip(variants, outputs, judge_futures, variant_spans)):
+            if FUSED_JUDGE:
+                (minto_score_v, minto_feedback_v), (feynman_score_v, feynman_feedback_v) = futures.result()
+            else:
+                minto_score_v, minto_feedback_v = futures[0].result()
+                feynman_score_v, feynman_feedback_v = futures[1].result()
+            variant_results.append({
+                'index': i,
+                'variant': variant,
+                'output': output,
+                'minto_score': minto_score_v,
+                'feynman_score': feynman_score_v,
+                'combined_score': (minto_score_v + feynman_score_v) / 2,
+                'minto_feedback': minto_feedback_v,
+                'feynman_feedback': feynman_feedback_v
+            })
+            variant_span.set(combined_score=variant_results[-1]['combined_score'])
+            variant_span.end()
+
+    return variant_results
+
+def evaluate_variants_halving(variants, original_user_prompt, max_concurrency=MAX_CONCURRENCY):
+    """
+    Successive halving (llmkit.halving): generate every variant, rerank the
+    outputs against the user prompt, then judge only the top HALVING_KEEP.
+    With separate judges Minto cuts again before Feynman; with FUSED_JUDGE
+    the one call is the last stage. Only variants that get both scores are
+    returned, in the variants' order.
+    """
+    with span("halving", variants=len(variants)), ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        outputs = list(pool.map(in_context(generate_output), variants))
+        verdicts = {}  # index -> {'minto': (score, feedback), 'feynman': (score, feedback)}
+
+        def rerank_stage(indices):
+            relevance = dict(cohere_rerank_candidates([{'output': outputs[i]} for i in indices], original_user_prompt))
+            return [relevance[position] for position in range(len(indices))]
+
+        def judge_stage(judge_fn, *names):
+            def score(indices):
+                results = list(pool.map(in_context(variant_judge(judge_fn)), [outputs[i] for i in indices],
+                                        [original_user_prompt] * len(indices)))
+                for i, result in zip(indices, results):
+                    verdicts.setdefault(i, {}).update(zip(names, result if len(names) > 1 else [result]))
+                return [sum(verdicts[i][name][0] for name in names) for i in indices]
+            return score
+
+        if FUSED_JUDGE:
+            stages = [("rerank", rerank_stage, 0), ("judges", judge_stage(dual_judge_output, 'minto', 'feynman'), 1)]
+        else:
+            stages = [("rerank", rerank_stage, 0), ("minto", judge_stage(minto_judge_output, 'minto'), 1),
+                      ("feynman", judge_stage(feynman_judge_output, 'feynman'), 1)]
+        judged, _ = successive_halving(range(len(variants)), stages, keep=HALVING_KEEP, budget=JUDGE_BUDGET)
+
+    print(f"\n✂️  Successive halving: {len(judged)}/{len(variants)} variants fully judged "
+          f"(kept {', '.join(str(i + 1) for i in judged)})")
+    variant_results = []
+    for i in judged:
+        (minto_score_v, minto_feedback_v), (feynman_score_v, feynman_feedback_v) = verdicts[i]['minto'], verdicts[i]['feynman']
+        variant_results.append({
+            'index': i,  # Position among the generated variants (halving drops some)
+            'variant': variants[i],
+            'output': outputs[i],
+            'minto_score': minto_score_v,
+            'feynman_score': feynman_score_v,
+            'combined_score': (minto_score_v + feynman_score_v) / 2,
+            'minto_feedback': minto_feedback_v,
+            'feynman_feedback': feynman_feedback_v
+        })
+    return variant_results
+
+def evaluate_variants_pipelined(variants, original_user_prompt):
+    """
+    Stream the variants through generate → judge → rerank stages
+    (llmkit.pipeline), each with its own workers: variant N+1 is generated
+    while N is judged, and judged outputs are reranked as they arrive
+    instead of once after the round. Results keep the variants' order.
+    """
+    variant_spans = [start_span("variant", index=i + 1) for i in range(len(variants))]
+    reranked = []  # Items in the order they reached the rerank stage
+
+    def generate(item):
+        item['output'] = in_span(variant_spans[item['index']], generate_output)(item['variant'])
+        return item
+
+    def judge(item):
+        in_variant = lambda judge_fn: in_context(in_span(variant_spans[item['index']], variant_judge(judge_fn)))
+        if FUSED_JUDGE:
+            verdicts = in_variant(dual_judge_output)(item['output'], original_user_prompt)
+        else:
+            # Both judges at once, as in evaluate_variants: Feynman on the side pool, Minto on this worker
+            feynman = side_judges.submit(in_variant(feynman_judge_output), item['output'], original_user_prompt)
+            verdicts = (in_variant(minto_judge_output)(item['output'], original_user_prompt), feynman.result())
+        (item['minto_score'], item['minto_feedback']), (item['feynman_score'], item['feynman_feedback']) = verdicts
+        item['combined_score'] = (item['minto_score'] + item['feynman_score']) / 2
+        return item
+
+    def rerank(items):
+        # Only the new outputs are sent; the earlier ones are served from the rerank cache
+        reranked.extend(items)
+        for position, score in cohere_rerank_candidates([{'output': item['output']} for item in reranked],
+                                                        original_user_prompt):
+            reranked[position]['cohere_score'] = score
+        leader = max(reranked, key=lambda item: item['cohere_score'])
+        print(f"🔄 Rerank leader after {len(reranked)}/{len(variants)} variants: "
+              f"Variant {leader['index'] + 1} ({leader['cohere_score']:.4f})")
+        return items
+
+    with span("pipeline", variants=len(variants)), ThreadPoolExecutor(max_workers=JUDGE_WORKERS) as side_judges:
+        finished = run_pipeline(
+            [{'index': i, 'variant': variant} for i, variant in enumerate(variants)],
+            [Stage("generate", generate, workers=GENERATE_WORKERS),
+             Stage("judge", judge, workers=JUDGE_WORKERS),
+             Stage("rerank", rerank, batch=len(variants))],
+            maxsize=PIPELINE_QUEUE_SIZE,
+        )
+
+    variant_results = []
+    for item in sorted(finished, key=lambda item: item['index']):
+        variant_results.append({key: item[key] for key in ('index', 'variant', 'output', 'minto_score', 'feynman_score',
+                                                           'combined_score', 'minto_feedback', 'feynman_feedback')})
+        variant_spans[item['index']].set(combined_score=item['combined_score'])
+        variant_spans[item['index']].end()
+    return variant_results
+
+@checkpointed("refine.reason")
+def analyze_limits(reason_prompt):
+    """The "What is limiting?" call: limiting factors plus numbered variants, as text."""
+    reason_response = client.messages.create(
+        model="claude-3-haiku-20240307",
+        max_tokens=400,
+        temperature=0.5,
+        messages=[{"role": "user", "content": reason_prompt}]
+    )
+    return reason_response.content[0].text.strip()
+
 # Step 4: Enhanced ReAct Refinement - Identifies "What is Limiting?" then tests variants
+@traced("refine")
 def react_refine_prompt(current_prompt, current_output, minto_score, feynman_score, minto_feedback, feynman_feedback, original_user_prompt):
     """
     ReAct with Limiting Factor Analysis:
@@ -296,13 +633,7 @@ def react_refine_prompt(current_prompt, current_output, minto_score, feynman_sco
     Number each variant 1-{NUM_VARIANTS}.
     """
 
-    reason_response = client.messages.create(
-        model="claude-3-haiku-20240307",
-        max_tokens=400,
-        temperature=0.5,
-        messages=[{"role": "user", "content": reason_prompt}]
-    )
-    variants_text = reason_response.content[0].text.strip()
+    variants_text = analyze_limits(reason_prompt)
 
     # Extract limiting factors and variants
     print("\n" + "="*60)
@@ -337,37 +668,15 @@ def react_refine_prompt(current_prompt, current_output, minto_score, feynman_sco
                 variants.append(variant_text)
                 break
 
-    # ACT: Generate & evaluate each variant with BOTH judges
-    variant_results = []
-    for i, variant in enumerate(variants[:NUM_VARIANTS], 1):
-        print(f"\n--- Testing Variant {i} ---")
-        print(f"Variant Prompt: {variant}")
-
-        # Generate output from this variant
-        variant_output = generate_output(variant)
-        print(f"Generated Output: {variant_output}")
-
-        # Judge with Minto Judge
-        minto_score_v, minto_feedback_v = minto_judge_output(variant_output, original_user_prompt)
-        print(f"  → Minto Judge Score: {minto_score_v:.2f}")
-
-        # Judge with Feynman Judge
-        feynman_score_v, feynman_feedback_v = feynman_judge_output(variant_output, original_user_prompt)
-        print(f"  → Feynman Judge Score: {feynman_score_v:.2f}")
-
-        # Combined score (average of both judges)
-        combined_score = (minto_score_v + feynman_score_v) / 2
-        print(f"  → Combined Score: {combined_score:.2f}")
-
-        variant_results.append({
-            'variant': variant,
-            'output': variant_output,
-            'minto_score': minto_score_v,
-            'feynman_score': feynman_score_v,
-            'combined_score': combined_score,
-            'minto_feedback': minto_feedback_v,
-            'feynman_feedback': feynman_feedback_v
-        })
+    # ACT: Generate & evaluate each variant with BOTH judges (concurrently)
+    variant_results = evaluate_variants(variants[:NUM_VARIANTS], original_user_prompt)
+    for result in variant_results:
+        print(f"\n--- Testing Variant {result['index'] + 1} ---")
+        print(f"Variant Prompt: {result['variant']}")
+        print(f"Generated Output: {result['output']}")
+        print(f"  → Minto Judge Score: {result['minto_score']:.2f}")
+        print(f"  → Feynman Judge Score: {result['feynman_score']:.2f}")
+        print(f"  → Combined Score: {result['combined_score']:.2f}")
 
     # Select best Feynman variant by combined score (Minto + Feynman)
     best_feynman = max(variant_results, key=lambda x: x['combined_score'])
@@ -402,17 +711,22 @@ def react_refine_prompt(current_prompt, current_output, minto_score, feynman_sco
             'minto_score': best_feynman['minto_score'],
             'feynman_score': best_feynman['feynman_score'],
             'combined_score': best_feynman['combined_score']
-        }
+        },
+        'variants': variant_results
     }
 
 # Step 5: Main Optimization Loop with Dual-Judge System + Taylor Swift Re-ranking
-def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS):
+def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS, beam_width=BEAM_WIDTH):
     """
     Iterative optimization using both Minto and Feynman judges.
     Asks "What is limiting?" at each iteration and generates targeted variants.
     Uses Taylor Swift creativity for re-ranking.
     Collects all candidates for final re-ranking.
+    With beam_width > 1, runs beam search instead of following one path.
     """
+    if beam_width > 1:
+        return beam_optimization_loop(user_prompt, max_iterations, beam_width)
+
     current_prompt = user_prompt
     best_combined_score = 0.0
     history = []
@@ -426,93 +740,211 @@ def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS):
     print("="*70)
 
     for iteration in range(max_iterations):
-        print(f"\n{'#'*70}")
-        print(f"# ITERATION {iteration + 1}")
-        print(f"{'#'*70}")
-
-        # Generate output from current prompt
-        print(f"\nCurrent Prompt: {current_prompt}")
-        current_output = generate_output(current_prompt)
-        print(f"Generated Output: {current_output}")
-
-        # Evaluate with Minto Judge
-        print("\n--- MINTO JUDGE EVALUATION ---")
-        minto_score, minto_explanation = minto_judge_output(current_output, user_prompt)
-        print(f"Score: {minto_score:.2f}/10")
-        print(f"Analysis:\n{minto_explanation}")
-
-        # Evaluate with Feynman Judge
-        print("\n--- FEYNMAN JUDGE EVALUATION ---")
-        feynman_score, feynman_explanation = feynman_judge_output(current_output, user_prompt)
-        print(f"Score: {feynman_score:.2f}/10")
-        print(f"Analysis:\n{feynman_explanation}")
-
-        # Combined score
-        combined_score = (minto_score + feynman_score) / 2
-        print(f"\n*** COMBINED SCORE: {combined_score:.2f}/10 ***")
-
-        # Track history
-        history.append({
-            'iteration': iteration + 1,
-            'prompt': current_prompt,
-            'output': current_output,
-            'minto_score': minto_score,
-            'feynman_score': feynman_score,
-            'combined_score': combined_score
-        })
+        with span("iteration", index=iteration + 1):
+            print(f"\n{'#'*70}")
+            print(f"# ITERATION {iteration + 1}")
+            print(f"{'#'*70}")
+
+            # Generate output from current prompt
+            print(f"\nCurrent Prompt: {current_prompt}")
+            current_output = generate_output(current_prompt, priority="final")
+            print(f"Generated Output: {current_output}")
+
+            # Evaluate with both judges (one fused call, or two separate ones)
+            (minto_score, minto_explanation), (feynman_score, feynman_explanation) = judge_both(current_output, user_prompt)
+
+            # Minto Judge
+            print("\n--- MINTO JUDGE EVALUATION ---")
+            print(f"Score: {minto_score:.2f}/10")
+            print(f"Analysis:\n{minto_explanation}")
+
+            # Feynman Judge
+            print("\n--- FEYNMAN JUDGE EVALUATION ---")
+            print(f"Score: {feynman_score:.2f}/10")
+            print(f"Analysis:\n{feynman_explanation}")
+
+            # Combined score
+            combined_score = (minto_score + feynman_score) / 2
+            print(f"\n*** COMBINED SCORE: {combined_score:.2f}/10 ***")
+
+            # Track history
+            history.append({
+                'iteration': iteration + 1,
+                'prompt': current_prompt,
+                'output': current_output,
+                'minto_score': minto_score,
+                'feynman_score': feynman_score,
+                'combined_score': combined_score
+            })
+
+            # Check if threshold met
+            if combined_score >= SCORE_THRESHOLD:
+                print(f"\n✓ THRESHOLD MET! ({combined_score:.2f} >= {SCORE_THRESHOLD})")
+                break
 
-        # Check if threshold met
-        if combined_score >= SCORE_THRESHOLD:
-            print(f"\n✓ THRESHOLD MET! ({combined_score:.2f} >= {SCORE_THRESHOLD})")
-            break
+            # Refine if below threshold - Ask "What is limiting?"
+            print(f"\n>>> Score below threshold ({combined_score:.2f} < {SCORE_THRESHOLD})")
+            print(">>> Initiating ReAct refinement with limiting factor analysis...")
+
+            result = react_refine_prompt(
+                current_prompt, current_output,
+                minto_score, feynman_score,
+                minto_explanation, feynman_explanation,
+                user_prompt
+            )
+
+            # Add both Minto and Feynman winner to re-rank queue
+            rerank_queue.append({
+                'iteration': iteration + 1,
+                'prompt': result['minto_candidate']['variant'],
+                'output': result['minto_candidate']['output'],
+                'type': f"Iteration {iteration + 1} - Minto",
+                'minto_score': result['minto_candidate']['minto_score'],
+                'feynman_score': result['minto_candidate']['feynman_score'],
+                'combined_score': result['minto_candidate']['combined_score']
+            })
+
+            rerank_queue.append({
+                'iteration': iteration + 1,
+                'prompt': result['feynman_candidate']['variant'],
+                'output': result['feynman_candidate']['output'],
+                'type': f"Iteration {iteration + 1} - Feynman Winner",
+                'minto_score': result['feynman_candidate']['minto_score'],
+                'feynman_score': result['feynman_candidate']['feynman_score'],
+                'combined_score': result['feynman_candidate']['combined_score']
+            })
+
+            # Incremental rerank: only this iteration's new candidates are scored
+            ranked_so_far = cohere_rerank_candidates(rerank_queue, user_prompt)
+            leader_idx, leader_score = ranked_so_far[0]
+            print(f"\n🔄 Rerank leader so far: {rerank_queue[leader_idx]['type']} ({leader_score:.4f})")
+
+            # Check for improvement (use Feynman winner for next iteration)
+            if result['feynman_candidate']['combined_score'] > best_combined_score:
+                current_prompt = result['feynman_candidate']['variant']
+                best_combined_score = result['feynman_candidate']['combined_score']
+                print(f"\n✓ IMPROVED! New best combined score: {best_combined_score:.2f}")
+            else:
+                print(f"\n✗ No improvement ({result['feynman_candidate']['combined_score']:.2f} <= {best_combined_score:.2f})")
+                print("Stopping iteration.")
+                break
 
-        # Refine if below threshold - Ask "What is limiting?"
-        print(f"\n>>> Score below threshold ({combined_score:.2f} < {SCORE_THRESHOLD})")
-        print(">>> Initiating ReAct refinement with limiting factor analysis...")
+    final_rerank_report(rerank_queue, user_prompt, current_prompt)
 
-        result = react_refine_prompt(
-            current_prompt, current_output,
-            minto_score, feynman_score,
-            minto_explanation, feynman_explanation,
-            user_prompt
-        )
+    return history, rerank_queue
 
-        # Add both Minto and Feynman winner to re-rank queue
-        rerank_queue.append({
-            'iteration': iteration + 1,
-            'prompt': result['minto_candidate']['variant'],
-            'output': result['minto_candidate']['output'],
-            'type': f"Iteration {iteration + 1} - Minto",
-            'minto_score': result['minto_candidate']['minto_score'],
-            'feynman_score': result['minto_candidate']['feynman_score'],
-            'combined_score': result['minto_candidate']['combined_score']
-        })
+# Step 5b: Beam search - keep the top-K prompts and expand them all concurrently
+def _normalize_prompt(prompt):
+    return " ".join(prompt.lower().split())
 
-        rerank_queue.append({
-            'iteration': iteration + 1,
-            'prompt': result['feynman_candidate']['variant'],
-            'output': result['feynman_candidate']['output'],
-            'type': f"Iteration {iteration + 1} - Feynman Winner",
-            'minto_score': result['feynman_candidate']['minto_score'],
-            'feynman_score': result['feynman_candidate']['feynman_score'],
-            'combined_score': result['feynman_candidate']['combined_score']
-        })
+def dedupe_candidates(candidates, threshold=BEAM_DEDUP_THRESHOLD):
+    """Drop near-identical prompts, keeping the highest-scoring copy. Input must be sorted best-first."""
+    kept = []
+    for candidate in candidates:
+        normalized = _normalize_prompt(candidate['variant'])
+        if all(SequenceMatcher(None, normalized, _normalize_prompt(k['variant'])).ratio() < threshold for k in kept):
+            kept.append(candidate)
+    return kept
 
-        # Check for improvement (use Feynman winner for next iteration)
-        if result['feynman_candidate']['combined_score'] > best_combined_score:
-            current_prompt = result['feynman_candidate']['variant']
-            best_combined_score = result['feynman_candidate']['combined_score']
-            print(f"\n✓ IMPROVED! New best combined score: {best_combined_score:.2f}")
-        else:
-            print(f"\n✗ No improvement ({result['feynman_candidate']['combined_score']:.2f} <= {best_combined_score:.2f})")
-            print("Stopping iteration.")
-            break
+def beam_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS, beam_width=BEAM_WIDTH):
+    """
+    Beam search over prompts:
+    - Every prompt in the beam gets a full ReAct refinement, all concurrently
+    - Beam members + all their variants are deduplicated (near-identical prompts)
+      and pruned to the top `beam_width` by combined (Minto + Feynman) score
+    - Stops when the threshold is met or no new prompt makes it into the beam
+
+    Up to beam_width × MAX_CONCURRENCY Claude calls are in flight at once.
+    Returns (history, rerank_queue) like dual_judge_optimization_loop.
+    """
+    history = []
+    rerank_queue = []
+
+    print("\n" + "="*70)
+    print(f"BEAM SEARCH PROMPT OPTIMIZATION (beam width {beam_width})")
+    print("="*70)
+
+    # Seed the beam with the user's prompt
+    root = evaluate_variants([user_prompt], user_prompt)[0]
+    beam = [root]
+    print(f"\nSeed Prompt: {user_prompt}")
+    print(f"Generated Output: {root['output']}")
+    print(f"Minto: {root['minto_score']:.2f} | Feynman: {root['feynman_score']:.2f} | Combined: {root['combined_score']:.2f}")
+
+    for iteration in range(max_iterations):
+        with span("iteration", index=iteration + 1, beam_width=len(beam)):
+            print(f"\n{'#'*70}")
+            print(f"# BEAM ITERATION {iteration + 1}")
+            print(f"{'#'*70}")
+
+            for rank, member in enumerate(beam, 1):
+                history.append({
+                    'iteration': iteration + 1,
+                    'beam_rank': rank,
+                    'prompt': member['variant'],
+                    'output': member['output'],
+                    'minto_score': member['minto_score'],
+                    'feynman_score': member['feynman_score'],
+                    'combined_score': member['combined_score']
+                })
+
+            if beam[0]['combined_score'] >= SCORE_THRESHOLD:
+                print(f"\n✓ THRESHOLD MET! ({beam[0]['combined_score']:.2f} >= {SCORE_THRESHOLD})")
+                break
+
+            # Expand every beam member concurrently
+            with ThreadPoolExecutor(max_workers=len(beam)) as pool:
+                expansions = list(pool.map(
+                    in_context(lambda member: react_refine_prompt(
+                        member['variant'], member['output'],
+                        member['minto_score'], member['feynman_score'],
+                        member['minto_feedback'], member['feynman_feedback'],
+                        user_prompt
+                    )),
+                    beam
+                ))
+
+            new_candidates = [variant for expansion in expansions for variant in expansion['variants']]
+            for candidate in new_candidates:
+                rerank_queue.append({
+                    'iteration': iteration + 1,
+                    'prompt': candidate['variant'],
+                    'output': candidate['output'],
+                    'type': f"Iteration {iteration + 1} - Beam Variant",
+                    'minto_score': candidate['minto_score'],
+                    'feynman_score': candidate['feynman_score'],
+                    'combined_score': candidate['combined_score']
+                })
+
+            # Incremental rerank: only this iteration's new candidates are scored
+            if rerank_queue:
+                cohere_rerank_candidates(rerank_queue, user_prompt)
+
+            # Prune: dedupe near-identical prompts, keep the top-K by combined score
+            pool_ranked = sorted(beam + new_candidates, key=lambda x: x['combined_score'], reverse=True)
+            next_beam = dedupe_candidates(pool_ranked)[:beam_width]
+
+            print(f"\n🔭 Beam after iteration {iteration + 1} ({len(pool_ranked)} candidates → {len(next_beam)} kept):")
+            for rank, member in enumerate(next_beam, 1):
+                print(f"   {rank}. [{member['combined_score']:.2f}] {member['variant']}")
+
+            if all(member in beam for member in next_beam):
+                print("\n✗ No new prompt entered the beam. Stopping search.")
+                break
+            beam = next_beam
+
+    final_rerank_report(rerank_queue, user_prompt, beam[0]['variant'])
 
-    # FINAL RE-RANKING: Cohere Rerank evaluates ALL collected candidates ONCE
+    return history, rerank_queue
+
+# Step 6: Final re-ranking and report (shared by the single-path and beam loops)
+def final_rerank_report(rerank_queue, user_prompt, current_prompt):
+    # FINAL RE-RANKING: all candidates were already scored incrementally, so
+    # this reuses cached scores (no new rerank requests)
     print("\n" + "🔄"*35)
     print("🔄 FINAL COHERE RERANK RE-RANKING 🔄")
     print(f"Re-ranking {len(rerank_queue)} candidates from all iterations...")
-    print("Using Cohere rerank-english-v3.0")
+    print(f"Using {reranker.name}")
     print("🔄"*35)
 
     if rerank_queue:
@@ -521,7 +953,7 @@ def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS):
         for i, candidate in enumerate(rerank_queue, 1):
             print(f"   {i}. {candidate['type']}")
 
-        print(f"\n🔄 Re-ranking with Cohere Rerank v3.0...")
+        print(f"\n🔄 Re-ranking with {reranker.name}...")
         print(f"   Query: \"{user_prompt}\"")
 
         # Use Cohere to rerank based on query relevance
@@ -563,9 +995,8 @@ def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS):
     else:
         # No refinement happened, just show final result
         print("\nNo refinement iterations - showing final result only")
-        final_output = generate_output(current_prompt)
-        final_minto, _ = minto_judge_output(final_output, user_prompt)
-        final_feynman, _ = feynman_judge_output(final_output, user_prompt)
+        final_output = generate_output(current_prompt, priority="final")
+        (final_minto, _), (final_feynman, _) = judge_both(final_output, user_prompt)
         final_combined = (final_minto + final_feynman) / 2
 
         print(f"\nFinal Prompt:\n{current_prompt}")
@@ -579,9 +1010,96 @@ def dual_judge_optimization_loop(user_prompt, max_iterations=MAX_ITERATIONS):
     print("\n" + "="*70)
     print("OPTIMIZATION COMPLETE")
     print("="*70)
+    if RUN_STATS:
+        print_run_stats()
+
+def print_run_stats():
+    print_cache_stats(client)
+    print_scheduler_stats(client, _co)
+    if STREAMING:
+        print(stream_stats.report())
+    print(tracer.report())
+    print(parse_stats.report())
+    print(f"Rerank: {reranker.documents_scored} documents scored | {reranker.cache_hits} served from cache")
+    if halving_stats.runs:
+        print(halving_stats.report())
+    if pipeline_stats.runs:
+        print(pipeline_stats.report())
+    if dedup_index.active:
+        print(dedup_index.report())
+    if checkpoints.active:
+        print(checkpoints.report())
+
+# Step 7: Many prompts - one optimization per prompt across a worker pool
+def optimize_job(job):
+    """Optimize one prompt (a llmkit.jobs job); returns the best candidate found."""
+    history, rerank_queue = dual_judge_optimization_loop(job['prompt'], beam_width=BEAM_WIDTH)
+    if rerank_queue:
+        best = max(rerank_queue, key=lambda candidate: candidate.get('cohere_score', 0.0))
+    else:
+        best = max(history, key=lambda entry: entry['combined_score'])
+    return {
+        'best_prompt': best['prompt'],
+        'best_output': best['output'],
+        'combined_score': best['combined_score'],
+        'cohere_score': best.get('cohere_score'),
+        'iterations': max(entry['iteration'] for entry in history),
+    }
 
-    return history, rerank_queue
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimize a prompt with the Minto + Feynman judges and a final rerank.")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a crashed run: replay its recorded steps, then make the missing calls")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not record this run's steps")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Reuse earlier results (this run or past runs) for near-duplicate prompts and outputs")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="--dedup: cosine similarity that counts as a duplicate (default depends on the embedder)")
+    parser.add_argument("--beam-width", type=int, default=BEAM_WIDTH,
+                        help="Prompts kept per iteration; >1 refines them all concurrently (beam search)")
+    parser.add_argument("--fused-judge", action="store_true",
+                        help="One Claude call returns both the Minto and Feynman verdicts (half the judge requests)")
+    parser.add_argument("--halving-keep", type=float, default=HALVING_KEEP,
+                        help="Successive halving: judge only this fraction of each round's variants, best rerank first")
+    parser.add_argument("--judge-budget", type=int, default=JUDGE_BUDGET,
+                        help="At most this many variants per round reach the last judge (also turns halving on)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Stream variants through generate → judge → rerank stages instead of phases")
+    parser.add_argument("--word-budget", type=int, default=WORD_BUDGET,
+                        help="Stop each streamed generation once it passes this many words")
+    parser.add_argument("--prompts", help="Optimize every prompt in this file (one per line, or JSONL with id/prompt)")
+    parser.add_argument("--workers", type=int, default=4, help="--prompts: prompts optimized at once")
+    parser.add_argument("--output", default="results.jsonl", help="--prompts: one JSON line per finished prompt")
+    parser.add_argument("--log-dir", default="job_logs", help="--prompts: per-prompt logs")
+    return parser.parse_args()
 
 # Run the optimization
 if __name__ == "__main__":
-    history, final_output = dual_judge_optimization_loop(user_prompt)
\ No newline at end of file
+    args = parse_args()
+    if args.pipeline:
+        PIPELINE = True
+    if args.fused_judge:
+        FUSED_JUDGE = True
+    HALVING_KEEP = args.halving_keep
+    JUDGE_BUDGET = args.judge_budget
+    WORD_BUDGET = args.word_budget
+    BEAM_WIDTH = args.beam_width
+    if args.dedup:
+        dedup_index.open(threshold=args.dedup_threshold)
+    if args.prompts:
+        # Finished prompts are skipped on a rerun; --resume also replays the unfinished ones' steps
+        if not args.no_checkpoint:
+            checkpoints.open(resume=args.resume, params={'prompts': args.prompts})
+        RUN_STATS = False
+        JobRunner(optimize_job, args.workers, args.output, args.log_dir).run(load_jobs(args.prompts))
+        print_run_stats()
+    else:
+        params = {'user_prompt': user_prompt, 'max_iterations': MAX_ITERATIONS, 'beam_width': args.beam_width,
+                  'fused_judge': FUSED_JUDGE, 'halving_keep': HALVING_KEEP, 'judge_budget': JUDGE_BUDGET}
+        if not args.no_checkpoint:
+            params = checkpoints.open(resume=args.resume, params=params)  # A resumed run keeps its own settings
+        FUSED_JUDGE = params.get('fused_judge', FUSED_JUDGE)  # Its recorded judge steps are fused or separate
+        HALVING_KEEP = params.get('halving_keep', HALVING_KEEP)
+        JUDGE_BUDGET = params.get('judge_budget', JUDGE_BUDGET)
+        history, final_output = dual_judge_optimization_loop(params['user_prompt'], params['max_iterations'],
+                                                             params['beam_width'])
\ No newline at end of file
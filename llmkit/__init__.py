@@ -0,0 +1,11 @@
+"""
+Shared helpers for the LLMSupportEval and PromptAgentic scripts.
+
+The scripts add the repository root to sys.path and import from here, e.g.:
+
+    from llmkit.client import make_client
+    client = make_client()
+
+Modules are kept import-light on purpose: nothing heavy (torch, transformers,
+cohere) is imported until it is actually used.
+"""
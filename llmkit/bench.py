@@ -0,0 +1,212 @@
+"""
+Offline benchmark of the optimization loops against llmkit.mockserver.
+
+Starts a mock API server in-process, points every SDK at it, imports the
+scripts and runs their loops with fixed mock latencies, so differences in
+wall-clock and request counts come from the orchestration code:
+
+    python -m llmkit.bench                                  # all scenarios
+    python -m llmkit.bench --scenario simpePrompt --iterations 2
+    python -m llmkit.bench --save-baseline bench_baseline.json
+    python -m llmkit.bench --baseline bench_baseline.json --tolerance 0.15
+
+With --baseline, exits non-zero when a scenario's wall-clock or request
+count exceeds the baseline by more than the tolerance.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from llmkit.mockserver import MockServer, add_config_arguments, config_from_args
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_script(relative_path):
+    """Import a script by path (the scripts are not packages)."""
+    path = os.path.join(REPO_ROOT, relative_path)
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    sys.path.insert(0, os.path.dirname(path))  # Sibling imports (e.g. calibrate -> simpePrompt)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def run_loop(iterations):
+    loop = load_script("LLMSupportEval/loop.py")
+    history, _, _ = loop.optimization_loop(loop.initial_prompt, loop.reference_output,
+                                           max_iterations=iterations, use_bertscore=False)
+    return len(history)
+
+
+def run_simpe_prompt(iterations, halving_keep=1.0, pipeline=False):
+    sp = load_script("PromptAgentic/simpePrompt.py")
+    sp.HALVING_KEEP = halving_keep
+    sp.PIPELINE = pipeline
+    history, _ = sp.dual_judge_optimization_loop(sp.user_prompt, max_iterations=iterations)
+    return len(history)
+
+
+def run_simpe_prompt_halving(iterations):
+    return run_simpe_prompt(iterations, halving_keep=0.5)
+
+
+def run_simpe_prompt_pipeline(iterations):
+    return run_simpe_prompt(iterations, pipeline=True)
+
+
+def run_crewai(iterations, mode="crew"):
+    agent = load_script("PromptAgentic/promptAgent.py")
+    history, _ = agent.run_crewai_optimization(agent.initial_prompt, agent.reference_output, max_iterations=iterations,
+                                               mode=mode, use_bertscore=False)
+    return len(history)
+
+
+def run_crewai_direct(iterations):
+    return run_crewai(iterations, mode="direct")
+
+
+SCENARIOS = {
+    "loop": run_loop,  # LLMSupportEval/loop.py optimization_loop (judge only, no BERTScore)
+    "simpePrompt": run_simpe_prompt,  # PromptAgentic/simpePrompt.py dual_judge_optimization_loop
+    "simpePrompt-halving": run_simpe_prompt_halving,  # The same loop judging only the top half of each rerank
+    "simpePrompt-pipeline": run_simpe_prompt_pipeline,  # The same loop with variants streamed through bounded queues
+    "crewai": run_crewai,  # PromptAgentic/promptAgent.py run_crewai_optimization
+    "crewai-direct": run_crewai_direct,  # The same tasks run straight on the tools (mode="direct")
+}
+
+
+def run_scenario(name, server, iterations, repeat, verbose):
+    runs = []
+    for _ in range(repeat):
+        server.stats.reset()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+            completed = SCENARIOS[name](iterations)
+        wall = time.perf_counter() - start
+        stats = server.stats.snapshot()
+        runs.append({
+            'wall_seconds': wall,
+            'iterations': completed,
+            'requests': stats['total_requests'],
+            'requests_by_endpoint': stats['requests'],
+            'requests_per_iteration': stats['total_requests'] / max(completed, 1),
+            'errors_injected': sum(stats['errors'].values()),
+            'input_tokens': stats['input_tokens'],
+            'output_tokens': stats['output_tokens'],
+            'cache_read_tokens': stats['cache_read_tokens'],
+            'cache_write_tokens': stats['cache_write_tokens'],
+            'latency_p50': stats['latency_p50'],
+            'latency_p95': stats['latency_p95'],
+        })
+    # Median run by wall-clock; mock responses are deterministic, so counts match across runs
+    result = sorted(runs, key=lambda run: run['wall_seconds'])[len(runs) // 2]
+    result['wall_seconds_all'] = [run['wall_seconds'] for run in runs]
+    return result
+
+
+def print_results(results):
+    print(f"\n{'='*113}")
+    print("BENCHMARK (mock API)")
+    print(f"{'='*113}")
+    print(f"{'Scenario':<21}{'Wall s':>9}{'Iters':>7}{'Reqs':>7}{'Reqs/it':>9}{'Errors':>8}"
+          f"{'In tok':>10}{'Out tok':>10}{'PC read':>10}{'p50 s':>9}{'p95 s':>9}")
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<21}skipped: {result['skipped']}")
+            continue
+        print(f"{name:<21}{result['wall_seconds']:>9.2f}{result['iterations']:>7}{result['requests']:>7}"
+              f"{result['requests_per_iteration']:>9.1f}{result['errors_injected']:>8}{result['input_tokens']:>10}"
+              f"{result['output_tokens']:>10}{result['cache_read_tokens']:>10}{result['latency_p50']:>9.3f}"
+              f"{result['latency_p95']:>9.3f}")
+    # e.g. CrewAI agent turns (/v1/chat/completions) vs tool calls (/v1/messages)
+    print("\nRequests by endpoint:")
+    for name, result in results.items():
+        if 'skipped' not in result:
+            print(f"  {name:<21}" + ", ".join(f"{endpoint} {count}"
+                                             for endpoint, count in sorted(result['requests_by_endpoint'].items())))
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Print regressions against a saved run; returns True if none."""
+    ok = True
+    print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if 'skipped' in result or not before or 'skipped' in before:
+            continue
+        for metric in ('wall_seconds', 'requests'):
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            regressed = change > tolerance
+            ok = ok and not regressed
+            print(f"  {name:<21}{metric:<14}{before[metric]:>10.2f} -> {result[metric]:>10.2f} "
+                  f"({change:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the optimization loops against a mock API.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--iterations", type=int, default=3, help="max_iterations passed to each loop")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; the median is reported")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--save-baseline", help="Write results as a baseline JSON file")
+    parser.add_argument("--baseline", help="Compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the scripts' own output")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    for option in ("output", "save_baseline", "baseline"):
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+
+    server = MockServer(config_from_args(args)).start()
+    os.environ.update(server.env())
+    os.environ.update({
+        "ANTHROPIC_API_KEY": "mock", "COHERE_API_KEY": "mock", "OPENAI_API_KEY": "mock",
+        "RERANKER": "cohere",  # Rerank through the mock instead of loading a local model
+        # Measure orchestration, not throttling or replays
+        "ANTHROPIC_RPM": "0", "ANTHROPIC_INPUT_TPM": "0", "ANTHROPIC_OUTPUT_TPM": "0", "COHERE_RPM": "0",
+        "LLM_CACHE": "off",
+    })
+    os.chdir(tempfile.mkdtemp(prefix="llmkit-bench-"))  # Keep stray files out of the repo
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        try:
+            results[name] = run_scenario(name, server, args.iterations, args.repeat, args.verbose)
+        except ImportError as exc:
+            results[name] = {'skipped': f"missing dependency ({exc.name})"}
+    server.stop()
+
+    print_results(results)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare_to_baseline(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Long-lived BERTScore scorer.
+
+`evaluate.load("bertscore").compute(...)` re-tokenizes and re-embeds the
+reference on every call. The optimization loops score many candidates
+against one fixed reference, so this scorer:
+
+  - loads the model once (lazily, on first use)
+  - caches each reference's token embeddings
+  - embeds a batch of candidates in one forward pass
+  - memoizes (candidate, reference) -> (precision, recall, f1)
+
+Scores match evaluate's `lang="en"` defaults: roberta-large, layer 17,
+greedy cosine matching, no idf weighting, no baseline rescaling.
+"""
+
+import threading
+from collections import OrderedDict
+
+from llmkit.telemetry import span
+
+DEFAULT_MODEL = "roberta-large"
+DEFAULT_NUM_LAYERS = 17  # bert_score's default layer for roberta-large
+
+
+class BertScorer:
+    name = "BERTScore"
+
+    def __init__(self, model_type=DEFAULT_MODEL, num_layers=DEFAULT_NUM_LAYERS, device=None,
+                 batch_size=32, max_length=510, memo_size=4096):
+        self.model_type = model_type
+        self.num_layers = num_layers
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.memo_size = memo_size
+        self._tokenizer = None
+        self._model = None
+        self._reference_embeddings = {}
+        self._memo = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _load_tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            # bert_score encodes roberta/gpt-style inputs with a leading space
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_type, add_prefix_space=True)
+        return self._tokenizer
+
+    def _load(self):
+        if self._model is not None:
+            return
+        import torch
+        from transformers import AutoModel
+
+        if self.device is None:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._load_tokenizer()
+        model = AutoModel.from_pretrained(self.model_type)
+        model.encoder.layer = model.encoder.layer[:self.num_layers]  # Same truncation as bert_score
+        self._model = model.to(self.device).eval()
+
+    def tokenize(self, texts, return_tensors="pt"):
+        """input_ids, attention_mask and special_tokens_mask, padded to the longest text."""
+        return self._load_tokenizer()(
+            [text.strip() for text in texts], padding=True, truncation=True, max_length=self.max_length,
+            return_tensors=return_tensors, return_special_tokens_mask=True,
+        )
+
+    def embed_encoded(self, input_ids, attention_mask, special_tokens_mask):
+        """Token embeddings for already-tokenized texts (tensors or NumPy arrays), batch_size rows at a time."""
+        import torch
+
+        self._load()
+        input_ids, attention_mask, special_tokens_mask = (
+            torch.as_tensor(values) for values in (input_ids, attention_mask, special_tokens_mask))
+        embeddings = []
+        for start in range(0, len(input_ids), self.batch_size):
+            mask = attention_mask[start:start + self.batch_size]
+            width = int(mask.sum(dim=1).max())  # Right padding: drop columns no row in this batch uses
+            mask = mask[:, :width]
+            with torch.no_grad():
+                hidden = self._model(
+                    input_ids=input_ids[start:start + self.batch_size, :width].to(self.device),
+                    attention_mask=mask.to(self.device),
+                ).last_hidden_state
+            hidden = hidden / hidden.norm(dim=-1, keepdim=True)
+            keep = mask.bool() & ~special_tokens_mask[start:start + self.batch_size, :width].bool()
+            for i in range(len(mask)):
+                embeddings.append(hidden[i][keep[i].to(self.device)])
+        return embeddings
+
+    def embed(self, texts):
+        """L2-normalized token embeddings per text, special tokens removed."""
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self.tokenize(texts[start:start + self.batch_size])
+            embeddings.extend(self.embed_encoded(encoded["input_ids"], encoded["attention_mask"],
+                                                 encoded["special_tokens_mask"]))
+        return embeddings
+
+    def _reference_embedding(self, reference):
+        if reference not in self._reference_embeddings:
+            self._reference_embeddings[reference] = self.embed([reference])[0]
+        return self._reference_embeddings[reference]
+
+    @staticmethod
+    def _greedy_match(candidate_emb, reference_emb):
+        if len(candidate_emb) == 0 or len(reference_emb) == 0:
+            return 0.0, 0.0, 0.0
+        similarity = candidate_emb @ reference_emb.T
+        precision = similarity.max(dim=1).values.mean().item()
+        recall = similarity.max(dim=0).values.mean().item()
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return precision, recall, f1
+
+    def _remember(self, key, value):
+        self._memo[key] = value
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def clear(self):
+        """Forget memoized scores and reference embeddings (the model stays loaded)."""
+        with self._lock:
+            self._memo.clear()
+            self._reference_embeddings.clear()
+
+    def score(self, candidates, references):
+        """
+        Score candidates against references.
+
+        `references` is either one string shared by all candidates, or a list
+        aligned with `candidates` whose items are a string or a list of
+        alternatives (the best-matching alternative wins, as in bert_score).
+
+        Returns {'precision': [...], 'recall': [...], 'f1': [...]} like
+        evaluate's bertscore.compute.
+        """
+        if isinstance(references, str):
+            references = [references] * len(candidates)
+        reference_sets = [[r] if isinstance(r, str) else list(r) for r in references]
+
+        with span("bertscore.score", kind="bertscore", model=self.model_type, candidates=len(candidates)) as active, \
+                self._lock:
+            results = [None] * len(candidates)
+            pending = []
+            for i, (candidate, refs) in enumerate(zip(candidates, reference_sets)):
+                key = (candidate, tuple(refs))
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    results[i] = self._memo[key]
+                else:
+                    pending.append(i)
+
+            if pending:
+                # One forward pass over every unseen candidate
+                unique_candidates = list(dict.fromkeys(candidates[i] for i in pending))
+                candidate_embeddings = dict(zip(unique_candidates, self.embed(unique_candidates)))
+                for i in pending:
+                    candidate_emb = candidate_embeddings[candidates[i]]
+                    best = max(
+                        (self._greedy_match(candidate_emb, self._reference_embedding(ref)) for ref in reference_sets[i]),
+                        key=lambda prf: prf[2],
+                    )
+                    results[i] = best
+                    self._remember((candidates[i], tuple(reference_sets[i])), best)
+            active.set(memo_hits=len(candidates) - len(pending))
+
+        return {
+            'precision': [p for p, _, _ in results],
+            'recall': [r for _, r, _ in results],
+            'f1': [f for _, _, f in results],
+        }
+
+
+_default_scorer = None
+_default_lock = threading.Lock()
+
+
+def get_scorer():
+    """Process-wide BertScorer, created on first use."""
+    global _default_scorer
+    with _default_lock:
+        if _default_scorer is None:
+            _default_scorer = BertScorer()
+        return _default_scorer
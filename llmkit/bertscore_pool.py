@@ -0,0 +1,176 @@
+"""
+BERTScore in a pool of worker processes, for CPU-only machines.
+
+    pool = BertScorePool(workers=2)                    # or make_scorer("bertscore-pool")
+    future = pool.score_async(outputs, reference)      # returns at once
+    judge_score = llm_judge(...)                       # API call in flight meanwhile
+    f1 = future.result()['f1']
+
+In-process BERTScore holds the calling thread for the whole roberta-large
+forward pass. This pool runs the passes in separate processes instead.
+Each worker loads the model once and runs torch with `threads_per_worker`
+threads, so by default the workers together use every core. Meanwhile the
+caller keeps sending API requests.
+
+This process only tokenizes. The padded input_ids / attention_mask /
+special_tokens_mask block goes to the worker through a SharedMemory
+segment. Only the segment name and the row indices are pickled. Results
+come back as plain floats.
+
+score() is the blocking form, so the pool is a drop-in llmkit.similarity
+scorer. score_async() returns a concurrent.futures.Future; in asyncio code,
+`await asyncio.wrap_future(pool.score_async(...))`.
+
+Workers are started with "spawn": forking a process that has already
+initialized torch's thread pools can deadlock. BERTSCORE_WORKERS sets the
+default worker count.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from llmkit.bertscore import DEFAULT_MODEL, DEFAULT_NUM_LAYERS, BertScorer
+
+DEFAULT_WORKERS = 2  # Each worker holds its own roberta-large (~1.5 GB)
+
+_worker_scorer = None  # The model, once per worker process
+
+
+def _init_worker(model_type, num_layers, threads, batch_size, max_length):
+    global _worker_scorer
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    _worker_scorer = BertScorer(model_type, num_layers, device="cpu", batch_size=batch_size, max_length=max_length)
+    _worker_scorer._load()
+
+
+def _attach(segment):
+    """Open the caller's segment without registering it with the resource tracker: the caller unlinks it."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=segment, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None  # Workers run one task at a time
+    try:
+        return SharedMemory(name=segment)
+    finally:
+        resource_tracker.register = register
+
+
+def _score_block(segment, shape, candidate_rows, reference_rows):
+    """Embed the shared token block and greedy-match each candidate row against its reference rows."""
+    start = time.perf_counter()
+    shared = _attach(segment)
+    try:
+        block = np.ndarray(shape, dtype=np.int64, buffer=shared.buf).copy()
+    finally:
+        shared.close()
+    embeddings = _worker_scorer.embed_encoded(block[0], block[1], block[2])
+    results = []
+    for row, refs in zip(candidate_rows, reference_rows):
+        results.append(max((BertScorer._greedy_match(embeddings[row], embeddings[ref]) for ref in refs),
+                           key=lambda prf: prf[2]))
+    return {
+        'precision': [p for p, _, _ in results],
+        'recall': [r for _, r, _ in results],
+        'f1': [f for _, _, f in results],
+        'worker_seconds': time.perf_counter() - start,
+    }
+
+
+class BertScorePool:
+    name = "BERTScore (process pool)"
+
+    def __init__(self, workers=None, threads_per_worker=None, model_type=DEFAULT_MODEL,
+                 num_layers=DEFAULT_NUM_LAYERS, batch_size=32, max_length=510):
+        cores = os.cpu_count() or 1
+        self.workers = workers or int(os.getenv("BERTSCORE_WORKERS", min(DEFAULT_WORKERS, cores)))
+        self.threads_per_worker = threads_per_worker or max(1, cores // self.workers)
+        self._tokenizer = BertScorer(model_type, num_layers, batch_size=batch_size, max_length=max_length)
+        self._initargs = (model_type, num_layers, self.threads_per_worker, batch_size, max_length)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.candidates = 0
+        self.worker_seconds = 0.0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=_init_worker, initargs=self._initargs)
+            return self._executor
+
+    def score_async(self, candidates, references):
+        """
+        Future of BertScorer.score's result for the same arguments: one
+        reference string, or per candidate a string or list of alternatives.
+        """
+        if not candidates:
+            empty = Future()
+            empty.set_result({'precision': [], 'recall': [], 'f1': []})
+            return empty
+        if isinstance(references, str):
+            references = [references] * len(candidates)
+        reference_sets = [[r] if isinstance(r, str) else list(r) for r in references]
+        texts = list(dict.fromkeys(list(candidates) + [ref for refs in reference_sets for ref in refs]))
+        row = {text: i for i, text in enumerate(texts)}
+
+        encoded = self._tokenizer.tokenize(texts, return_tensors="np")
+        block = np.stack([encoded["input_ids"], encoded["attention_mask"],
+                          encoded["special_tokens_mask"]]).astype(np.int64)
+        shared = SharedMemory(create=True, size=block.nbytes)
+        np.ndarray(block.shape, dtype=np.int64, buffer=shared.buf)[:] = block
+
+        scores = Future()
+
+        def release():
+            shared.close()
+            shared.unlink()
+
+        def finished(done):
+            release()
+            if done.exception() is not None:
+                scores.set_exception(done.exception())
+                return
+            result = dict(done.result())
+            with self._lock:
+                self.batches += 1
+                self.candidates += len(candidates)
+                self.worker_seconds += result.pop('worker_seconds')
+            scores.set_result(result)
+        try:
+            submitted = self._pool().submit(_score_block, shared.name, block.shape, [row[c] for c in candidates],
+                                            [[row[ref] for ref in refs] for refs in reference_sets])
+        except BaseException:
+            release()  # Broken or shut-down pool: nothing will read the segment
+            raise
+        submitted.add_done_callback(finished)
+        return scores
+
+    def score(self, candidates, references):
+        """Blocking form of score_async (BertScorer's interface)."""
+        return self.score_async(candidates, references).result()
+
+    def clear(self):
+        """Nothing is memoized in this process (llmkit.scorebench calls this between runs)."""
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def report(self):
+        return (f"BERTScore pool: {self.workers} workers x {self.threads_per_worker} torch threads | "
+                f"{self.candidates} candidates in {self.batches} batches | {self.worker_seconds:.2f}s worker time")
@@ -0,0 +1,226 @@
+"""
+Persistent, content-addressed cache for Claude `messages.create` calls.
+
+Responses are stored in SQLite keyed on a SHA-256 of the full request
+(model, temperature, max_tokens, messages, system, tools, ...). Only
+low-temperature calls are cached: a judge at temperature 0.1 should give
+the same verdict on replay, a generator at 0.7 should not. The SQLite file
+is opened on the first lookup, not when the client is built, so a script
+that never calls the API never creates it.
+
+Eviction:
+  - TTL: entries older than `ttl` seconds are ignored, and purged whenever
+    the cache evicts
+  - Size: at most `max_entries` rows, least recently used dropped first.
+    Eviction runs when the cache is opened and when an insert takes it past
+    max_entries; it then trims to EVICT_TO of the cap, so a full cache
+    does not run the DELETE on every insert.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from llmkit.telemetry import annotate
+
+DEFAULT_PATH = ".llm_cache.sqlite"
+DEFAULT_MAX_TEMPERATURE = 0.2
+DEFAULT_TTL = 7 * 24 * 3600  # one week
+DEFAULT_MAX_ENTRIES = 50000
+EVICT_TO = 0.9  # Size eviction trims to this fraction of max_entries
+API_DEFAULT_TEMPERATURE = 1.0  # What the Messages API uses when temperature is omitted
+
+
+# Options for the wrapped client (e.g. the scheduler's priority), not part
+# of the request itself: they must not change the cache key
+ROUTING_OPTIONS = ("priority",)
+
+
+def request_key(request):
+    """SHA-256 over the canonical JSON form of a request."""
+    request = {key: value for key, value in request.items() if key not in ROUTING_OPTIONS}
+    payload = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed response store with TTL/size eviction and hit/miss counters."""
+
+    def __init__(self, path=DEFAULT_PATH, max_temperature=DEFAULT_MAX_TEMPERATURE,
+                 ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._conn = None  # Opened on first use, so importing a script creates no file
+        self._rows = 0  # Row count as of the last eviction plus inserts since (replacements overcount)
+
+    def _db(self):
+        """The connection, opened and evicted on first use. Call with the lock held."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                       key TEXT PRIMARY KEY,
+                       model TEXT,
+                       temperature REAL,
+                       max_tokens INTEGER,
+                       response TEXT NOT NULL,
+                       created_at REAL NOT NULL,
+                       accessed_at REAL NOT NULL
+                   )"""
+            )
+            self._conn.commit()
+            self._evict()
+        return self._conn
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache from LLM_CACHE_* environment variables.
+        Returns None when LLM_CACHE=off.
+        """
+        if os.getenv("LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_PATH),
+            max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", DEFAULT_MAX_TEMPERATURE)),
+            ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+
+    def cacheable(self, request):
+        """Policy: only cache (near-)deterministic calls."""
+        temperature = request.get("temperature", API_DEFAULT_TEMPERATURE)
+        return temperature <= self.max_temperature
+
+    def note_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def get(self, key):
+        """Return the stored response dict, or None on a miss/expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._db().execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, request, response):
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, request.get("model"), request.get("temperature"), request.get("max_tokens"),
+                 json.dumps(response), now, now),
+            )
+            self._conn.commit()
+            self._rows += 1
+            full = self.max_entries and self._rows > self.max_entries
+        if full:
+            self.evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._db().execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above EVICT_TO x max_entries."""
+        with self._lock:
+            if self._conn is None:
+                self._db()  # Opening evicts
+            else:
+                self._evict()
+
+    def _evict(self):
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            self._conn.execute(
+                """DELETE FROM responses WHERE key IN (
+                       SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (int(self.max_entries * EVICT_TO),),
+            )
+        self._conn.commit()
+        self._rows = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            if self._conn is None and not os.path.exists(self.path):
+                return 0  # Never used: don't create the file just to count it
+            return self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self),
+        }
+
+
+class CachedMessages:
+    """Drop-in for `client.messages` that serves cacheable requests from disk."""
+
+    def __init__(self, client, cache):
+        self._client = client
+        self._cache = cache
+
+    @property
+    def _messages(self):
+        # Resolved per call so a lazily-constructed client stays lazy
+        return self._client.messages
+
+    def create(self, **request):
+        if not self._cache.cacheable(request):
+            self._cache.note_bypass()
+            return self._messages.create(**request)
+
+        key = request_key(request)
+        stored = self._cache.get(key)
+        if stored is not None:
+            annotate(cache_hit=True)
+            from anthropic.types import Message
+            return Message.model_validate(stored)
+
+        response = self._messages.create(**request)
+        self._cache.put(key, request, response.model_dump(mode="json"))
+        return response
+
+    def forget(self, **request):
+        """Remove the cached response for this exact request (e.g. it failed to parse)."""
+        self._cache.delete(request_key(request))
+
+    def __getattr__(self, name):
+        # stream, batches, count_tokens, ... go straight to the real client
+        return getattr(self._messages, name)
+
+
+class CachedClient:
+    """Wraps an Anthropic client; everything except messages.create passes through."""
+
+    def __init__(self, client, cache):
+        self._client = client
+        self.cache = cache
+        self.messages = CachedMessages(client, cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
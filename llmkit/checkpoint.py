@@ -0,0 +1,140 @@
+"""
+Append-only run checkpoints, so a crashed optimization loop can resume.
+
+Every paid step (a generation, a judgment, a rerank) is appended to a JSONL
+file as soon as it completes. A resumed run replays the recorded results in
+place of the calls, which rebuilds history/rerank_queue exactly. It then
+continues with live calls from the first step that has no record:
+
+    @traced("generate")
+    @checkpointed("generate")
+    def generate_output(prompt, priority="explore"): ...
+
+    checkpoints.open()                    # new run; prints its id
+    checkpoints.open(resume="20250101-120000-ab12cd")
+
+A step is identified by its kind, its arguments and how many times that
+exact call has been made in the run so far. The loops are deterministic
+given the step results, so a replay asks for the same steps in the same
+order. Steps made concurrently with different arguments are matched
+independently. With no open run, checkpointed functions just run.
+
+One file per run under LLM_CHECKPOINT_DIR (default .llm_checkpoints). The
+first line holds the run's parameters. A line cut off by a crash is ignored.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from llmkit.telemetry import annotate
+
+DEFAULT_DIR = ".llm_checkpoints"
+
+
+def step_key(kind, args, kwargs):
+    payload = json.dumps([kind, args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class CheckpointStore:
+    def __init__(self):
+        self.run_id = None
+        self.path = None
+        self.params = {}
+        self.replayed = 0
+        self.recorded = 0
+        self._steps = {}  # (key, occurrence) -> value
+        self._calls = {}  # key -> calls made so far in this process
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    def open(self, resume=None, params=None, directory=None):
+        """
+        Start a new run (recording `params`), or resume run id `resume`.
+        Returns the run's params: on resume, the ones it was started with.
+        """
+        directory = directory or os.getenv("LLM_CHECKPOINT_DIR", DEFAULT_DIR)
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = resume or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.path = os.path.join(directory, f"{self.run_id}.jsonl")
+        if resume:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"No checkpoint for run {resume} ({self.path})")
+            self._load()
+            print(f"Resuming run {self.run_id}: {len(self._steps)} completed steps on record")
+        else:
+            self.params = dict(params or {})
+        self._file = open(self.path, "a")
+        if not resume:
+            self._append({'type': "run", 'run_id': self.run_id, 'created': time.time(), 'params': self.params})
+            print(f"Run {self.run_id} (checkpoint {self.path}; resume with --resume {self.run_id})")
+        return self.params
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partial last line from a crash
+                if entry.get('type') == "run":
+                    self.params = entry.get('params', {})
+                elif entry.get('type') == "step":
+                    self._steps[(entry['key'], entry['occurrence'])] = entry['value']
+
+    def _append(self, entry):
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+
+    def call(self, kind, fn, *args, **kwargs):
+        """fn(*args, **kwargs), or its recorded result when the run already made this step."""
+        if not self.active:
+            return fn(*args, **kwargs)
+        key = step_key(kind, args, kwargs)
+        with self._lock:
+            occurrence = self._calls.get(key, 0)
+            self._calls[key] = occurrence + 1
+            if (key, occurrence) in self._steps:
+                self.replayed += 1
+                annotate(checkpoint="replayed")
+                return self._steps[(key, occurrence)]
+        value = fn(*args, **kwargs)
+        # Stored as JSON: tuples come back as lists on replay (unpacking works the same)
+        value = json.loads(json.dumps(value, default=str))
+        with self._lock:
+            self._steps[(key, occurrence)] = value
+            self.recorded += 1
+            self._append({'type': "step", 'kind': kind, 'key': key, 'occurrence': occurrence,
+                          'at': time.time(), 'value': value})
+        return value
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self):
+        return (f"Checkpoint {self.run_id}: {self.replayed} steps replayed | {self.recorded} recorded | "
+                f"{self.path}")
+
+
+checkpoints = CheckpointStore()
+
+
+def checkpointed(kind):
+    """Decorator: record each call's result in the open run and replay it on resume."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return checkpoints.call(kind, fn, *args, **kwargs)
+        return wrapper
+    return decorator
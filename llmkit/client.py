@@ -0,0 +1,84 @@
+"""
+Shared Claude client factory.
+
+All scripts build their client here so that cross-cutting behaviour
+(response caching, rate limiting, ...) is configured in one place:
+
+    client = make_client()
+    response = client.messages.create(model=..., messages=[...])
+
+Call chain: telemetry -> response cache -> scheduler -> Anthropic SDK.
+Cache hits never wait for rate-limit capacity; the SDK's own retries are
+off because the scheduler retries with backoff and a shared view of the
+limits.
+"""
+
+import os
+import threading
+
+from llmkit.cache import CachedClient, ResponseCache
+from llmkit.scheduler import (DEFAULT_ANTHROPIC_INPUT_TPM, DEFAULT_ANTHROPIC_OUTPUT_TPM, DEFAULT_ANTHROPIC_RPM,
+                              DEFAULT_COHERE_RPM, ScheduledClient, ScheduledCohere, limiter_from_env)
+from llmkit.telemetry import TracedClient
+
+
+class LazyClient:
+    """
+    Builds the Anthropic client on first attribute access. Importing the SDK
+    takes a noticeable part of a second, so scripts construct their client at
+    import time without paying for it until the first call.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        with self._lock:
+            if self._client is None:
+                from anthropic import Anthropic
+                self._client = Anthropic(**self._kwargs)
+        return getattr(self._client, name)
+
+
+def make_client(api_key=None):
+    """
+    Anthropic client behind the rate-limit scheduler (ANTHROPIC_RPM/_TPM env
+    vars) and the on-disk response cache (LLM_CACHE_* env vars), with a
+    telemetry span per call (LLM_TRACE_PATH).
+    """
+    client = LazyClient(api_key=api_key or os.getenv("ANTHROPIC_API_KEY"), max_retries=0)
+    limiter = limiter_from_env("anthropic", "ANTHROPIC", DEFAULT_ANTHROPIC_RPM,
+                               DEFAULT_ANTHROPIC_INPUT_TPM, DEFAULT_ANTHROPIC_OUTPUT_TPM)
+    client = ScheduledClient(client, limiter)
+    cache = ResponseCache.from_env()
+    if cache is not None:
+        client = CachedClient(client, cache)
+    return TracedClient(client)
+
+
+def make_cohere_client(api_key=None):
+    """cohere.Client with rerank behind its own scheduler (COHERE_RPM env var)."""
+    import cohere
+    client = cohere.Client(api_key=api_key or os.getenv("COHERE_API_KEY"), max_retries=0)
+    return ScheduledCohere(client, limiter_from_env("cohere", "COHERE", DEFAULT_COHERE_RPM))
+
+
+def print_cache_stats(client):
+    """Print response-cache counters, if the client has a cache."""
+    cache = getattr(client, "cache", None)
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"Response cache: {stats['hits']} hits | {stats['misses']} misses | "
+          f"{stats['bypassed']} uncacheable | hit rate {stats['hit_rate']:.0%} | "
+          f"{stats['entries']} entries")
+
+
+def print_scheduler_stats(*clients):
+    """Print rate-limit scheduler counters for each client that has one."""
+    for client in clients:
+        limiter = getattr(client, "scheduler", None)
+        if limiter is not None:
+            print(limiter.report())
@@ -0,0 +1,177 @@
+"""
+Semantic dedup: reuse the result of a near-identical earlier call.
+
+Prompt variants proposed in different iterations (or different runs) are
+often rewordings of each other. Each paid step is indexed by the embedding
+of its main text: a generation by its prompt, a judgment by the output it
+judged. A later call whose text is at least `threshold` cosine-similar to
+an indexed one, with the same remaining arguments, gets the stored result
+instead of a new request:
+
+    @traced("generate")
+    @deduplicated("generate")
+    @checkpointed("generate")
+    def generate_output(prompt, priority="explore"): ...
+
+    dedup_index.open()              # loads earlier runs' entries
+
+A near-duplicate variant prompt therefore gets the earlier output back,
+and the judges see the exact text they already scored. No call is made.
+
+Vectors are L2-normalized rows of one NumPy array, so a lookup is a
+single matrix-vector product. Entries are appended to LLM_DEDUP_PATH
+(default .llm_dedup.jsonl) as they are made, so they carry over to later
+runs and survive a crash. With no open index, decorated functions just run.
+
+Embedders (llmkit.similarity; LLM_DEDUP_EMBEDDER=sentence|hashing):
+  - SentenceEmbedder: sentence-transformers all-MiniLM-L6-v2 (the default
+    when sentence-transformers is installed)
+  - HashingEmbedder: hashed character 3-grams, NumPy only. Catches
+    rewordings that share most of their text, not paraphrases.
+"""
+
+import functools
+import importlib.util
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from llmkit.cache import ROUTING_OPTIONS
+from llmkit.similarity import HashingEmbedder, SentenceEmbedder
+from llmkit.telemetry import annotate
+
+DEFAULT_PATH = ".llm_dedup.jsonl"
+
+
+def make_embedder():
+    """sentence-transformers when installed, hashed 3-grams otherwise; LLM_DEDUP_EMBEDDER forces one."""
+    backend = os.getenv("LLM_DEDUP_EMBEDDER")
+    if backend == "hashing" or (backend is None and importlib.util.find_spec("sentence_transformers") is None):
+        return HashingEmbedder()
+    return SentenceEmbedder()
+
+
+def call_context(kind, args, kwargs):
+    """Everything but the indexed text must match exactly (routing options like priority excepted)."""
+    kwargs = {key: value for key, value in kwargs.items() if key not in ROUTING_OPTIONS}
+    return json.dumps([kind, args, kwargs], sort_keys=True, default=str)
+
+
+def dump_vector(vector):
+    """Sparse JSON form: [dims, [[index, value], ...]] (hashed 3-gram vectors are mostly zeros)."""
+    indices = np.flatnonzero(vector)
+    return [len(vector), [[int(i), round(float(vector[i]), 6)] for i in indices]]
+
+
+def load_vector(stored):
+    dims, entries = stored
+    vector = np.zeros(dims, dtype=np.float32)
+    for index, value in entries:
+        vector[index] = value
+    return vector
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.embedder = None
+        self.threshold = None
+        self.path = None
+        self.lookups = Counter()
+        self.reused = Counter()
+        self._vectors = None  # (capacity, dims) float32, first `_size` rows in use
+        self._size = 0
+        self._rows = {}  # Call context -> its rows
+        self._values = []  # Row -> stored result
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    def open(self, path=None, threshold=None, embedder=None):
+        """Load the entries earlier runs made with the same embedder, then record new ones."""
+        self.embedder = embedder or make_embedder()
+        self.threshold = threshold or float(os.getenv("LLM_DEDUP_THRESHOLD", self.embedder.threshold))
+        self.path = path or os.getenv("LLM_DEDUP_PATH", DEFAULT_PATH)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partial last line from a crash
+                    if entry.get('embedder') == self.embedder.name:
+                        self._insert(load_vector(entry['vector']), entry['context'], entry['value'])
+        self._file = open(self.path, "a")
+        print(f"Dedup index {self.path}: {self._size} entries ({self.embedder.name}, threshold {self.threshold})")
+
+    def _insert(self, vector, context, value):
+        if self._vectors is None:
+            self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+        elif self._size == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._vectors[self._size] = vector
+        self._rows.setdefault(context, []).append(self._size)
+        self._values.append(value)
+        self._size += 1
+
+    def search(self, vector, context):
+        """(row, similarity) of the closest entry with this context, or None."""
+        rows = self._rows.get(context)
+        if not rows:
+            return None
+        similarities = self._vectors[rows] @ vector
+        best = int(np.argmax(similarities))
+        return rows[best], float(similarities[best])
+
+    def call(self, kind, fn, text, *args, **kwargs):
+        """fn(text, ...), or the result of an earlier call on a text at least `threshold` similar."""
+        if not self.active:
+            return fn(text, *args, **kwargs)
+        context = call_context(kind, args, kwargs)
+        vector = self.embedder.embed([text])[0]
+        with self._lock:
+            self.lookups[kind] += 1
+            match = self.search(vector, context)
+            if match is not None and match[1] >= self.threshold:
+                self.reused[kind] += 1
+                annotate(dedup="reused", similarity=round(match[1], 4))
+                return self._values[match[0]]
+        # Stored as JSON, like checkpoints: a reused result looks the same as a fresh one
+        value = json.loads(json.dumps(fn(text, *args, **kwargs), default=str))
+        with self._lock:
+            self._insert(vector, context, value)
+            self._file.write(json.dumps({'embedder': self.embedder.name, 'kind': kind, 'context': context,
+                                         'at': time.time(), 'vector': dump_vector(vector),
+                                         'value': value}) + "\n")
+            self._file.flush()
+        return value
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def report(self):
+        with self._lock:
+            by_kind = ", ".join(f"{kind} {self.reused[kind]}/{self.lookups[kind]}" for kind in sorted(self.lookups))
+            return (f"Dedup index: {sum(self.reused.values())} of {sum(self.lookups.values())} calls reused "
+                    f"({by_kind or 'none'}) | {self._size} entries | threshold {self.threshold} | {self.path}")
+
+
+dedup_index = SimilarityIndex()
+
+
+def deduplicated(kind):
+    """Decorator: reuse the open index's result for a near-identical first argument."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(text, *args, **kwargs):
+            return dedup_index.call(kind, fn, text, *args, **kwargs)
+        return wrapper
+    return decorator
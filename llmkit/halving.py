@@ -0,0 +1,87 @@
+"""
+Successive halving: spend the expensive judges only on promising candidates.
+
+Candidates are scored stage by stage, cheapest signal first. After every
+stage but the last, only the top `keep` fraction moves on. The last
+(most expensive) stage can also be capped at `budget` candidates:
+
+    survivors, scores = successive_halving(
+        range(len(outputs)),
+        [("rerank", rerank_scores, 0),        # (name, score_fn, API calls per candidate)
+         ("judges", judge_scores, 2)],
+        keep=0.5, budget=2,
+    )
+
+`score_fn(candidates)` gets the candidates still in the running and
+returns one score per candidate (higher is better). `survivors` lists the
+candidates that reached the last stage, in their original order. Calls
+saved are the later stages' per-candidate calls for every candidate that
+was cut.
+"""
+
+import math
+import threading
+
+
+class HalvingStats:
+    """Thread-safe totals across all halving runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.candidates = 0
+        self.final = 0  # Candidates that reached the last stage
+        self.calls_made = 0
+        self.calls_saved = 0
+
+    def record(self, candidates, final, calls_made, calls_saved):
+        with self._lock:
+            self.runs += 1
+            self.candidates += candidates
+            self.final += final
+            self.calls_made += calls_made
+            self.calls_saved += calls_saved
+
+    def report(self):
+        with self._lock:
+            if not self.runs:
+                return "Successive halving: not used"
+            total = self.calls_made + self.calls_saved
+            return (f"Successive halving: {self.runs} rounds | {self.candidates} candidates → {self.final} fully judged | "
+                    f"{self.calls_made} judge calls made, {self.calls_saved} saved "
+                    f"({self.calls_saved / total if total else 0.0:.0%})")
+
+
+halving_stats = HalvingStats()
+
+
+def survivors(count, keep, budget=None):
+    """How many of `count` candidates move on: at least one, at most `budget`."""
+    kept = max(1, math.ceil(count * keep))
+    return min(kept, budget) if budget is not None else kept
+
+
+def successive_halving(candidates, stages, keep=0.5, budget=None, stats=halving_stats):
+    """
+    Run `stages` [(name, score_fn, calls_per_candidate), ...] with a cut after
+    each one but the last. Returns (survivors, scores): scores maps each
+    candidate to {stage name: score} for the stages it was scored in.
+    """
+    remaining = list(candidates)
+    order = {candidate: i for i, candidate in enumerate(remaining)}
+    scores = {candidate: {} for candidate in remaining}
+    calls_made = calls_saved = 0
+    for position, (name, score_fn, calls) in enumerate(stages):
+        for candidate, score in zip(remaining, score_fn(remaining)):
+            scores[candidate][name] = score
+        calls_made += calls * len(remaining)
+        if position == len(stages) - 1:
+            break
+        last_cut = position == len(stages) - 2
+        kept = survivors(len(remaining), keep, budget if last_cut else None)
+        ranked = sorted(remaining, key=lambda candidate: scores[candidate][name], reverse=True)
+        later_calls = sum(stage_calls for _, _, stage_calls in stages[position + 1:])
+        calls_saved += later_calls * (len(remaining) - kept)
+        remaining = sorted(ranked[:kept], key=order.get)
+    stats.record(len(order), len(remaining), calls_made, calls_saved)
+    return remaining, scores
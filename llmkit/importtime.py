@@ -0,0 +1,107 @@
+"""
+Import-time budget check for the optimization scripts.
+
+Runs `python -X importtime` on each script in a fresh interpreter and reports
+how long importing it took, plus which of its imports were slowest. Exits
+non-zero if a script exceeds its budget.
+
+    python -m llmkit.importtime LLMSupportEval/loop.py PromptAgentic/simpePrompt.py
+    python -m llmkit.importtime --budget 0.5 --top 15 LLMSupportEval/eval.py
+
+Scripts are imported, not run, so they must keep their work under
+`if __name__ == "__main__":`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_BUDGET = 1.0  # seconds
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure(script):
+    """Import `script` in a fresh interpreter under -X importtime."""
+    directory, filename = os.path.split(os.path.abspath(script))
+    module = os.path.splitext(filename)[0]
+    code = f"import sys; sys.path.insert(0, {directory!r}); import {module}"
+
+    env = dict(os.environ)
+    # Clients are constructed at import; they only need a key to exist, not a valid one
+    env.setdefault("ANTHROPIC_API_KEY", "importtime-check")
+    env.setdefault("COHERE_API_KEY", "importtime-check")
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=directory, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+
+    rows = parse_importtime(proc.stderr)
+    script_us = None
+    imports = []
+    for index, (name, _, cumulative, depth) in enumerate(rows):
+        if name == module and depth == 0:
+            script_us = cumulative
+            # -X importtime lists a module's imports right before the module itself
+            for child, _, child_cumulative, child_depth in reversed(rows[:index]):
+                if child_depth == 0:
+                    break
+                if child_depth == 1:
+                    imports.append((child, child_cumulative))
+    return {
+        'script': script,
+        'module': module,
+        'ok': proc.returncode == 0,
+        'error': proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        'wall_seconds': wall,
+        'import_seconds': script_us / 1e6 if script_us is not None else None,
+        'imports': sorted(imports, key=lambda item: item[1], reverse=True),
+    }
+
+
+def report(result, budget, top):
+    print(f"\n=== {result['script']} ===")
+    if not result['ok']:
+        print(f"  Import failed: {result['error']}")
+        return False
+    within = result['import_seconds'] <= budget
+    print(f"  Import time:   {result['import_seconds']:.3f}s (budget {budget:.3f}s) "
+          f"{'OK' if within else 'OVER BUDGET'}")
+    print(f"  Process wall:  {result['wall_seconds']:.3f}s (includes interpreter startup)")
+    print(f"  Slowest imports made by the script:")
+    for name, cumulative in result['imports'][:top]:
+        print(f"    {cumulative / 1e3:9.1f} ms  {name}")
+    return within
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check script import time against a budget.")
+    parser.add_argument("scripts", nargs="+", help="Script paths to import")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Seconds allowed per script")
+    parser.add_argument("--top", type=int, default=10, help="How many of the script's imports to list")
+    args = parser.parse_args()
+
+    results = [report(measure(script), args.budget, args.top) for script in args.scripts]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Run one optimization per prompt across a worker pool.
+
+    runner = JobRunner(optimize_job, workers=8, output_path="results.jsonl", log_dir="job_logs")
+    runner.run(load_jobs("prompts.txt"))
+
+Jobs run independently: a slow prompt holds one worker while the others keep
+going, and each result is appended to `output_path` (JSONL) when its job
+finishes. A job that raises is recorded with its error. Rerunning skips the
+ids already in the output. Every job's printed output goes to
+`log_dir/<id>.log`. Pool threads started inside a job log there too, as long
+as they carry the context (llmkit.telemetry.in_context). The console shows a
+progress line per finished job.
+
+The rate limit is global because all jobs share one scheduled client
+(ANTHROPIC_RPM / _TPM, COHERE_RPM; see llmkit.scheduler).
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llmkit.telemetry import span
+
+_job_output = contextvars.ContextVar("llmkit_job_output", default=None)
+
+
+class ContextStdout:
+    """sys.stdout stand-in that writes to the current job's log when there is one."""
+
+    def __init__(self, default):
+        self.default = default
+
+    def _target(self):
+        return _job_output.get() or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.default, name)
+
+
+def load_jobs(path):
+    """JSONL of {"id": ..., "prompt": ...} (id optional), or plain text with one prompt per line."""
+    jobs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line) if path.endswith(".jsonl") else {'prompt': line}
+            job.setdefault('id', f"prompt-{len(jobs) + 1:04d}")
+            jobs.append(job)
+    return jobs
+
+
+class JobRunner:
+    def __init__(self, fn, workers=4, output_path="results.jsonl", log_dir="job_logs"):
+        self.fn = fn
+        self.workers = workers
+        self.output_path = output_path
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+        self.finished = 0
+        self.failed = 0
+        self.running = 0
+
+    def completed_ids(self):
+        if not os.path.exists(self.output_path):
+            return set()
+        done = set()
+        with open(self.output_path) as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['id'])
+                except (ValueError, KeyError):
+                    continue  # Partial last line from a crash
+        return done
+
+    def _run_one(self, job):
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        record = {'id': job['id'], 'prompt': job['prompt']}
+        with open(os.path.join(self.log_dir, f"{job['id']}.log"), "w") as log:
+            token = _job_output.set(log)
+            try:
+                with span("job", id=job['id']):
+                    record.update(self.fn(job), status="ok")
+            except Exception as exc:
+                traceback.print_exc(file=log)
+                record.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+            finally:
+                _job_output.reset(token)
+                with self._lock:
+                    self.running -= 1
+        record['seconds'] = round(time.perf_counter() - start, 2)
+        return record
+
+    def run(self, jobs):
+        """Run every job not already in the output; returns this run's records in completion order."""
+        done = self.completed_ids()
+        pending = [job for job in jobs if job['id'] not in done]
+        os.makedirs(self.log_dir, exist_ok=True)
+        console = sys.stdout
+        print(f"{len(pending)} jobs to run ({len(jobs) - len(pending)} already in {self.output_path}), "
+              f"{self.workers} workers, logs in {self.log_dir}/", flush=True)
+
+        records = []
+        start = time.perf_counter()
+        sys.stdout = ContextStdout(console)  # Job output goes to its log; ours to the console
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool, open(self.output_path, "a") as out:
+                futures = [pool.submit(contextvars.copy_context().run, self._run_one, job) for job in pending]
+                for future in as_completed(futures):
+                    record = future.result()
+                    records.append(record)
+                    out.write(json.dumps(record, default=str) + "\n")
+                    out.flush()
+                    self.finished += 1
+                    self.failed += record['status'] != "ok"
+                    self._progress(console, record, len(pending), time.perf_counter() - start)
+        finally:
+            sys.stdout = console
+        return records
+
+    def _progress(self, console, record, total, elapsed):
+        rate = self.finished / elapsed * 60 if elapsed else 0.0
+        eta = (total - self.finished) / (self.finished / elapsed) if self.finished else 0.0
+        outcome = f"score {record['combined_score']:.2f}" if 'combined_score' in record else record['status']
+        console.write(f"[{self.finished}/{total}] {record['id']} {outcome} in {record['seconds']:.1f}s | "
+                      f"{self.running} running | {self.failed} failed | {rate:.1f} prompts/min | "
+                      f"ETA {eta / 60:.1f} min\n")
+        console.flush()
@@ -0,0 +1,327 @@
+"""
+One metrics engine for BLEU, ROUGE-1/2/L and BERTScore.
+
+    engine = MetricsEngine(workers=4, scorer=make_scorer())
+    scores = engine.score(predictions, references)  # per-example lists
+    engine.corpus()                                 # corpus scores so far
+
+Each text is tokenized once. The BLEU view uses 13a tokens, case-kept. The
+ROUGE view uses lowercase alphanumerics. Both are mapped to integer ids from
+one vocabulary per chunk of examples. Every n-gram of the chunk is packed
+with its example's row into one int64 key. Counting is a single np.unique,
+and clipped matches are one np.intersect1d plus np.bincount per order.
+ROUGE-L uses a bit-parallel LCS on Python ints.
+
+BLEU and ROUGE are CPU-bound, so each batch is split across a process pool
+(chunks of at least min_chunk examples; this process scores one of them).
+BERTScore (or any llmkit.similarity scorer) scores a whole batch in one call
+in this process.
+
+Scores match `evaluate`'s metrics:
+  - bleu: max order 4, no smoothing, tokenizer_13a. Per example it is
+    sentence BLEU. The corpus score pools n-gram matches and lengths over all
+    examples, like compute_bleu on the whole corpus.
+  - rouge1 / rouge2 / rougeL: rouge_score F-measure without stemming, best
+    reference per example. The corpus score is the mean (evaluate's
+    bootstrap aggregate estimates the same mean).
+"""
+
+import math
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from llmkit.telemetry import span
+
+MAX_ORDER = 4
+ROUGE_ORDERS = (1, 2)
+BLEU_COLUMNS = 2 * MAX_ORDER + 2  # matches and possible per order, prediction length, reference length
+
+# tokenizer_13a (sacrebleu), as used by evaluate's bleu
+_13A_RULES = [
+    (re.compile(r"([\{-\~\[-\` -\&\(-\+\:-\@\/])"), r" \1 "),
+    (re.compile(r"([^0-9])([\.,])"), r"\1 \2 "),
+    (re.compile(r"([\.,])([^0-9])"), r" \1 \2"),
+    (re.compile(r"([0-9])(-)"), r"\1 \2 "),
+]
+_ROUGE_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+def tokenize_13a(text):
+    text = text.replace("<skipped>", "").replace("-\n", "").replace("\n", " ")
+    if "&" in text:
+        text = text.replace("&quot;", '"').replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+    text = f" {text} "
+    for pattern, replacement in _13A_RULES:
+        text = pattern.sub(replacement, text)
+    return text.split()
+
+
+def tokenize_rouge(text):
+    """rouge_score's default tokenizer without stemming."""
+    return _ROUGE_SPLIT.sub(" ", text.lower()).split()
+
+
+def as_reference_list(reference):
+    """References may be a single string or a list of alternatives."""
+    return [reference] if isinstance(reference, str) else list(reference)
+
+
+class Tokenized:
+    """A text's BLEU and ROUGE token ids, over a vocabulary shared with the texts it is compared to."""
+
+    __slots__ = ("bleu", "rouge")
+
+    def __init__(self, text, vocabulary):
+        self.bleu = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in tokenize_13a(text)],
+                             dtype=np.int64)
+        self.rouge = [vocabulary.setdefault(token, len(vocabulary)) for token in tokenize_rouge(text)]
+
+
+def ngram_counts(ids, order, bits):
+    """(unique n-gram keys, counts). Ids are packed `bits` apart into one int64 when they fit."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) < order:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    windows = sliding_window_view(ids, order)
+    if bits * order <= 62:
+        keys = np.zeros(len(windows), dtype=np.int64)
+        for column in range(order):
+            keys = (keys << bits) | windows[:, column]
+    else:
+        # Very large vocabulary: compare the raw id rows as bytes
+        keys = np.ascontiguousarray(windows).view(np.dtype((np.void, 8 * order))).ravel()
+    return np.unique(keys, return_counts=True)
+
+
+def overlap(prediction, reference):
+    """Clipped matches between two (keys, counts) pairs."""
+    _, in_prediction, in_reference = np.intersect1d(prediction[0], reference[0], assume_unique=True,
+                                                    return_indices=True)
+    return int(np.minimum(prediction[1][in_prediction], reference[1][in_reference]).sum())
+
+
+def merged_max_counts(counts):
+    """Per n-gram maximum count over several references (BLEU's clipping counts)."""
+    if len(counts) == 1:
+        return counts[0]
+    keys, inverse = np.unique(np.concatenate([keys for keys, _ in counts]), return_inverse=True)
+    merged = np.zeros(len(keys), dtype=np.int64)
+    np.maximum.at(merged, inverse, np.concatenate([values for _, values in counts]))
+    return keys, merged
+
+
+def lcs_length(a, b):
+    """Longest common subsequence length (Hyyrö's bit-parallel algorithm, one big-int op per token of b)."""
+    if not a or not b:
+        return 0
+    masks = {}
+    for position, token in enumerate(a):
+        masks[token] = masks.get(token, 0) | (1 << position)
+    full = (1 << len(a)) - 1
+    row = full
+    for token in b:
+        matched = row & masks.get(token, 0)
+        row = ((row + matched) | (row - matched)) & full
+    return len(a) - bin(row).count("1")
+
+
+def fmeasure(matches, predicted, target):
+    precision = matches / max(predicted, 1)
+    recall = matches / max(target, 1)
+    return 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+
+
+def example_stats(prediction, references):
+    """One row: BLEU sufficient statistics (BLEU_COLUMNS) then rouge1, rouge2, rougeL F-measures."""
+    vocabulary = {}
+    candidate = Tokenized(prediction, vocabulary)
+    refs = [Tokenized(reference, vocabulary) for reference in references]
+    bits = max(1, len(vocabulary).bit_length())
+    row = np.zeros(BLEU_COLUMNS + len(ROUGE_ORDERS) + 1)
+
+    for order in range(1, MAX_ORDER + 1):
+        predicted = ngram_counts(candidate.bleu, order, bits)
+        row[order - 1] = overlap(predicted, merged_max_counts([ngram_counts(ref.bleu, order, bits) for ref in refs]))
+        row[MAX_ORDER + order - 1] = max(len(candidate.bleu) - order + 1, 0)
+    row[2 * MAX_ORDER] = len(candidate.bleu)
+    row[2 * MAX_ORDER + 1] = min(len(ref.bleu) for ref in refs)
+
+    for column, order in enumerate(ROUGE_ORDERS, BLEU_COLUMNS):
+        predicted = ngram_counts(candidate.rouge, order, bits)
+        row[column] = max(fmeasure(overlap(predicted, target), predicted[1].sum(), target[1].sum())
+                          for target in (ngram_counts(ref.rouge, order, bits) for ref in refs))
+    row[-1] = max(fmeasure(lcs_length(ref.rouge, candidate.rouge), len(candidate.rouge), len(ref.rouge))
+                  for ref in refs)
+    return row
+
+
+def packed_ngrams(sequences, rows, order, bits, row_shift):
+    """
+    Unique (row, n-gram) keys and their counts over many id sequences at once.
+    Sequence k's n-grams are tagged with rows[k]; returns (keys, counts).
+    """
+    lengths = np.array([len(sequence) for sequence in sequences], dtype=np.int64)
+    if lengths.sum() < order:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    flat = np.concatenate([np.asarray(sequence, dtype=np.int64) for sequence in sequences])
+    owner = np.repeat(np.arange(len(sequences)), lengths)
+    windows = sliding_window_view(flat, order)
+    inside = owner[:len(windows)] == owner[order - 1:]  # Drop n-grams that span two sequences
+    keys = np.asarray(rows, dtype=np.int64)[owner[:len(windows)][inside]] << row_shift
+    for column in range(order):
+        keys |= windows[inside, column] << (bits * (order - 1 - column))
+    return np.unique(keys, return_counts=True)
+
+
+def matches_per_row(prediction, reference, row_shift, rows):
+    """Clipped matches per row between two packed (keys, counts) sets."""
+    common, in_prediction, in_reference = np.intersect1d(prediction[0], reference[0], assume_unique=True,
+                                                         return_indices=True)
+    clipped = np.minimum(prediction[1][in_prediction], reference[1][in_reference])
+    return np.bincount(common >> row_shift, weights=clipped, minlength=rows)
+
+
+def score_chunk(pairs):
+    """
+    example_stats for each (prediction, references), vectorized over the chunk;
+    runs in the worker processes. Falls back to one example at a time when the
+    chunk's vocabulary is too large to pack n-grams into int64 keys.
+    """
+    vocabulary = {}
+    predictions = [Tokenized(prediction, vocabulary) for prediction, _ in pairs]
+    references = [[Tokenized(reference, vocabulary) for reference in refs] for _, refs in pairs]
+    # One (example, reference) pair per reference, for ROUGE's best-reference choice
+    pair_example = np.array([i for i, refs in enumerate(references) for _ in refs], dtype=np.int64)
+    bits = max(1, len(vocabulary).bit_length())
+    row_shift = bits * MAX_ORDER
+    if row_shift + max(1, len(pair_example).bit_length()) > 63:
+        return np.stack([example_stats(prediction, refs) for prediction, refs in pairs])
+
+    examples = len(pairs)
+    stats = np.zeros((examples, BLEU_COLUMNS + len(ROUGE_ORDERS) + 1))
+    prediction_lengths = np.array([len(prediction.bleu) for prediction in predictions])
+    for order in range(1, MAX_ORDER + 1):
+        predicted = packed_ngrams([p.bleu for p in predictions], np.arange(examples), order, bits, row_shift)
+        # Clip by each n-gram's highest count in any one reference of the example
+        per_pair = packed_ngrams([ref.bleu for refs in references for ref in refs], np.arange(len(pair_example)),
+                                 order, bits, row_shift)
+        by_example = pair_example[per_pair[0] >> row_shift] << row_shift | (per_pair[0] & ((1 << row_shift) - 1))
+        keys, inverse = np.unique(by_example, return_inverse=True)
+        clip = np.zeros(len(keys), dtype=np.int64)
+        np.maximum.at(clip, inverse, per_pair[1])
+        stats[:, order - 1] = matches_per_row(predicted, (keys, clip), row_shift, examples)
+        stats[:, MAX_ORDER + order - 1] = np.maximum(prediction_lengths - order + 1, 0)
+    stats[:, 2 * MAX_ORDER] = prediction_lengths
+    stats[:, 2 * MAX_ORDER + 1] = [min(len(ref.bleu) for ref in refs) for refs in references]
+
+    pair_rows = np.arange(len(pair_example))
+    predicted_rouge = [predictions[i].rouge for i in pair_example]
+    reference_rouge = [ref.rouge for refs in references for ref in refs]
+    predicted_lengths = np.array([len(tokens) for tokens in predicted_rouge])
+    reference_lengths = np.array([len(tokens) for tokens in reference_rouge])
+    for column, order in enumerate(ROUGE_ORDERS, BLEU_COLUMNS):
+        matches = matches_per_row(packed_ngrams(predicted_rouge, pair_rows, order, bits, row_shift),
+                                  packed_ngrams(reference_rouge, pair_rows, order, bits, row_shift),
+                                  row_shift, len(pair_example))
+        np.maximum.at(stats[:, column], pair_example,
+                      fmeasures(matches, np.maximum(predicted_lengths - order + 1, 0),
+                                np.maximum(reference_lengths - order + 1, 0)))
+    lcs = np.array([lcs_length(reference, prediction) for prediction, reference in zip(predicted_rouge, reference_rouge)])
+    np.maximum.at(stats[:, -1], pair_example, fmeasures(lcs, predicted_lengths, reference_lengths))
+    return stats
+
+
+def fmeasures(matches, predicted, target):
+    """fmeasure over arrays."""
+    precision = matches / np.maximum(predicted, 1)
+    recall = matches / np.maximum(target, 1)
+    total = precision + recall
+    return np.where(total > 0, 2 * precision * recall / np.where(total > 0, total, 1), 0.0)
+
+
+def bleu_from_stats(stats):
+    """BLEU per row of sufficient statistics (sum the rows first for corpus BLEU)."""
+    stats = np.atleast_2d(stats)
+    matches, possible = stats[:, :MAX_ORDER], stats[:, MAX_ORDER:2 * MAX_ORDER]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precisions = np.where(possible > 0, matches / possible, 0.0)
+        geo_mean = np.where(precisions.min(axis=1) > 0,
+                            np.exp(np.log(np.where(precisions > 0, precisions, 1.0)).mean(axis=1)), 0.0)
+        ratio = stats[:, 2 * MAX_ORDER] / stats[:, 2 * MAX_ORDER + 1]
+        brevity_penalty = np.where(ratio > 1.0, 1.0, np.exp(1 - 1 / ratio))
+    return np.nan_to_num(geo_mean * brevity_penalty)
+
+
+class MetricsEngine:
+    def __init__(self, workers=1, scorer=None, chunk_size=64, min_chunk=16):
+        """
+        `workers` > 1 splits each batch of at least 2 x `min_chunk` examples
+        across that many processes; `scorer` adds bertscore_f1.
+        """
+        self.workers = workers
+        self.scorer = scorer
+        self.chunk_size = chunk_size
+        self.min_chunk = min_chunk
+        self.examples = 0
+        self.seconds = 0.0
+        self._bleu_stats = np.zeros(BLEU_COLUMNS)
+        self._sums = {}
+        self._pool = None
+
+    @property
+    def metric_names(self):
+        return ['bleu', 'rouge1', 'rouge2', 'rougeL'] + (['bertscore_f1'] if self.scorer is not None else [])
+
+    def _stats(self, pairs):
+        if self.workers <= 1 or len(pairs) < 2 * self.min_chunk:
+            return score_chunk(pairs)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        # Every batch is split across the workers, down to min_chunk examples per chunk
+        size = min(self.chunk_size, max(self.min_chunk, math.ceil(len(pairs) / self.workers)))
+        chunks = [pairs[start:start + size] for start in range(0, len(pairs), size)]
+        futures = [self._pool.submit(score_chunk, chunk) for chunk in chunks[1:]]
+        first = score_chunk(chunks[0])  # This process scores a chunk too instead of idling
+        return np.concatenate([first] + [future.result() for future in futures])
+
+    def score(self, predictions, references):
+        """Per-example scores ({metric: [...]}) for aligned predictions and references (str or list of str)."""
+        pairs = [(prediction, as_reference_list(reference)) for prediction, reference in zip(predictions, references)]
+        if not pairs:
+            return {name: [] for name in self.metric_names}
+        start = time.perf_counter()
+        with span("metrics.score", kind="metrics", examples=len(pairs), workers=self.workers):
+            stats = self._stats(pairs)
+            scores = {'bleu': bleu_from_stats(stats[:, :BLEU_COLUMNS]).tolist()}
+            for column, name in enumerate(['rouge1', 'rouge2', 'rougeL'], BLEU_COLUMNS):
+                scores[name] = stats[:, column].tolist()
+            if self.scorer is not None:
+                scores['bertscore_f1'] = self.scorer.score(list(predictions), [refs for _, refs in pairs])['f1']
+        self.seconds += time.perf_counter() - start
+        self.examples += len(pairs)
+        self._bleu_stats += stats[:, :BLEU_COLUMNS].sum(axis=0)
+        for name, values in scores.items():
+            self._sums[name] = self._sums.get(name, 0.0) + sum(values)
+        return scores
+
+    def corpus(self):
+        """Corpus BLEU plus mean ROUGE (and BERTScore) over everything scored so far."""
+        if not self.examples:
+            return {}
+        result = {name: total / self.examples for name, total in self._sums.items()}
+        result['bleu'] = float(bleu_from_stats(self._bleu_stats)[0])
+        return result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def report(self):
+        rate = self.examples / self.seconds if self.seconds else 0.0
+        return (f"Metrics: {self.examples} examples in {self.seconds:.2f}s ({rate:.1f} examples/sec, "
+                f"{max(self.workers, 1)} processes for BLEU/ROUGE)")
@@ -0,0 +1,530 @@
+"""
+Local stand-in for the Anthropic, Cohere and OpenAI HTTP APIs.
+
+Lets every script run offline, with reproducible responses, so
+orchestration overhead and regressions can be measured without keys:
+
+    python -m llmkit.mockserver --port 8080 --latency-ms 400 --error-rate 0.05
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8080 CO_API_URL=http://127.0.0.1:8080 \\
+        OPENAI_API_BASE=http://127.0.0.1:8080/v1 python PromptAgentic/simpePrompt.py
+
+Endpoints:
+  POST /v1/messages          Messages API, incl. SSE streaming, forced tool calls
+                             (tool input generated from the tool's input_schema) and
+                             prompt caching (cache_control breakpoints, 5-minute TTL)
+  POST /v1/messages/batches  Message Batches: create, then GET .../{id} and
+                             .../{id}/results; a batch ends `batch_seconds` after creation
+  POST /v1/rerank            Cohere rerank (word-overlap relevance)
+  POST /v1/chat/completions  OpenAI chat, for CrewAI agents (always a ReAct "Final Answer";
+                             a JSON object when the task asks for one "matching this JSON schema")
+  GET  /stats                Request counts, injected errors, tokens, latency percentiles
+
+Responses are a pure function of the request body and `seed`, so a rerun
+sees the same text, scores and latencies. Latency is drawn from a
+lognormal around `latency_ms`, plus `token_ms` per output token. Errors
+(429 rate_limit_error / 529 overloaded_error, with retry-after) are drawn
+per attempt, so a retried request can succeed. Inside a batch, a request
+fails ("errored" result) with probability `error_rate`.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llmkit.prompt_cache import min_cacheable_tokens
+
+WORDS = ("crisp immersive wireless sound all-day comfort battery noise cancellation sleek secure fit "
+         "rich bass clear calls sweat-resistant charging case seamless pairing studio quality everyday "
+         "commute workout music podcasts lightweight durable premium reliable vivid").split()
+VARIANT_REQUEST = re.compile(r"variants?\b.*?(\d+)\s*-\s*(\d+)", re.IGNORECASE | re.DOTALL)
+PROMPT_CACHE_TTL = 300.0  # seconds; refreshed on every read
+JSON_SCHEMA_REQUEST = re.compile(r"matching this JSON schema:\s*(?=\{)")  # promptAgent.py's typed task outputs
+SCORE_REQUEST = re.compile(r"from (\d+)-(\d+)\. Reply with only the number", re.IGNORECASE)  # eval.py's judge
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class MockConfig:
+    def __init__(self, latency_ms=300.0, latency_sigma=0.4, token_ms=2.0, error_rate=0.0, overload_rate=0.0,
+                 retry_after=1.0, batch_seconds=2.0, cache_min_tokens=None, seed=0):
+        self.latency_ms = latency_ms  # Median time to first byte
+        self.latency_sigma = latency_sigma  # Lognormal spread (0 = constant)
+        self.token_ms = token_ms  # Extra time per output token
+        self.error_rate = error_rate  # Share of attempts answered with 429
+        self.overload_rate = overload_rate  # Share of attempts answered with 529
+        self.retry_after = retry_after  # Seconds, sent with every injected error
+        self.batch_seconds = batch_seconds  # Time a message batch stays in_progress
+        self.cache_min_tokens = cache_min_tokens  # Smallest cacheable prompt prefix (None = the model's minimum)
+        self.seed = seed
+
+
+class MockStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.errors = {}
+            self.input_tokens = 0
+            self.output_tokens = 0
+            self.cache_read_tokens = 0
+            self.cache_write_tokens = 0
+            self.latencies = []
+
+    def record(self, endpoint, latency, input_tokens=0, output_tokens=0, error=None, cache_read_tokens=0,
+               cache_write_tokens=0):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+                return  # Latency/token figures cover answered requests only
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cache_read_tokens += cache_read_tokens
+            self.cache_write_tokens += cache_write_tokens
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'total_requests': sum(self.requests.values()),
+                'errors': dict(self.errors),
+                'input_tokens': self.input_tokens,
+                'output_tokens': self.output_tokens,
+                'cache_read_tokens': self.cache_read_tokens,
+                'cache_write_tokens': self.cache_write_tokens,
+                'latency_p50': percentile(self.latencies, 0.5),
+                'latency_p95': percentile(self.latencies, 0.95),
+            }
+
+
+def estimate_tokens(value):
+    return max(1, len(json.dumps(value)) // 4)
+
+
+def text_of(messages):
+    """All text content of a Messages/Chat request, for prompt sniffing."""
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+    return "\n".join(parts)
+
+
+def sentence(rng, n_words):
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def fake_text(rng, prompt, max_tokens):
+    """A numbered variant list for refinement prompts, a bare score for rating prompts, prose otherwise."""
+    match = SCORE_REQUEST.search(prompt)
+    if match:
+        return str(rng.randint(int(match.group(1)), int(match.group(2))))
+    match = VARIANT_REQUEST.search(prompt)
+    if match:
+        count = int(match.group(2))
+        factors = "\n".join(f"- Limiting factor: {sentence(rng, 6)}" for _ in range(3))
+        variants = "\n".join(f"{i}. Write a 50-word description that highlights {sentence(rng, 8)}"
+                             for i in range(1, count + 1))
+        return f"{factors}\n\n{variants}"
+    n_words = max(5, min(int(max_tokens * 0.7), rng.randint(40, 60)))
+    text = []
+    while sum(len(s.split()) for s in text) < n_words:
+        text.append(sentence(rng, rng.randint(6, 12)))
+    return " ".join(text)
+
+
+def fake_value(rng, schema, name="value"):
+    """A value that satisfies `schema` (the subset llmkit.structured validates)."""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: fake_value(rng, sub, key) for key, sub in schema.get("properties", {}).items()}
+    if kind in ("number", "integer"):
+        low, high = schema.get("minimum", 0), schema.get("maximum", 10)
+        # Mid-range scores: loops keep refining instead of meeting their threshold at once
+        value = rng.uniform(low + 0.4 * (high - low), low + 0.85 * (high - low))
+        return int(round(value)) if kind == "integer" else round(value, 1)
+    if kind == "array":
+        return [fake_value(rng, schema.get("items", {}), name) for _ in range(2)]
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return f"Mock {name.replace('_', ' ')}: {sentence(rng, 10)}"
+
+
+class MockServer:
+    """Threaded HTTP server; `start()` runs it in the background for tests and benchmarks."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        self.stats = MockStats()
+        self._attempts = {}
+        self._batches = {}
+        self._prompt_cache = {}  # prefix digest -> expiry time
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def env(self):
+        """Environment variables that point the SDKs here."""
+        return {
+            "ANTHROPIC_BASE_URL": self.url,
+            "CO_API_URL": self.url,
+            "OPENAI_API_BASE": f"{self.url}/v1",  # langchain / CrewAI < 0.2
+            "OPENAI_BASE_URL": f"{self.url}/v1",  # openai >= 1.0
+        }
+
+    def rng(self, body):
+        """(request rng, attempt rng): responses depend only on the body, errors also on the attempt number."""
+        digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+        base = int(digest[:16], 16) ^ self.config.seed
+        return random.Random(base), random.Random(base + attempt + 1)
+
+    def latency(self, rng, output_tokens):
+        config = self.config
+        first_byte = config.latency_ms * math.exp(rng.gauss(0, config.latency_sigma)) if config.latency_sigma else config.latency_ms
+        return (first_byte + config.token_ms * output_tokens) / 1000
+
+    def injected_error(self, attempt_rng):
+        roll = attempt_rng.random()
+        if roll < self.config.error_rate:
+            return 429, "rate_limit_error"
+        if roll < self.config.error_rate + self.config.overload_rate:
+            return 529, "overloaded_error"
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/stats":
+                    self._send_json(200, server.stats.snapshot())
+                elif path.startswith("/v1/messages/batches/"):
+                    server.handle_batch_get(self, path[len("/v1/messages/batches/"):])
+                else:
+                    self._send_json(404, {"error": f"unknown path {self.path}"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                path = self.path.split("?")[0].rstrip("/")
+                routes = {
+                    "/v1/messages": server.handle_messages,
+                    "/v1/messages/batches": server.handle_batch_create,
+                    "/v1/rerank": server.handle_rerank,
+                    "/v1/chat/completions": server.handle_chat,
+                }
+                route = routes.get(path)
+                if route is None:
+                    self._send_json(404, {"error": f"unknown path {self.path}"})
+                    return
+                request_rng, attempt_rng = server.rng(body)
+                error = server.injected_error(attempt_rng)
+                if error is not None:
+                    status, kind = error
+                    time.sleep(server.latency(request_rng, 0))
+                    server.stats.record(path, 0.0, error=kind)
+                    self._send_json(status, {"type": "error", "error": {"type": kind, "message": "injected by mock server"}},
+                                    {"retry-after": str(server.config.retry_after)})
+                    return
+                try:
+                    route(self, body, request_rng)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client closed the stream early (word budget)
+
+        return Handler
+
+    # --- Anthropic Messages -------------------------------------------------
+
+    def build_message(self, body, rng):
+        tool_choice = body.get("tool_choice") or {}
+        tools = {tool["name"]: tool for tool in body.get("tools", [])}
+        if tool_choice.get("type") == "tool" and tool_choice.get("name") in tools:
+            tool = tools[tool_choice["name"]]
+            tool_input = fake_value(rng, tool["input_schema"])
+            content = [{"type": "tool_use", "id": f"toolu_{rng.getrandbits(48):012x}", "name": tool["name"],
+                        "input": tool_input}]
+            output_tokens = estimate_tokens(tool_input)
+            stop_reason = "tool_use"
+        else:
+            text = fake_text(rng, text_of(body.get("messages", [])), body.get("max_tokens", 1024))
+            content = [{"type": "text", "text": text}]
+            output_tokens = int(len(text.split()) * 1.3)
+            stop_reason = "end_turn"
+        input_tokens = estimate_tokens([body.get("system"), body.get("messages"), body.get("tools")])
+        cache_read, cache_write = self.prompt_cache_usage(body)
+        message = {
+            "id": f"msg_mock_{rng.getrandbits(48):012x}", "type": "message", "role": "assistant",
+            "model": body.get("model", "mock"), "content": content, "stop_reason": stop_reason,
+            "stop_sequence": None,
+            # As in the API, input_tokens counts only what came after the cached prefix
+            "usage": {"input_tokens": max(1, input_tokens - cache_read - cache_write), "output_tokens": output_tokens,
+                      "cache_read_input_tokens": cache_read, "cache_creation_input_tokens": cache_write},
+        }
+        return message
+
+    def prompt_cache_usage(self, body):
+        """(read, write) tokens for the prefix up to the last cache_control breakpoint (tools, system, messages)."""
+        system = body.get("system")
+        blocks = list(body.get("tools", [])) + (system if isinstance(system, list) else [])
+        for message in body.get("messages", []):
+            if isinstance(message.get("content"), list):
+                blocks += message["content"]
+        marked = [i for i, block in enumerate(blocks) if isinstance(block, dict) and block.get("cache_control")]
+        if not marked:
+            return 0, 0
+        prefix = blocks[:marked[-1] + 1]
+        tokens = estimate_tokens(prefix)
+        minimum = self.config.cache_min_tokens
+        if tokens < (min_cacheable_tokens(body.get("model")) if minimum is None else minimum):
+            return 0, 0  # Too short: processed normally, nothing written
+        digest = hashlib.sha256(json.dumps([body.get("model"), prefix], sort_keys=True).encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock:
+            hit = self._prompt_cache.get(digest, 0.0) > now
+            self._prompt_cache[digest] = now + PROMPT_CACHE_TTL
+        return (tokens, 0) if hit else (0, tokens)
+
+    def handle_messages(self, handler, body, rng):
+        start = time.perf_counter()
+        message = self.build_message(body, rng)
+        usage = message["usage"]
+        delay = self.latency(rng, usage["output_tokens"])
+        try:
+            if body.get("stream"):
+                self._stream_message(handler, message, delay)
+            else:
+                time.sleep(delay)
+                handler._send_json(200, message)
+        finally:
+            # Also when the client closes a stream early (word budget): it still made the request
+            self.stats.record("/v1/messages", time.perf_counter() - start, usage["input_tokens"], usage["output_tokens"],
+                              cache_read_tokens=usage["cache_read_input_tokens"],
+                              cache_write_tokens=usage["cache_creation_input_tokens"])
+
+    def _stream_message(self, handler, message, delay):
+        """Server-sent events in the Messages streaming format; first byte after the base latency."""
+        handler.send_response(200)
+        handler.send_header("content-type", "text/event-stream")
+        handler.send_header("connection", "close")
+        handler.end_headers()
+
+        def event(kind, data):
+            handler.wfile.write(f"event: {kind}\ndata: {json.dumps(dict(data, type=kind))}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        usage = message["usage"]
+        token_delay = self.config.token_ms / 1000
+        time.sleep(max(0.0, delay - token_delay * usage["output_tokens"]))
+        event("message_start", {"message": dict(message, content=[], stop_reason=None,
+                                                 usage=dict(usage, output_tokens=1))})
+        for index, block in enumerate(message["content"]):
+            if block["type"] == "text":
+                event("content_block_start", {"index": index, "content_block": {"type": "text", "text": ""}})
+                for i, word in enumerate(block["text"].split(" ")):
+                    time.sleep(token_delay)
+                    event("content_block_delta", {"index": index,
+                                                  "delta": {"type": "text_delta", "text": (" " if i else "") + word}})
+            else:
+                event("content_block_start", {"index": index, "content_block": dict(block, input={})})
+                event("content_block_delta", {"index": index, "delta": {"type": "input_json_delta",
+                                                                         "partial_json": json.dumps(block["input"])}})
+            event("content_block_stop", {"index": index})
+        event("message_delta", {"delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                                "usage": {"output_tokens": usage["output_tokens"]}})
+        event("message_stop", {})
+
+    # --- Anthropic Message Batches ------------------------------------------
+
+    def _batch_object(self, batch_id):
+        batch = self._batches[batch_id]
+        ended = time.time() - batch["created"] >= self.config.batch_seconds
+        count = len(batch["requests"])
+        failed = sum(1 for request in batch["requests"] if request["failed"]) if ended else 0
+        iso = lambda seconds: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+        return {
+            "id": batch_id, "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else count, "succeeded": count - failed if ended else 0,
+                               "errored": failed, "canceled": 0, "expired": 0},
+            "created_at": iso(batch["created"]), "expires_at": iso(batch["created"] + 86400),
+            "ended_at": iso(batch["created"] + self.config.batch_seconds) if ended else None,
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def handle_batch_create(self, handler, body, rng):
+        batch_id = f"msgbatch_mock_{rng.getrandbits(48):012x}"
+        requests = []
+        for request in body.get("requests", []):
+            request_rng, _ = self.rng(request)
+            requests.append({"custom_id": request["custom_id"], "params": request["params"],
+                             "failed": request_rng.random() < self.config.error_rate})
+        with self._lock:
+            self._batches[batch_id] = {"created": time.time(), "requests": requests}
+        self.stats.record("/v1/messages/batches", 0.0, estimate_tokens(body))
+        handler._send_json(200, self._batch_object(batch_id))
+
+    def handle_batch_get(self, handler, path):
+        batch_id, _, suffix = path.partition("/")
+        if batch_id not in self._batches:
+            handler._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": batch_id}})
+            return
+        if suffix != "results":
+            handler._send_json(200, self._batch_object(batch_id))
+            return
+        lines = []
+        output_tokens = 0
+        for request in self._batches[batch_id]["requests"]:
+            if request["failed"]:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "api_error", "message": "injected by mock server"}}}
+            else:
+                message = self.build_message(request["params"], self.rng(request["params"])[0])
+                output_tokens += message["usage"]["output_tokens"]
+                result = {"type": "succeeded", "message": message}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        handler.send_response(200)
+        handler.send_header("content-type", "application/binary")
+        handler.send_header("content-length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+        self.stats.record("/v1/messages/batches/results", 0.0, output_tokens=output_tokens)
+
+    # --- Cohere rerank ------------------------------------------------------
+
+    def handle_rerank(self, handler, body, rng):
+        start = time.perf_counter()
+        query = set(body.get("query", "").lower().split())
+        documents = [doc if isinstance(doc, str) else doc.get("text", "") for doc in body.get("documents", [])]
+        results = []
+        for index, document in enumerate(documents):
+            words = set(document.lower().split())
+            overlap = len(query & words) / len(query | words) if query | words else 0.0
+            results.append({"index": index, "relevance_score": round(min(1.0, overlap + 0.1 * rng.random()), 6)})
+        results.sort(key=lambda result: result["relevance_score"], reverse=True)
+        top_n = body.get("top_n") or len(results)
+        time.sleep(self.latency(rng, 0))
+        handler._send_json(200, {"id": f"rerank-mock-{rng.getrandbits(32):08x}", "results": results[:top_n],
+                                 "meta": {"api_version": {"version": "1"}, "billed_units": {"search_units": 1}}})
+        self.stats.record("/v1/rerank", time.perf_counter() - start, estimate_tokens([body.get("query"), documents]))
+
+    # --- OpenAI chat (CrewAI) -----------------------------------------------
+
+    def handle_chat(self, handler, body, rng):
+        start = time.perf_counter()
+        prompt = text_of(body.get("messages", []))
+        requests = list(JSON_SCHEMA_REQUEST.finditer(prompt))
+        if requests:
+            # The task's own request comes last (earlier ones may be in the context)
+            schema, _ = json.JSONDecoder().raw_decode(prompt, requests[-1].end())
+            answer = f"Thought: Do I need to use a tool? No\nFinal Answer: {json.dumps(fake_value(rng, schema))}"
+        else:
+            output = sentence(rng, 40)
+            variant = f"Write a 50-word description that highlights {sentence(rng, 8)}"
+            answer = (f"Thought: Do I need to use a tool? No\nFinal Answer: Generated Output: {output}\n"
+                      f"Judge Score: {fake_value(rng, {'type': 'number', 'minimum': 0, 'maximum': 10})}\n"
+                      f"BERT F1: {fake_value(rng, {'type': 'number', 'minimum': 0, 'maximum': 10})}\n"
+                      f"New Prompt: {variant}\nFinal Output: {output}")
+        input_tokens, output_tokens = estimate_tokens(prompt), int(len(answer.split()) * 1.3)
+        time.sleep(self.latency(rng, output_tokens))
+        handler._send_json(200, {
+            "id": f"chatcmpl-mock-{rng.getrandbits(32):08x}", "object": "chat.completion", "created": 0,
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens},
+        })
+        self.stats.record("/v1/chat/completions", time.perf_counter() - start, input_tokens, output_tokens)
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median latency per request")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Lognormal spread of the latency")
+    parser.add_argument("--token-ms", type=float, default=2.0, help="Extra latency per output token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of attempts answered with 429")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="Share of attempts answered with 529")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds on injected errors")
+    parser.add_argument("--batch-seconds", type=float, default=2.0, help="How long a message batch stays in progress")
+    parser.add_argument("--cache-min-tokens", type=int,
+                        help="Smallest cacheable prompt prefix (default: the model's real minimum, 2048 for Haiku)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args):
+    return MockConfig(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, token_ms=args.token_ms,
+                      error_rate=args.error_rate, overload_rate=args.overload_rate,
+                      retry_after=args.retry_after, batch_seconds=args.batch_seconds,
+                      cache_min_tokens=args.cache_min_tokens, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Anthropic/Cohere/OpenAI APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args), args.host, args.port)
+    print(f"Mock API server on {server.url} - point the scripts at it with:")
+    for key, value in server.env().items():
+        print(f"  export {key}={value}")
+    print("  export ANTHROPIC_API_KEY=mock COHERE_API_KEY=mock RERANKER=cohere")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Streaming stages connected by bounded asyncio queues.
+
+    results = run_pipeline(variants, [
+        Stage("generate", generate, workers=3),
+        Stage("judge", judge, workers=3),
+        Stage("rerank", rerank_batch, batch=8),   # gets a list of waiting items
+    ], maxsize=2)
+
+Each item moves to the next stage as soon as its current stage finishes.
+Item N+1 can be generating while N is judged and N-1 reranked; nothing
+waits for the whole round. Every stage has its own worker count. The
+queues between stages hold at most `maxsize` items. When a downstream
+stage falls behind, the upstream workers wait on the full queue
+(backpressure) rather than piling up work. A batch stage takes every
+waiting item (up to `batch`) in one call and returns a list.
+
+Stage functions are ordinary blocking callables, because the SDK clients
+are synchronous. They run on a thread pool sized to the total worker
+count, in a copy of the caller's context, so telemetry spans and
+checkpoints behave as they do with ThreadPoolExecutor. run_pipeline is
+called from synchronous code and owns its event loop. Results come back
+in completion order.
+
+pipeline_stats keeps totals per stage: items, busy time (against
+workers x wall time), the depth of the stage's input queue each time an
+item was added (mean, max and capacity), and how often and how long
+producers blocked because that queue was full.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()  # One per worker of the receiving stage, after the last item
+
+
+class Stage:
+    """`fn(item) -> item` run by `workers` at once; with `batch`, `fn(items) -> items` on up to `batch` waiting items."""
+
+    def __init__(self, name, fn, workers=1, batch=None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch = batch
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.workers = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.worker_seconds = 0.0  # workers x wall time, the busy-time ceiling
+        self.capacity = 0
+        self.depth_total = 0
+        self.depth_samples = 0
+        self.depth_max = 0
+        self.full = 0  # Puts that found this stage's input queue full
+        self.blocked_seconds = 0.0  # Time producers spent waiting on it
+
+
+class PipelineStats:
+    """Thread-safe per-stage totals across all pipeline runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.wall_seconds = 0.0
+        self.stages = {}  # name -> StageStats, in first-seen order
+
+    def record_run(self, stages, maxsize, wall_seconds):
+        with self._lock:
+            self.runs += 1
+            self.wall_seconds += wall_seconds
+            for stage in stages:
+                stats = self._stage(stage.name)
+                stats.workers = max(stats.workers, stage.workers)
+                stats.capacity = maxsize
+                stats.worker_seconds += stage.workers * wall_seconds
+
+    def record_put(self, name, depth, waited):
+        with self._lock:
+            stats = self._stage(name)
+            stats.depth_total += depth
+            stats.depth_samples += 1
+            stats.depth_max = max(stats.depth_max, depth)
+            if waited is not None:
+                stats.full += 1
+                stats.blocked_seconds += waited
+
+    def record_work(self, name, items, seconds):
+        with self._lock:
+            stats = self._stage(name)
+            stats.items += items
+            stats.busy_seconds += seconds
+
+    def _stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = StageStats(name)
+        return self.stages[name]
+
+    def report(self):
+        with self._lock:
+            if not self.runs:
+                return "Pipeline: not used"
+            lines = [f"Pipeline: {self.runs} runs | {self.wall_seconds:.2f}s"]
+            for stats in self.stages.values():
+                busy = stats.busy_seconds / stats.worker_seconds if stats.worker_seconds else 0.0
+                depth = stats.depth_total / stats.depth_samples if stats.depth_samples else 0.0
+                lines.append(f"  {stats.name:<10} x{stats.workers} | {stats.items} items | busy {busy:.0%} | "
+                             f"queue depth mean {depth:.1f}, max {stats.depth_max}/{stats.capacity} | "
+                             f"full {stats.full}x, producers blocked {stats.blocked_seconds:.2f}s")
+            return "\n".join(lines)
+
+
+pipeline_stats = PipelineStats()
+
+
+async def _put(queue, item, name, stats):
+    """Put with backpressure accounting: a full queue makes the producer wait, and the wait is recorded."""
+    waited = None
+    if queue.full():
+        start = time.perf_counter()
+        await queue.put(item)
+        waited = time.perf_counter() - start
+    else:
+        queue.put_nowait(item)
+    stats.record_put(name, queue.qsize(), waited)
+
+
+async def _run(items, stages, maxsize, stats):
+    loop = asyncio.get_running_loop()
+    queues = [asyncio.Queue(maxsize) for _ in stages]  # queues[i] feeds stages[i]
+    finished = [0] * len(stages)
+    results = []
+
+    async def feed():
+        for item in items:
+            await _put(queues[0], item, stages[0].name, stats)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def work(index, executor):
+        stage = stages[index]
+        downstream = stages[index + 1] if index + 1 < len(stages) else None
+        done = False
+        while not done:
+            item = await queues[index].get()
+            if item is _DONE:
+                break
+            batch = [item]
+            while stage.batch and len(batch) < stage.batch:
+                try:
+                    item = queues[index].get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:  # This worker's own end marker: finish the batch, then stop
+                    done = True
+                    break
+                batch.append(item)
+
+            start = time.perf_counter()
+            context = contextvars.copy_context()
+            output = await loop.run_in_executor(executor, context.run, stage.fn, batch if stage.batch else batch[0])
+            stats.record_work(stage.name, len(batch), time.perf_counter() - start)
+            for result in (output if stage.batch else [output]):
+                if downstream is None:
+                    results.append(result)
+                else:
+                    await _put(queues[index + 1], result, downstream.name, stats)
+
+        finished[index] += 1
+        if downstream is not None and finished[index] == stage.workers:
+            for _ in range(downstream.workers):
+                await queues[index + 1].put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=sum(stage.workers for stage in stages))
+    tasks = [asyncio.ensure_future(feed())]
+    tasks += [asyncio.ensure_future(work(index, executor))
+              for index, stage in enumerate(stages) for _ in range(stage.workers)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    return results
+
+
+def run_pipeline(items, stages, maxsize=2, stats=pipeline_stats):
+    """Stream `items` through `stages` (each fed by a queue of at most `maxsize`); returns the last stage's outputs."""
+    items = list(items)
+    if not items:
+        return []
+    start = time.perf_counter()
+    results = asyncio.run(_run(items, stages, maxsize, stats))
+    stats.record_run(stages, maxsize, time.perf_counter() - start)
+    return results
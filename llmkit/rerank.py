@@ -0,0 +1,130 @@
+"""
+Rerankers with chunking, per-document score caching and an offline fallback.
+
+Scores are cached per (query, sha256(document)), so reranking a growing
+candidate list only sends the documents that have not been scored yet:
+calling rerank() after every iteration costs one small request each time,
+and the final rerank is free.
+
+Backends:
+  - CohereReranker: rerank-english-v3.0, documents split into chunks that
+    fit the per-request limit. Cohere relevance scores are absolute per
+    (query, document) pair, so scores from different chunks are comparable
+    and merge by a plain sort.
+  - LocalReranker: a sentence-transformers cross-encoder running on this
+    machine (no API key, works offline or against a stand-in server).
+"""
+
+import hashlib
+import os
+import threading
+
+from llmkit.telemetry import COHERE_RERANK_PRICE, span
+
+COHERE_MODEL = "rerank-english-v3.0"
+MAX_DOCUMENTS_PER_REQUEST = 1000  # Cohere's per-request document limit
+LOCAL_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def document_hash(document):
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    """Base class: score caching and ranking. Subclasses implement `_score`."""
+
+    name = "reranker"
+
+    def __init__(self):
+        self._scores = {}
+        self._lock = threading.Lock()
+        self.documents_scored = 0  # Documents actually sent to the backend
+        self.cache_hits = 0
+
+    def _score(self, query, documents):
+        """Return one relevance score (higher = more relevant) per document."""
+        raise NotImplementedError
+
+    def rerank(self, query, documents):
+        """
+        Rank documents by relevance to the query.
+
+        Returns a list of (document_index, score) tuples, highest score first.
+        """
+        keys = [(query, document_hash(document)) for document in documents]
+        with self._lock:
+            missing = {}
+            for document, key in zip(documents, keys):
+                if key in self._scores:
+                    self.cache_hits += 1
+                else:
+                    missing.setdefault(key, document)
+
+        # Scored outside the lock so concurrent reranks don't queue behind one
+        # backend call (two callers may both score a new document; same result)
+        scores = self._score(query, list(missing.values())) if missing else []
+
+        with self._lock:
+            self._scores.update(zip(missing.keys(), scores))
+            self.documents_scored += len(missing)
+            ranked = [(index, self._scores[key]) for index, key in enumerate(keys)]
+        return sorted(ranked, key=lambda item: item[1], reverse=True)
+
+
+class CohereReranker(Reranker):
+    name = f"Cohere {COHERE_MODEL}"
+
+    def __init__(self, client_factory, model=COHERE_MODEL, max_documents=MAX_DOCUMENTS_PER_REQUEST):
+        """`client_factory` returns a cohere.Client; it is only called when a request is needed."""
+        super().__init__()
+        self._client_factory = client_factory
+        self.model = model
+        self.max_documents = max_documents
+        self.requests = 0
+
+    def _score(self, query, documents):
+        client = self._client_factory()
+        scores = [0.0] * len(documents)
+        for start in range(0, len(documents), self.max_documents):
+            chunk = documents[start:start + self.max_documents]
+            with span("cohere.rerank", kind="cohere", model=self.model, documents=len(chunk)) as active:
+                results = client.rerank(model=self.model, query=query, documents=chunk, top_n=len(chunk))
+                units = getattr(getattr(getattr(results, "meta", None), "billed_units", None), "search_units", None)
+                active.set(search_units=units or 1, cost_usd=(units or 1) * COHERE_RERANK_PRICE)
+            with self._lock:
+                self.requests += 1
+            for result in results.results:
+                # result.index is relative to this chunk
+                scores[start + result.index] = result.relevance_score
+        return scores
+
+
+class LocalReranker(Reranker):
+    name = f"local cross-encoder {LOCAL_MODEL}"
+
+    def __init__(self, model=LOCAL_MODEL, batch_size=32):
+        super().__init__()
+        self.model_name = model
+        self.batch_size = batch_size
+        self._model = None
+
+    def _score(self, query, documents):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name)
+        # Single-label cross-encoders apply a sigmoid, so scores are 0-1 like Cohere's
+        with span("local.rerank", kind="local-rerank", model=self.model_name, documents=len(documents)):
+            scores = self._model.predict([(query, document) for document in documents], batch_size=self.batch_size)
+        return [float(score) for score in scores]
+
+
+def make_reranker(cohere_client_factory):
+    """
+    Cohere when COHERE_API_KEY is set, the local cross-encoder otherwise.
+    RERANKER=local|cohere forces a backend.
+    """
+    backend = os.getenv("RERANKER")
+    if backend == "local" or (backend is None and not os.getenv("COHERE_API_KEY")):
+        return LocalReranker()
+    return CohereReranker(cohere_client_factory)
@@ -0,0 +1,318 @@
+"""
+Rate-limit aware scheduling for Claude and Cohere calls.
+
+Every request goes through a RateLimiter before it is sent:
+  - token buckets for requests/min, input tokens/min and output tokens/min
+    (input tokens are estimated from the request size, output tokens are
+    reserved at max_tokens; both are settled against `usage` afterwards)
+  - priority classes: when capacity is short, waiting "final" requests go
+    before "judge" requests, which go before "explore" requests
+  - retries with exponential backoff and full jitter on 429/529/5xx and
+    connection errors; a retry-after header wins over the computed delay
+    and pauses every caller of that limiter, not just the one that got it
+
+    client.messages.create(model=..., messages=[...], priority="explore")
+
+`priority` is consumed here and never reaches the API (or the cache key).
+Limits come from the environment (0 disables a bucket):
+
+    ANTHROPIC_RPM, ANTHROPIC_INPUT_TPM, ANTHROPIC_OUTPUT_TPM, COHERE_RPM,
+    LLM_MAX_RETRIES
+
+ANTHROPIC_BASE_URL / CO_API_URL point the SDKs at a stand-in server.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+from llmkit.telemetry import annotate
+
+PRIORITIES = {"final": 0, "judge": 1, "explore": 2}
+DEFAULT_PRIORITY = "judge"
+
+DEFAULT_ANTHROPIC_RPM = 50
+DEFAULT_ANTHROPIC_INPUT_TPM = 50000
+DEFAULT_ANTHROPIC_OUTPUT_TPM = 10000
+DEFAULT_COHERE_RPM = 100
+DEFAULT_MAX_RETRIES = 6
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRY_ERRORS = {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError"}
+BASE_DELAY = 1.0  # seconds, doubled per attempt
+MAX_DELAY = 60.0
+
+
+def estimate_input_tokens(request):
+    """Rough input size: ~4 characters per token over everything that is sent as input."""
+    payload = {key: request.get(key) for key in ("system", "messages", "tools", "query", "documents")}
+    return max(1, len(json.dumps(payload, default=str)) // 4)
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` per second up to `per_minute`. Not thread-safe on its own."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (an oversized amount only needs a full bucket)."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount  # May go negative: the debt delays later callers
+
+    def give_back(self, amount, now):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Token buckets plus a priority queue of waiting callers."""
+
+    def __init__(self, name, requests_per_minute=0, input_tokens_per_minute=0, output_tokens_per_minute=0,
+                 max_retries=DEFAULT_MAX_RETRIES):
+        self.name = name
+        self.max_retries = max_retries
+        self._buckets = {}
+        for kind, limit in (("requests", requests_per_minute), ("input", input_tokens_per_minute),
+                            ("output", output_tokens_per_minute)):
+            if limit:
+                self._buckets[kind] = TokenBucket(limit)
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority rank, arrival number)
+        self._arrivals = itertools.count()
+        self._paused_until = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.waited = {priority: 0.0 for priority in PRIORITIES}  # Seconds spent queued
+
+    def acquire(self, input_tokens=0, output_tokens=0, priority=DEFAULT_PRIORITY):
+        """Block until this request may be sent; returns its reservation."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}; expected one of {sorted(PRIORITIES)}")
+        reservation = {"requests": 1, "input": input_tokens, "output": output_tokens}
+        ticket = (PRIORITIES[priority], next(self._arrivals))
+        start = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                now = time.monotonic()
+                if self._waiters[0] == ticket:
+                    delay = max([self._paused_until - now] + [
+                        bucket.wait_time(reservation[kind], now) for kind, bucket in self._buckets.items()
+                    ])
+                    if delay <= 0:
+                        for kind, bucket in self._buckets.items():
+                            bucket.take(reservation[kind], now)
+                        heapq.heappop(self._waiters)
+                        self.requests += 1
+                        self.waited[priority] += now - start
+                        self._cond.notify_all()  # The next in line becomes head
+                        return reservation
+                    self._cond.wait(delay)
+                else:
+                    # Not at the head: wait until the queue changes (a higher
+                    # priority arrival or the head leaving)
+                    self._cond.wait()
+
+    def settle(self, reservation, input_tokens=None, output_tokens=None):
+        """Return unused reserved tokens (or charge the overrun) once actual usage is known."""
+        now = time.monotonic()
+        with self._cond:
+            for kind, actual in (("input", input_tokens), ("output", output_tokens)):
+                bucket = self._buckets.get(kind)
+                if bucket is not None and actual is not None:
+                    bucket.give_back(reservation[kind] - actual, now)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold every caller for `seconds` (a retry-after applies to the whole account)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def call(self, send, request, input_tokens, output_tokens, priority):
+        """Acquire, send, and retry retryable failures with backoff. Returns (response, reservation)."""
+        queued = 0.0
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            reservation = self.acquire(input_tokens, output_tokens, priority)
+            queued += time.monotonic() - start
+            annotate(retries=attempt, queue_seconds=queued)
+            try:
+                return send(**request), reservation
+            except Exception as exc:
+                # A failed request used no output tokens
+                self.settle(reservation, output_tokens=0)
+                status = status_code(exc)
+                if attempt == self.max_retries or not retryable(exc):
+                    raise
+                with self._cond:
+                    self.retries += 1
+                    if status == 429:
+                        self.rate_limited += 1
+                delay = backoff_delay(attempt)
+                wait = retry_after(exc)
+                if wait is not None:
+                    delay = wait + random.uniform(0, BASE_DELAY)
+                    self.pause(wait)
+                time.sleep(delay)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'waited': dict(self.waited),
+            }
+
+    def report(self):
+        stats = self.stats()
+        waited = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in stats['waited'].items())
+        return (f"Scheduler ({self.name}): {stats['requests']} sends | {stats['retries']} retries | "
+                f"{stats['rate_limited']} rate-limited | queued {waited}")
+
+
+def status_code(exc):
+    return getattr(exc, "status_code", None)
+
+
+def retryable(exc):
+    return status_code(exc) in RETRY_STATUS or type(exc).__name__ in RETRY_ERRORS
+
+
+def retry_after(exc):
+    """Seconds from a retry-after(-ms) header on an SDK error, if any."""
+    headers = getattr(exc, "headers", None)  # cohere ApiError
+    if headers is None:
+        response = getattr(exc, "response", None)  # anthropic APIStatusError
+        headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    headers = {key.lower(): value for key, value in headers.items()}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP-date form: fall back to backoff
+    return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+
+def limiter_from_env(name, prefix, requests_per_minute, input_tokens_per_minute=0, output_tokens_per_minute=0):
+    return RateLimiter(
+        name,
+        requests_per_minute=float(os.getenv(f"{prefix}_RPM", requests_per_minute)),
+        input_tokens_per_minute=float(os.getenv(f"{prefix}_INPUT_TPM", input_tokens_per_minute)),
+        output_tokens_per_minute=float(os.getenv(f"{prefix}_OUTPUT_TPM", output_tokens_per_minute)),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+    )
+
+
+class ScheduledStream:
+    """Context manager around `messages.stream`: retries opening the stream, settles on close."""
+
+    def __init__(self, limiter, messages, request, priority):
+        self._limiter = limiter
+        self._messages = messages
+        self._request = request
+        self._priority = priority
+        self._manager = None
+        self._stream = None
+        self._reservation = None
+
+    def _open(self, **request):
+        manager = self._messages.stream(**request)
+        stream = manager.__enter__()  # Sends the request; errors surface here
+        return manager, stream
+
+    def __enter__(self):
+        (self._manager, self._stream), self._reservation = self._limiter.call(
+            self._open, self._request, estimate_input_tokens(self._request),
+            self._request.get("max_tokens", 0), self._priority,
+        )
+        return self._stream
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._manager.__exit__(*exc_info)
+        finally:
+            usage = getattr(getattr(self._stream, "current_message_snapshot", None), "usage", None)
+            self._limiter.settle(self._reservation, getattr(usage, "input_tokens", None),
+                                 getattr(usage, "output_tokens", None))
+
+
+class ScheduledMessages:
+    """Drop-in for `client.messages`: create/stream go through the limiter."""
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self._limiter = limiter
+
+    @property
+    def _messages(self):
+        return self._client.messages
+
+    def create(self, priority=DEFAULT_PRIORITY, **request):
+        response, reservation = self._limiter.call(
+            self._messages.create, request, estimate_input_tokens(request), request.get("max_tokens", 0), priority,
+        )
+        usage = getattr(response, "usage", None)
+        self._limiter.settle(reservation, getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None))
+        return response
+
+    def stream(self, priority=DEFAULT_PRIORITY, **request):
+        return ScheduledStream(self._limiter, self._messages, request, priority)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class ScheduledClient:
+    """Wraps an Anthropic client (built with max_retries=0: retries happen here)."""
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self.scheduler = limiter
+        self.messages = ScheduledMessages(client, limiter)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class ScheduledCohere:
+    """Wraps a cohere.Client so `rerank` goes through a limiter."""
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self.scheduler = limiter
+
+    def rerank(self, priority=DEFAULT_PRIORITY, **request):
+        response, _ = self.scheduler.call(self._client.rerank, request, estimate_input_tokens(request), 0, priority)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
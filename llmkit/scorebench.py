@@ -0,0 +1,142 @@
+"""
+Speed and rank agreement of the similarity scorers (llmkit.similarity).
+
+    python -m llmkit.scorebench                                  # every backend
+    python -m llmkit.scorebench --backend bertscore --backend embedding-int8 --repeat 5
+
+Candidates come from a JSONL file of {"prompt", "output"} rows (default: the
+judge calibration fixtures). The first output for each prompt is the
+reference and the others are scored against it. A row can name its own
+"reference" instead.
+
+For each backend it reports model load time, then the wall and CPU
+milliseconds per candidate with a cold memo (the model stays loaded). When
+BERTScore ran too, it also reports how well each backend's ranking agrees
+with it: Spearman per reference (mean over references with 3+ candidates),
+Spearman over all candidates pooled, and how often both pick the same best
+candidate. A backend whose dependencies are missing is reported as skipped.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from llmkit.similarity import BACKENDS, build_scorer
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                                "PromptAgentic", "fixtures", "judge_calibration.jsonl")
+
+
+def load_pairs(path):
+    """[(candidate, reference)] from the fixture rows."""
+    references = {}
+    pairs = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if 'reference' in row:
+                pairs.append((row['output'], row['reference']))
+            elif row['prompt'] not in references:
+                references[row['prompt']] = row['output']
+            else:
+                pairs.append((row['output'], references[row['prompt']]))
+    return pairs
+
+
+def spearman(xs, ys):
+    """Spearman rank correlation (average ranks for ties); None for fewer than 2 values or no variance."""
+    if len(xs) < 2:
+        return None
+    rx, ry = (np.argsort(np.argsort(values, kind="stable"), kind="stable").astype(float) for values in (xs, ys))
+    for ranks, values in ((rx, np.asarray(xs)), (ry, np.asarray(ys))):
+        for value in np.unique(values):
+            tied = values == value
+            ranks[tied] = ranks[tied].mean()
+    if rx.std() == 0 or ry.std() == 0:
+        return None
+    return float(np.corrcoef(rx, ry)[0, 1])
+
+
+def measure(backend, pairs, repeat):
+    """Scores plus load time and per-candidate wall/CPU ms (median over `repeat` cold passes)."""
+    scorer = build_scorer(backend)
+    candidates = [candidate for candidate, _ in pairs]
+    references = [reference for _, reference in pairs]
+    start = time.perf_counter()
+    scorer.score(["warm-up"], "warm-up")  # Loads the model
+    load_seconds = time.perf_counter() - start
+
+    walls, cpus = [], []
+    for _ in range(repeat):
+        scorer.clear()
+        wall, cpu = time.perf_counter(), time.process_time()
+        f1 = scorer.score(candidates, references)['f1']
+        walls.append((time.perf_counter() - wall) / len(pairs) * 1000)
+        cpus.append((time.process_time() - cpu) / len(pairs) * 1000)
+    return {'name': scorer.name, 'load_seconds': load_seconds, 'wall_ms': float(np.median(walls)),
+            'cpu_ms': float(np.median(cpus)), 'f1': f1}
+
+
+def agreement(pairs, scores, baseline):
+    """Rank agreement of `scores` with `baseline` (both aligned with pairs)."""
+    groups = {}
+    for i, (_, reference) in enumerate(pairs):
+        groups.setdefault(reference, []).append(i)
+    per_reference = [spearman([scores[i] for i in rows], [baseline[i] for i in rows])
+                     for rows in groups.values() if len(rows) >= 3]
+    per_reference = [rho for rho in per_reference if rho is not None]
+    same_best = [max(rows, key=lambda i: scores[i]) == max(rows, key=lambda i: baseline[i])
+                 for rows in groups.values() if len(rows) >= 2]
+    return {
+        'spearman_per_reference': float(np.mean(per_reference)) if per_reference else None,
+        'spearman_pooled': spearman(scores, baseline),
+        'top1_agreement': float(np.mean(same_best)) if same_best else None,
+    }
+
+
+def report(results, pairs):
+    baseline = results.get("bertscore", {}).get('f1')
+    print(f"{len(pairs)} candidates, {len({reference for _, reference in pairs})} references")
+    print(f"{'Backend':<16}{'Load s':>8}{'Wall ms/cand':>14}{'CPU ms/cand':>13}{'rho/ref':>9}{'rho pooled':>12}{'Top-1':>7}")
+    fmt = lambda value, spec: format(value, spec) if value is not None else "-"
+    for backend, result in results.items():
+        if 'skipped' in result:
+            print(f"{backend:<16}skipped: {result['skipped']}")
+            continue
+        agree = agreement(pairs, result['f1'], baseline) if baseline and backend != "bertscore" else {}
+        print(f"{backend:<16}{result['load_seconds']:>8.2f}{result['wall_ms']:>14.2f}{result['cpu_ms']:>13.2f}"
+              f"{fmt(agree.get('spearman_per_reference'), '.3f'):>9}{fmt(agree.get('spearman_pooled'), '.3f'):>12}"
+              f"{fmt(agree.get('top1_agreement'), '.0%'):>7}")
+    if not baseline:
+        print("Rank agreement needs the bertscore backend (torch, transformers).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark similarity scorers against BERTScore.")
+    parser.add_argument("--backend", choices=BACKENDS, action="append",
+                        help="Backend to run (repeatable; default: all)")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="JSONL rows with prompt/output (or reference)")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold scoring passes per backend; the median is reported")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.fixtures)
+    results = {}
+    for backend in args.backend or BACKENDS:
+        try:
+            results[backend] = measure(backend, pairs, args.repeat)
+        except ImportError as exc:
+            results[backend] = {'skipped': f"{type(exc).__name__}: {exc}"}
+    report(results, pairs)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Similarity scorers: how close each candidate is to a reference.
+
+Every scorer has BertScorer's interface, so they are interchangeable:
+
+    scorer = make_scorer("embedding")
+    scorer.score(candidates, reference)  # {'precision': [...], 'recall': [...], 'f1': [...]}
+
+Backends (make_scorer, or SIMILARITY_SCORER in the environment):
+  - bertscore: llmkit.bertscore, roberta-large token alignment. Accurate,
+    and the slowest step per candidate on CPU. The default.
+  - bertscore-pool: the same scores from worker processes
+    (llmkit.bertscore_pool), so the caller is free while they are computed
+  - embedding: one all-MiniLM-L6-v2 sentence embedding per text, cosine
+    against the reference embedding in one batched NumPy product
+  - embedding-onnx / embedding-int8: the same model on ONNX Runtime, with
+    fp32 or int8-quantized weights (pip install "sentence-transformers[onnx]")
+
+Embedding scorers report the cosine as precision, recall and f1. Their
+scale is not BERTScore's, so only compare scores from one backend.
+score_async(scorer, ...) gives a Future for any backend: bertscore-pool's
+runs in its worker processes, the others on a background thread (torch and
+the tokenizers release the GIL, so API calls proceed meanwhile).
+`python -m llmkit.scorebench` measures speed and rank agreement.
+"""
+
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from llmkit.telemetry import in_context, span
+
+SENTENCE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"  # Quantized export shipped in the model repo
+BACKENDS = ("bertscore", "bertscore-pool", "embedding", "embedding-onnx", "embedding-int8")
+
+
+class HashingEmbedder:
+    """Hashed character 3-grams: no model, catches rewordings that share most of their text."""
+
+    name = "hashing-3gram"
+    threshold = 0.9
+
+    def __init__(self, dimensions=4096, ngram=3):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = " ".join(text.lower().split())
+            for start in range(max(1, len(text) - self.ngram + 1)):
+                # crc32, not hash(): the buckets must match across processes
+                vectors[row, zlib.crc32(text[start:start + self.ngram].encode("utf-8")) % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceEmbedder:
+    """L2-normalized sentence-transformers embeddings; backend "torch" or "onnx" (`onnx_file` picks the export)."""
+
+    threshold = 0.95
+
+    def __init__(self, model=SENTENCE_MODEL, backend="torch", onnx_file=None, batch_size=32):
+        self.model_name = model
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name} ({self.onnx_file or 'onnx'})"
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                if self.backend == "torch":
+                    self._model = SentenceTransformer(self.model_name)
+                else:
+                    model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else {}
+                    self._model = SentenceTransformer(self.model_name, backend="onnx", model_kwargs=model_kwargs)
+        return self._model
+
+    def embed(self, texts):
+        model = self._load()
+        with span("embed", kind="local-embed", model=self.name, texts=len(texts)):
+            vectors = model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class EmbeddingScorer:
+    """Cosine between sentence embeddings; each distinct text is embedded once."""
+
+    def __init__(self, embedder, memo_size=4096):
+        self.embedder = embedder
+        self.name = f"embedding cosine ({embedder.name})"
+        self.memo_size = memo_size
+        self._vectors = OrderedDict()  # text -> embedding
+        self._lock = threading.Lock()
+
+    def _embed(self, texts):
+        missing = [text for text in dict.fromkeys(texts) if text not in self._vectors]
+        if missing:
+            self._vectors.update(zip(missing, self.embedder.embed(missing)))
+        vectors = np.stack([self._vectors[text] for text in texts])
+        for text in texts:
+            self._vectors.move_to_end(text)
+        while len(self._vectors) > self.memo_size:
+            self._vectors.popitem(last=False)
+        return vectors
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+
+    def score(self, candidates, references):
+        """Same arguments and result as BertScorer.score (the best of several references wins)."""
+        if isinstance(references, str):
+            references = [references] * len(candidates)
+        reference_sets = [[r] if isinstance(r, str) else list(r) for r in references]
+        if not candidates:
+            return {'precision': [], 'recall': [], 'f1': []}
+
+        with span("similarity.score", kind="embedding", model=self.embedder.name, candidates=len(candidates)), \
+                self._lock:
+            owners = [i for i, refs in enumerate(reference_sets) for _ in refs]
+            flat_references = [ref for refs in reference_sets for ref in refs]
+            vectors = self._embed(list(candidates) + flat_references)
+            candidate_vectors, reference_vectors = vectors[:len(candidates)], vectors[len(candidates):]
+            # Row-wise dot products of unit vectors: one cosine per (candidate, reference) pair
+            cosines = np.einsum("ij,ij->i", candidate_vectors[owners], reference_vectors)
+            f1 = np.full(len(candidates), -1.0)
+            np.maximum.at(f1, owners, cosines)
+        f1 = [float(value) for value in f1]
+        return {'precision': f1, 'recall': list(f1), 'f1': list(f1)}
+
+
+def build_scorer(backend):
+    """A new scorer for `backend` (see BACKENDS)."""
+    if backend == "bertscore":
+        from llmkit.bertscore import BertScorer
+        return BertScorer()
+    if backend == "bertscore-pool":
+        from llmkit.bertscore_pool import BertScorePool
+        return BertScorePool()
+    if backend == "embedding":
+        return EmbeddingScorer(SentenceEmbedder())
+    if backend == "embedding-onnx":
+        return EmbeddingScorer(SentenceEmbedder(backend="onnx"))
+    if backend == "embedding-int8":
+        return EmbeddingScorer(SentenceEmbedder(backend="onnx", onnx_file=ONNX_INT8_FILE))
+    raise ValueError(f"Unknown similarity scorer {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+
+def make_scorer(backend=None):
+    """Process-wide scorer for `backend` (default: SIMILARITY_SCORER, else bertscore), created on first use."""
+    backend = backend or os.getenv("SIMILARITY_SCORER", "bertscore")
+    if backend == "bertscore":
+        from llmkit.bertscore import get_scorer
+        return get_scorer()  # Shared with callers of get_scorer()
+    with _scorers_lock:
+        if backend not in _scorers:
+            _scorers[backend] = build_scorer(backend)
+        return _scorers[backend]
+
+
+_background = None  # One thread: the in-process scorers serialize on their own lock anyway
+_background_lock = threading.Lock()
+
+
+def score_async(scorer, candidates, references):
+    """A Future of scorer.score(...), computed in the background so the caller can make API calls meanwhile."""
+    if hasattr(scorer, "score_async"):
+        return scorer.score_async(candidates, references)
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="similarity")
+    return _background.submit(in_context(scorer.score), candidates, references)
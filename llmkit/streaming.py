@@ -0,0 +1,101 @@
+"""
+Streaming generation with time-to-first-token and an output word budget.
+
+`messages.create` returns only once the whole completion exists. Streaming
+gives the same text, but the first token arrives early, which the stats
+record. Generation can also stop as soon as the output passes a word
+budget: closing the stream ends the request, so the tokens after the cut
+are never generated or billed.
+
+    result = stream_text(client, word_budget=60, model=..., max_tokens=100, messages=[...])
+    result['text'], result['ttft'], result['truncated']
+"""
+
+import re
+import threading
+import time
+
+SENTENCE_END = re.compile(r"[.!?][\"')\]]?(?=\s|$)")
+
+
+def trim_to_budget(text, word_budget):
+    """
+    Cut `text` to at most `word_budget` words, preferring the last full
+    sentence when that keeps at least half the budget.
+    """
+    words = text.split()
+    if len(words) <= word_budget:
+        return text.strip()
+    hard_cut = " ".join(words[:word_budget])
+    sentence_ends = [match.end() for match in SENTENCE_END.finditer(hard_cut)]
+    if sentence_ends and len(hard_cut[:sentence_ends[-1]].split()) >= word_budget / 2:
+        return hard_cut[:sentence_ends[-1]]
+    return hard_cut
+
+
+class StreamStats:
+    """Thread-safe timings for streamed generations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ttfts = []
+        self.latencies = []
+        self.truncated = 0
+
+    def record(self, ttft, latency, truncated):
+        with self._lock:
+            if ttft is not None:
+                self.ttfts.append(ttft)
+            self.latencies.append(latency)
+            if truncated:
+                self.truncated += 1
+
+    @staticmethod
+    def _percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+    def report(self):
+        with self._lock:
+            if not self.latencies:
+                return "Streaming: no streamed generations"
+            return (f"Streaming: {len(self.latencies)} generations | "
+                    f"TTFT p50 {self._percentile(self.ttfts, 0.5):.2f}s p95 {self._percentile(self.ttfts, 0.95):.2f}s | "
+                    f"total p50 {self._percentile(self.latencies, 0.5):.2f}s | "
+                    f"{self.truncated} cut at the word budget")
+
+
+stream_stats = StreamStats()
+
+
+def stream_text(client, word_budget=None, stats=stream_stats, **request):
+    """
+    Stream one completion. Returns a dict with the text, ttft and total
+    latency in seconds, and whether the word budget cut it short.
+    """
+    start = time.perf_counter()
+    ttft = None
+    chunks = []
+    words = 0  # Running count, so the budget check is O(chunk) rather than O(text)
+    mid_word = False  # The text so far ends inside a word
+    truncated = False
+    with client.messages.stream(**request) as stream:
+        for chunk in stream.text_stream:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            chunks.append(chunk)
+            if chunk:
+                words += len(chunk.split())
+                if mid_word and not chunk[0].isspace():
+                    words -= 1  # The chunk continues the last word
+                mid_word = not chunk[-1].isspace()
+            # Leaving the `with` block closes the connection, which stops generation
+            if word_budget and words > word_budget:
+                truncated = True
+                break
+    text = "".join(chunks)
+    if truncated:
+        text = trim_to_budget(text, word_budget)
+    latency = time.perf_counter() - start
+    stats.record(ttft, latency, truncated)
+    return {'text': text.strip(), 'ttft': ttft, 'latency': latency, 'truncated': truncated}
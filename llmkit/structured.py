@@ -0,0 +1,153 @@
+"""
+Structured (tool-use) output for judge calls.
+
+Instead of asking the model to "start your response with ONLY the number"
+and hoping `float(lines[0])` works, the judge is forced to call a single
+tool whose input_schema is the verdict. The tool input is validated
+strictly against that schema; only a parse/validation failure triggers a
+retry (bounded by `max_retries`), and every failure is counted so the
+parse-failure rate can be reported at the end of a run.
+
+    verdict = structured_call(
+        client,
+        tool_name="submit_verdict",
+        description="Record the evaluation.",
+        schema={"type": "object", "properties": {...}, "required": [...]},
+        model="claude-3-haiku-20240307", max_tokens=500, temperature=0.1,
+        messages=[{"role": "user", "content": prompt}],
+    )
+"""
+
+import threading
+
+DEFAULT_MAX_RETRIES = 2
+
+
+class JudgeParseError(ValueError):
+    """The model's structured output was missing or did not match the schema."""
+
+
+class ParseStats:
+    """Thread-safe counters for structured calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0  # Logical judge calls
+        self.requests = 0  # API requests, including retries
+        self.parse_failures = 0
+        self.exhausted = 0  # Calls that never produced a valid verdict
+
+    def record(self, parsed):
+        with self._lock:
+            self.requests += 1
+            if not parsed:
+                self.parse_failures += 1
+
+    def finish(self, succeeded):
+        with self._lock:
+            self.calls += 1
+            if not succeeded:
+                self.exhausted += 1
+
+    def failure_rate(self):
+        return self.parse_failures / self.requests if self.requests else 0.0
+
+    def report(self):
+        return (f"Structured judges: {self.calls} calls | {self.requests} requests | "
+                f"{self.parse_failures} parse failures ({self.failure_rate():.1%}) | "
+                f"{self.exhausted} gave up after retries")
+
+
+parse_stats = ParseStats()
+
+
+def validate(value, schema, path="$"):
+    """Minimal strict JSON-schema check (object/string/number/integer/array, required, min/max, enum)."""
+    expected = schema.get("type")
+    if expected == "object":
+        if not isinstance(value, dict):
+            raise JudgeParseError(f"{path}: expected object, got {type(value).__name__}")
+        for key in schema.get("required", []):
+            if key not in value:
+                raise JudgeParseError(f"{path}: missing required field '{key}'")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                validate(value[key], subschema, f"{path}.{key}")
+    elif expected in ("number", "integer"):
+        # bool is an int subclass; a judge answering `true` is not a score
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise JudgeParseError(f"{path}: expected {expected}, got {value!r}")
+        if expected == "integer" and not float(value).is_integer():
+            raise JudgeParseError(f"{path}: expected integer, got {value!r}")
+        if "minimum" in schema and value < schema["minimum"]:
+            raise JudgeParseError(f"{path}: {value} < minimum {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            raise JudgeParseError(f"{path}: {value} > maximum {schema['maximum']}")
+    elif expected == "string":
+        if not isinstance(value, str):
+            raise JudgeParseError(f"{path}: expected string, got {type(value).__name__}")
+    elif expected == "array":
+        if not isinstance(value, list):
+            raise JudgeParseError(f"{path}: expected array, got {type(value).__name__}")
+        for i, item in enumerate(value):
+            validate(item, schema.get("items", {}), f"{path}[{i}]")
+    if "enum" in schema and value not in schema["enum"]:
+        raise JudgeParseError(f"{path}: {value!r} not in {schema['enum']}")
+
+
+def extract_tool_input(response, tool_name):
+    """Return the input of the forced tool call, or raise JudgeParseError."""
+    if getattr(response, "stop_reason", None) == "max_tokens":
+        raise JudgeParseError("response was cut off by max_tokens")
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == tool_name:
+            return block.input
+    raise JudgeParseError(f"no '{tool_name}' tool call in response")
+
+
+def structured_call(client, tool_name, description, schema, max_retries=DEFAULT_MAX_RETRIES,
+                    stats=parse_stats, **request):
+    """
+    Force a single tool call and return its validated input (a dict).
+
+    Retries only when the output fails to parse/validate; API errors are
+    raised as-is. Raises JudgeParseError once `max_retries` is exhausted.
+    """
+    request = dict(
+        request,
+        tools=[{"name": tool_name, "description": description, "input_schema": schema}],
+        tool_choice={"type": "tool", "name": tool_name},
+    )
+    last_error = None
+    for _ in range(max_retries + 1):
+        response = client.messages.create(**request)
+        try:
+            verdict = extract_tool_input(response, tool_name)
+            validate(verdict, schema)
+        except JudgeParseError as exc:
+            stats.record(parsed=False)
+            last_error = exc
+            # Never replay an unusable response from the response cache
+            forget = getattr(client.messages, "forget", None)
+            if forget is not None:
+                forget(**request)
+            continue
+        stats.record(parsed=True)
+        stats.finish(succeeded=True)
+        return verdict
+
+    stats.finish(succeeded=False)
+    raise JudgeParseError(f"{tool_name}: no valid output after {max_retries + 1} attempts ({last_error})")
+
+
+def score_field(minimum=0, maximum=10, description=""):
+    """Schema for a bounded numeric score."""
+    return {"type": "number", "minimum": minimum, "maximum": maximum, "description": description}
+
+
+def criteria_schema(criteria, minimum=1, maximum=10):
+    """Schema for a CoT judge: step-by-step reasoning plus one score per criterion."""
+    properties = {"reasoning": {"type": "string", "description": "Step-by-step assessment against each criterion"}}
+    for criterion in criteria:
+        properties[criterion] = score_field(minimum, maximum, f"{criterion} ({minimum}-{maximum})")
+    return {"type": "object", "properties": properties, "required": list(properties)}
@@ -0,0 +1,332 @@
+"""
+Per-call telemetry: nested spans, JSONL export and an end-of-run summary.
+
+Every Claude request, Cohere rerank and BERTScore pass is recorded as a
+span with its latency, tokens (including prompt-cache reads and writes),
+estimated cost, response-cache hit and retry count.
+Spans nest OpenTelemetry-style (trace_id / span_id / parent_id) under the
+spans the scripts open for iterations, variants and judges:
+
+    with span("iteration", index=1):
+        ...                                    # calls made here are its children
+
+    @traced("judge.minto")
+    def minto_judge(...): ...
+
+The current span lives in a contextvar, which worker threads do not
+inherit; wrap functions handed to a thread pool with `in_context(fn)` (or
+`in_span(parent, fn)` to attach them to a specific span).
+
+LLM_TRACE_PATH=trace.jsonl writes one JSON line per finished span. The
+summary keeps the first LLM_TRACE_MAX_SPANS spans in memory (the JSONL file
+gets all of them), so long batch runs stay bounded.
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from llmkit.prompt_cache import CACHE_READ_PRICE, CACHE_WRITE_PRICE
+
+# USD per million tokens (input, output); matched by model-name prefix
+MODEL_PRICES = {
+    "claude-3-haiku": (0.25, 1.25),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-opus": (15.00, 75.00),
+}
+BATCH_DISCOUNT = 0.5  # Message Batches are billed at half the token price
+COHERE_RERANK_PRICE = 2.00 / 1000  # USD per search unit
+DEFAULT_MAX_SPANS = 100000
+
+_current = contextvars.ContextVar("llmkit_span", default=None)
+_span_ids = itertools.count(1)
+
+
+def token_cost(model, input_tokens, output_tokens, cache_read_tokens=0, cache_write_tokens=0):
+    """USD for one call; `input_tokens` excludes the prompt-cache reads and writes, as in the API usage."""
+    for prefix, (input_price, output_price) in MODEL_PRICES.items():
+        if (model or "").startswith(prefix):
+            prompt_tokens = (input_tokens + cache_read_tokens * CACHE_READ_PRICE
+                             + cache_write_tokens * CACHE_WRITE_PRICE)
+            return (prompt_tokens * input_price + output_tokens * output_price) / 1e6
+    return 0.0
+
+
+class Span:
+    def __init__(self, name, parent=None, **attributes):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attributes = attributes
+        self.start = time.time()
+        self.end_time = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return (self.end_time or time.time()) - self.start
+
+    def end(self, error=None):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time()
+        if error is not None:
+            self.attributes['error'] = f"{type(error).__name__}: {error}"
+        tracer.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration': self.duration,
+            'thread': self.thread,
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def annotate(**attributes):
+    """Set attributes on the current span (no-op outside a span)."""
+    active = _current.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def start_span(name, **attributes):
+    """A child of the current span that is not made current; call .end() when done."""
+    return Span(name, _current.get(), **attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Open a span, make it current for the block, end it on exit."""
+    active = start_span(name, **attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    except BaseException as exc:
+        active.end(error=exc)
+        raise
+    finally:
+        _current.reset(token)
+        active.end()
+
+
+def traced(name, **attributes):
+    """Decorator: run the function inside its own span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def in_context(fn):
+    """Capture the current span now so `fn` keeps it when run on another thread."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # A Context can only be entered by one thread at a time: run each call in a copy
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def in_span(parent, fn):
+    """Run `fn` with `parent` as the current span (e.g. a per-variant span across pool tasks)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class Tracer:
+    """Collects finished spans; optionally appends them to a JSONL file."""
+
+    def __init__(self, path=None, max_spans=DEFAULT_MAX_SPANS):
+        self.path = path
+        self.max_spans = max_spans
+        self.dropped = 0
+        self.spans = []
+        self._lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv("LLM_TRACE_PATH"), int(os.getenv("LLM_TRACE_MAX_SPANS", DEFAULT_MAX_SPANS)))
+
+    def export(self, finished):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(finished)
+            else:
+                self.dropped += 1
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a")
+                self._file.write(json.dumps(finished.to_dict(), default=str) + "\n")
+                self._file.flush()
+
+    def report(self):
+        """Time, tokens and cost per kind of call, then per span name with self time."""
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return "Telemetry: no spans recorded"
+
+        lines = [f"\n{'='*116}", "TELEMETRY", f"{'='*116}",
+                 f"{'Calls':<28}{'n':>6}{'total s':>10}{'p50 s':>8}{'p95 s':>8}{'in tok':>10}{'out tok':>10}"
+                 f"{'pc read':>10}{'pc write':>10}{'cost $':>10}{'cached':>8}{'retries':>8}"]
+        calls = {}
+        for finished in spans:
+            kind = finished.attributes.get('kind')
+            if kind is not None:
+                calls.setdefault(kind, []).append(finished)
+        total_cost = 0.0
+        for kind, group in sorted(calls.items()):
+            billed = [s for s in group if not s.attributes.get('cache_hit')]
+            cost = sum(s.attributes.get('cost_usd', 0.0) for s in group)
+            total_cost += cost
+            durations = [s.duration for s in group]
+            lines.append(
+                f"{kind:<28}{len(group):>6}{sum(durations):>10.2f}{_percentile(durations, 0.5):>8.2f}"
+                f"{_percentile(durations, 0.95):>8.2f}"
+                f"{sum(s.attributes.get('input_tokens', 0) for s in billed):>10}"
+                f"{sum(s.attributes.get('output_tokens', 0) for s in billed):>10}"
+                f"{sum(s.attributes.get('cache_read_tokens', 0) for s in billed):>10}"
+                f"{sum(s.attributes.get('cache_write_tokens', 0) for s in billed):>10}{cost:>10.4f}"
+                f"{len(group) - len(billed):>8}{sum(s.attributes.get('retries', 0) for s in group):>8}"
+            )
+
+        # Self time = duration minus direct children; for a crew kickoff or an
+        # iteration this is the orchestration overhead (children may overlap
+        # when they ran concurrently, so it is clamped at zero)
+        children = {}
+        for finished in spans:
+            children.setdefault(finished.parent_id, []).append(finished)
+        lines += ["", f"{'Spans':<28}{'n':>6}{'total s':>10}{'self s':>8}"]
+        by_name = {}
+        for finished in spans:
+            if finished.attributes.get('kind') is None:
+                self_time = max(0.0, finished.duration - sum(c.duration for c in children.get(finished.span_id, [])))
+                total, own, count = by_name.get(finished.name, (0.0, 0.0, 0))
+                by_name[finished.name] = (total + finished.duration, own + self_time, count + 1)
+        for name, (total, own, count) in sorted(by_name.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<28}{count:>6}{total:>10.2f}{own:>8.2f}")
+        lines.append("(pc read / pc write: prompt-cache tokens; cached: responses replayed from the local cache)")
+        lines.append(f"\nEstimated cost: ${total_cost:.4f}" + (f" | trace: {self.path}" if self.path else "")
+                     + (f" | {self.dropped} spans past the in-memory limit not summarized" if self.dropped else ""))
+        return "\n".join(lines)
+
+
+tracer = Tracer.from_env()
+
+
+# --- Client instrumentation --------------------------------------------------
+
+def _record_usage(active, model, response):
+    usage = getattr(response, "usage", None)
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    output_tokens = getattr(usage, "output_tokens", 0) or 0
+    cache_read_tokens = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write_tokens = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    cached = active.attributes.get('cache_hit', False)
+    active.set(input_tokens=input_tokens, output_tokens=output_tokens, cache_read_tokens=cache_read_tokens,
+               cache_write_tokens=cache_write_tokens,
+               cost_usd=0.0 if cached else token_cost(model, input_tokens, output_tokens,
+                                                      cache_read_tokens, cache_write_tokens))
+
+
+class TracedStream:
+    """Context manager around `messages.stream` that spans the whole stream."""
+
+    def __init__(self, messages, request):
+        self._messages = messages
+        self._request = request
+        self._manager = None
+        self._span = None
+        self._token = None
+        self._stream = None
+
+    def __enter__(self):
+        self._span = start_span("anthropic.messages.stream", kind="anthropic", model=self._request.get("model"),
+                                priority=self._request.get("priority"))
+        self._token = _current.set(self._span)
+        self._manager = self._messages.stream(**self._request)
+        try:
+            self._stream = self._manager.__enter__()
+        except BaseException as exc:
+            _current.reset(self._token)
+            self._span.end(error=exc)
+            raise
+        return self._stream
+
+    def __exit__(self, *exc_info):
+        try:
+            return self._manager.__exit__(*exc_info)
+        finally:
+            _record_usage(self._span, self._request.get("model"),
+                          getattr(self._stream, "current_message_snapshot", None))
+            _current.reset(self._token)
+            self._span.end(error=exc_info[1])
+
+
+class TracedMessages:
+    def __init__(self, client):
+        self._client = client
+
+    @property
+    def _messages(self):
+        return self._client.messages
+
+    def create(self, **request):
+        with span("anthropic.messages.create", kind="anthropic", model=request.get("model"),
+                  priority=request.get("priority"), cache_hit=False) as active:
+            response = self._messages.create(**request)
+            _record_usage(active, request.get("model"), response)
+            return response
+
+    def stream(self, **request):
+        return TracedStream(self._messages, request)
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class TracedClient:
+    """Outermost client wrapper: one span per messages.create / messages.stream."""
+
+    def __init__(self, client):
+        self._client = client
+        self.messages = TracedMessages(client)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,102 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from llmkit.batches import BatchRun
+
+
+class FakeBatches:
+    """messages.batches stand-in: batches end after `polls` retrieves; `fail_on` makes that create call raise."""
+
+    def __init__(self, polls=1, fail_on=None):
+        self.polls = polls
+        self.fail_on = fail_on
+        self.created = {}  # id -> requests
+        self.retrieved = {}
+        self.create_calls = 0
+
+    def create(self, requests):
+        self.create_calls += 1
+        if self.create_calls == self.fail_on:
+            raise RuntimeError("crashed while submitting")
+        batch_id = f"msgbatch_{len(self.created)}"
+        self.created[batch_id] = list(requests)
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def retrieve(self, message_batch_id):
+        self.retrieved[message_batch_id] = self.retrieved.get(message_batch_id, 0) + 1
+        ended = self.retrieved[message_batch_id] >= self.polls
+        counts = SimpleNamespace(succeeded=0, errored=0, processing=0)
+        return SimpleNamespace(processing_status="ended" if ended else "in_progress", request_counts=counts)
+
+    def results(self, message_batch_id):
+        for request in self.created[message_batch_id]:
+            usage = SimpleNamespace(input_tokens=10, output_tokens=5)
+            message = SimpleNamespace(model="claude-3-haiku-20240307", usage=usage)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=SimpleNamespace(type="succeeded", message=message))
+
+
+def client_for(batches):
+    return SimpleNamespace(messages=SimpleNamespace(batches=batches))
+
+
+def requests(count):
+    return [{"custom_id": f"row-{index}", "params": {"model": "m"}} for index in range(count)]
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "scores.jsonl.batch.json")
+
+
+def test_submits_in_chunks_and_records_them(state_path):
+    batches = FakeBatches()
+    run = BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0)
+    run.submit(requests(10))
+    assert [len(chunk) for chunk in batches.created.values()] == [4, 4, 2]
+    with open(state_path) as f:
+        state = json.load(f)
+    assert state["submitted"] == 10 and state["submit_complete"]
+    assert [entry["id"] for entry in state["batches"]] == list(batches.created)
+
+
+def test_a_crashed_submit_resumes_after_the_saved_chunks(state_path):
+    batches = FakeBatches(fail_on=3)
+    with pytest.raises(RuntimeError):
+        BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0).submit(requests(10))
+
+    run = BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0)
+    assert run.resumed
+    run.submit(requests(10))
+    submitted = [request["custom_id"] for chunk in batches.created.values() for request in chunk]
+    assert submitted == [f"row-{index}" for index in range(10)]  # Nothing sent twice
+
+
+def test_a_finished_submit_is_not_repeated(state_path):
+    batches = FakeBatches()
+    BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0).submit(requests(6))
+    BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0).submit(requests(6))
+    assert batches.create_calls == 2
+
+
+def test_wait_polls_until_every_batch_has_ended_and_resumes_polling(state_path):
+    batches = FakeBatches(polls=3)
+    run = BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0)
+    run.submit(requests(6))
+    run.wait()
+    assert batches.retrieved == {"msgbatch_0": 3, "msgbatch_1": 3}
+
+    # A rerun finds every batch ended in the state file and polls nothing
+    BatchRun(client_for(batches), state_path, poll_interval=0).wait()
+    assert batches.retrieved == {"msgbatch_0": 3, "msgbatch_1": 3}
+
+
+def test_results_cover_every_request_and_cleanup_removes_the_state(state_path, tmp_path):
+    batches = FakeBatches()
+    run = BatchRun(client_for(batches), state_path, max_requests=4, poll_interval=0)
+    run.submit(requests(6))
+    run.wait()
+    assert [custom_id for custom_id, _ in run.results()] == [f"row-{index}" for index in range(6)]
+    run.cleanup()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from llmkit.cache import CachedMessages, ResponseCache, request_key
+
+REQUEST = {"model": "claude-3-haiku-20240307", "max_tokens": 10, "temperature": 0.0,
+           "messages": [{"role": "user", "content": "hi"}]}
+
+
+class FakeMessages:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        from anthropic.types import Message
+        return Message.model_validate({
+            "id": f"msg_{self.calls}", "type": "message", "role": "assistant", "model": request["model"],
+            "content": [{"type": "text", "text": f"reply {self.calls}"}],
+            "stop_reason": "end_turn", "stop_sequence": None, "usage": {"input_tokens": 3, "output_tokens": 2},
+        })
+
+
+class FakeClient:
+    def __init__(self):
+        self.messages = FakeMessages()
+
+
+def test_key_ignores_routing_options_and_dict_order():
+    reordered = dict(reversed(list(REQUEST.items())))
+    assert request_key(REQUEST) == request_key(reordered)
+    assert request_key(REQUEST) == request_key(dict(REQUEST, priority="explore"))
+    assert request_key(REQUEST) != request_key(dict(REQUEST, temperature=0.1))
+
+
+def test_file_is_created_on_first_use_only(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = ResponseCache(path=str(path))
+    assert not path.exists()
+    assert len(cache) == 0
+    assert not path.exists()
+    assert cache.get("missing") is None
+    assert path.exists()
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    cache.put("k", REQUEST, {"text": "stored"})
+    assert cache.get("k") == {"text": "stored"}
+    assert cache.get("other") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), ttl=0.05)
+    cache.put("k", REQUEST, {"text": "stored"})
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+
+def test_inserts_past_the_cap_drop_least_recently_used(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_entries=10)
+    for index in range(10):
+        cache.put(f"k{index}", REQUEST, {"n": index})
+    cache.get("k0")  # Most recently used now
+    cache.put("k10", REQUEST, {"n": 10})  # Over the cap: trims to 9 rows
+    assert len(cache) == 9
+    assert cache.get("k0") == {"n": 0}
+    assert cache.get("k10") == {"n": 10}
+    assert cache.get("k1") is None
+
+
+def test_cached_messages_serve_low_temperature_calls_from_disk(tmp_path):
+    pytest.importorskip("anthropic")
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    client = FakeClient()
+    messages = CachedMessages(client, cache)
+    first = messages.create(**REQUEST)
+    second = messages.create(**dict(REQUEST, priority="final"))
+    assert client.messages.calls == 1
+    assert second.content[0].text == first.content[0].text
+
+    messages.create(**dict(REQUEST, temperature=0.7))
+    messages.create(**dict(REQUEST, temperature=0.7))
+    assert client.messages.calls == 3
+    assert cache.stats()["bypassed"] == 2
+
+
+def test_forget_drops_the_stored_response(tmp_path):
+    pytest.importorskip("anthropic")
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    client = FakeClient()
+    messages = CachedMessages(client, cache)
+    messages.create(**REQUEST)
+    messages.forget(**REQUEST)
+    messages.create(**REQUEST)
+    assert client.messages.calls == 2
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from llmkit.checkpoint import CheckpointStore, step_key
+
+
+def counting(results):
+    """A step function that returns the next of `results` and counts its calls."""
+    calls = []
+
+    def fn(*args, **kwargs):
+        calls.append((args, kwargs))
+        return results[len(calls) - 1]
+    return fn, calls
+
+
+def test_step_key_depends_on_kind_and_arguments():
+    assert step_key("generate", ["a"], {}) == step_key("generate", ["a"], {})
+    assert step_key("generate", ["a"], {}) != step_key("judge", ["a"], {})
+    assert step_key("generate", ["a"], {}) != step_key("generate", ["b"], {})
+    assert step_key("generate", ["a"], {"priority": "final"}) != step_key("generate", ["a"], {})
+
+
+def test_repeated_calls_are_separate_occurrences(tmp_path):
+    store = CheckpointStore()
+    store.open(params={'prompt': "p"}, directory=str(tmp_path))
+    fn, calls = counting(["first", "second"])
+    assert store.call("generate", fn, "p") == "first"
+    assert store.call("generate", fn, "p") == "second"
+    store.close()
+    assert len(calls) == 2
+    steps = [json.loads(line) for line in open(store.path)][1:]
+    assert [step['occurrence'] for step in steps] == [0, 1]
+
+
+def test_resume_replays_recorded_steps_in_order_then_goes_live(tmp_path):
+    store = CheckpointStore()
+    store.open(params={'prompt': "p"}, directory=str(tmp_path))
+    fn, _ = counting(["first", "second"])
+    store.call("generate", fn, "p")
+    store.call("generate", fn, "p")
+    store.close()
+
+    resumed = CheckpointStore()
+    assert resumed.open(resume=store.run_id, directory=str(tmp_path)) == {'prompt': "p"}
+    fn, calls = counting(["third"])
+    assert resumed.call("generate", fn, "p") == "first"
+    assert resumed.call("generate", fn, "p") == "second"
+    assert resumed.call("generate", fn, "p") == "third"  # No record: a live call
+    assert len(calls) == 1
+    assert (resumed.replayed, resumed.recorded) == (2, 1)
+    resumed.close()
+
+
+def test_steps_with_different_arguments_match_independently(tmp_path):
+    store = CheckpointStore()
+    store.open(directory=str(tmp_path))
+    store.call("judge", lambda output: f"score {output}", "a")
+    store.call("judge", lambda output: f"score {output}", "b")
+    store.close()
+
+    resumed = CheckpointStore()
+    resumed.open(resume=store.run_id, directory=str(tmp_path))
+    fn, calls = counting([])
+    assert resumed.call("judge", fn, "b") == "score b"  # Out of the original order
+    assert resumed.call("judge", fn, "a") == "score a"
+    assert calls == []
+    resumed.close()
+
+
+def test_tuples_replay_as_lists_and_a_torn_last_line_is_ignored(tmp_path):
+    store = CheckpointStore()
+    store.open(directory=str(tmp_path))
+    assert store.call("judge", lambda text: (7.5, "fine"), "x") == [7.5, "fine"]
+    store.close()
+    with open(store.path, "a") as f:
+        f.write('{"type": "step", "key": "abc", "occ')  # Crash mid-write
+
+    resumed = CheckpointStore()
+    resumed.open(resume=store.run_id, directory=str(tmp_path))
+    score, feedback = resumed.call("judge", lambda text: pytest.fail("should replay"), "x")
+    assert (score, feedback) == (7.5, "fine")
+    resumed.close()
+
+
+def test_unknown_run_id_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CheckpointStore().open(resume="no-such-run", directory=str(tmp_path))
+
+
+def test_closed_store_just_calls_through():
+    fn, calls = counting(["live"])
+    assert CheckpointStore().call("generate", fn, "p") == "live"
+    assert len(calls) == 1
@@ -0,0 +1,84 @@
+import numpy as np
+
+from llmkit.dedup import SimilarityIndex, dump_vector, load_vector
+from llmkit.similarity import HashingEmbedder
+
+PROMPT = "Generate an engaging 50-word description for a wireless earbuds product."
+
+
+def open_index(tmp_path, threshold=0.9):
+    index = SimilarityIndex()
+    index.open(path=str(tmp_path / "dedup.jsonl"), threshold=threshold, embedder=HashingEmbedder())
+    return index
+
+
+def recorder():
+    calls = []
+
+    def generate(prompt, priority="explore", model="haiku"):
+        calls.append(prompt)
+        return f"output {len(calls)}"
+    return generate, calls
+
+
+def test_near_duplicate_text_reuses_the_stored_result(tmp_path):
+    index = open_index(tmp_path)
+    generate, calls = recorder()
+    assert index.call("generate", generate, PROMPT) == "output 1"
+    assert index.call("generate", generate, PROMPT.replace("engaging", "engaging,")) == "output 1"
+    assert len(calls) == 1
+    assert index.reused["generate"] == 1
+    index.close()
+
+
+def test_dissimilar_text_is_a_miss(tmp_path):
+    index = open_index(tmp_path)
+    generate, calls = recorder()
+    index.call("generate", generate, PROMPT)
+    assert index.call("generate", generate, "Write a haiku about autumn leaves falling on a quiet lake.") == "output 2"
+    assert len(calls) == 2
+    index.close()
+
+
+def test_threshold_decides_hit_or_miss(tmp_path):
+    reworded = PROMPT.replace("wireless earbuds", "bluetooth headphones")
+    similarity = float(HashingEmbedder().embed([PROMPT])[0] @ HashingEmbedder().embed([reworded])[0])
+    for threshold, expected_calls in ((similarity - 0.01, 1), (similarity + 0.01, 2)):
+        directory = tmp_path / f"t{expected_calls}"
+        directory.mkdir()
+        index = open_index(directory, threshold=threshold)
+        generate, calls = recorder()
+        index.call("generate", generate, PROMPT)
+        index.call("generate", generate, reworded)
+        assert len(calls) == expected_calls
+        index.close()
+
+
+def test_other_arguments_must_match_but_priority_does_not_count(tmp_path):
+    index = open_index(tmp_path)
+    generate, calls = recorder()
+    index.call("generate", generate, PROMPT, priority="explore")
+    index.call("generate", generate, PROMPT, priority="final")  # Routing option: reused
+    assert len(calls) == 1
+    index.call("generate", generate, PROMPT, model="sonnet")  # Different request: live
+    index.call("judge", generate, PROMPT)  # Different kind: live
+    assert len(calls) == 3
+    index.close()
+
+
+def test_entries_carry_over_to_the_next_run(tmp_path):
+    index = open_index(tmp_path)
+    generate, _ = recorder()
+    index.call("generate", generate, PROMPT)
+    index.close()
+
+    reopened = open_index(tmp_path)
+    generate, calls = recorder()
+    assert reopened.call("generate", generate, PROMPT) == "output 1"
+    assert calls == []
+    reopened.close()
+
+
+def test_sparse_vector_round_trip():
+    vector = HashingEmbedder().embed([PROMPT])[0]
+    assert np.allclose(load_vector(dump_vector(vector)), vector, atol=1e-6)
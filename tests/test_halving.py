@@ -0,0 +1,44 @@
+from llmkit.halving import HalvingStats, successive_halving, survivors
+
+
+def test_survivors_keeps_at_least_one_and_at_most_budget():
+    assert survivors(6, 0.5) == 3
+    assert survivors(5, 0.5) == 3  # Rounded up
+    assert survivors(3, 0.1) == 1
+    assert survivors(6, 0.5, budget=2) == 2
+
+
+def test_each_stage_scores_only_the_survivors():
+    seen = {}
+
+    def stage(name, values):
+        def score(candidates):
+            seen[name] = list(candidates)
+            return [values[candidate] for candidate in candidates]
+        return score
+
+    stats = HalvingStats()
+    final, scores = successive_halving(
+        ["a", "b", "c", "d"],
+        [("rerank", stage("rerank", {"a": 0.1, "b": 0.9, "c": 0.5, "d": 0.7}), 0),
+         ("judge", stage("judge", {"b": 8, "d": 6}), 2)],
+        keep=0.5, stats=stats,
+    )
+    assert seen["judge"] == ["b", "d"]  # Top half of the rerank, in the original order
+    assert final == ["b", "d"]
+    assert scores["a"] == {"rerank": 0.1}
+    assert scores["b"] == {"rerank": 0.9, "judge": 8}
+    assert (stats.calls_made, stats.calls_saved) == (4, 4)
+
+
+def test_budget_caps_the_last_stage_only():
+    stats = HalvingStats()
+    final, _ = successive_halving(
+        range(8),
+        [("cheap", lambda candidates: [float(c) for c in candidates], 0),
+         ("middle", lambda candidates: [float(c) for c in candidates], 1),
+         ("expensive", lambda candidates: [0.0 for _ in candidates], 1)],
+        keep=0.5, budget=1, stats=stats,
+    )
+    assert final == [7]
+    assert stats.final == 1
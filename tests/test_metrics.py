@@ -0,0 +1,99 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from llmkit.metrics import MetricsEngine, bleu_from_stats, example_stats, score_chunk, tokenize_13a
+
+PREDICTION = "the cat sat on the mat"
+REFERENCE = "the cat sat on a mat"
+
+
+def random_pairs(count, seed=0):
+    rng = random.Random(seed)
+    words = "the a cat dog sat on mat quick brown fox jumps over lazy , .".split()
+    text = lambda: " ".join(rng.choices(words, k=rng.randint(3, 25)))
+    return [(text(), [text() for _ in range(rng.randint(1, 3))]) for _ in range(count)]
+
+
+def test_hand_computed_example():
+    scores = MetricsEngine().score([PREDICTION], [REFERENCE])
+    # Clipped n-gram precisions 5/6, 3/5, 2/4, 1/3; equal lengths, so no brevity penalty
+    assert scores['bleu'][0] == pytest.approx((5 / 6 * 3 / 5 * 2 / 4 * 1 / 3) ** 0.25)
+    assert scores['rouge1'][0] == pytest.approx(5 / 6)
+    assert scores['rouge2'][0] == pytest.approx(3 / 5)
+    assert scores['rougeL'][0] == pytest.approx(5 / 6)  # LCS "the cat sat on mat"
+
+
+def test_identical_and_disjoint_texts():
+    scores = MetricsEngine().score([REFERENCE, "completely different words here"], [REFERENCE, REFERENCE])
+    assert [scores[name][0] for name in ('bleu', 'rouge1', 'rouge2', 'rougeL')] == pytest.approx([1.0] * 4)
+    assert [scores[name][1] for name in ('bleu', 'rouge1', 'rouge2', 'rougeL')] == pytest.approx([0.0] * 4)
+
+
+def test_best_reference_wins_for_rouge():
+    scores = MetricsEngine().score([REFERENCE], [["nothing in common", REFERENCE]])
+    assert scores['rouge1'][0] == pytest.approx(1.0)
+
+
+def test_vectorized_chunk_matches_per_example_stats():
+    pairs = random_pairs(50)
+    chunk = score_chunk(pairs)
+    for row, (prediction, references) in zip(chunk, pairs):
+        assert row == pytest.approx(example_stats(prediction, references))
+
+
+def test_worker_processes_give_the_same_scores():
+    pairs = random_pairs(64, seed=1)
+    predictions, references = [p for p, _ in pairs], [r for _, r in pairs]
+    engine = MetricsEngine(workers=2)
+    try:
+        assert engine.score(predictions, references) == MetricsEngine().score(predictions, references)
+    finally:
+        engine.close()
+
+
+def test_corpus_bleu_pools_statistics():
+    pairs = random_pairs(20, seed=2)
+    engine = MetricsEngine()
+    engine.score([p for p, _ in pairs[:10]], [r for _, r in pairs[:10]])
+    engine.score([p for p, _ in pairs[10:]], [r for _, r in pairs[10:]])
+    pooled = score_chunk(pairs)[:, :10].sum(axis=0)
+    assert engine.corpus()['bleu'] == pytest.approx(float(bleu_from_stats(pooled)[0]))
+
+
+def test_matches_rouge_score_package():
+    rouge_scorer = pytest.importorskip("rouge_score.rouge_scorer")
+    scorer = rouge_scorer.RougeScorer(["rouge1", "rouge2", "rougeL"], use_stemmer=False)
+    pairs = [(p, refs[0]) for p, refs in random_pairs(40, seed=3)]
+    ours = MetricsEngine().score([p for p, _ in pairs], [r for _, r in pairs])
+    for i, (prediction, reference) in enumerate(pairs):
+        expected = scorer.score(reference, prediction)
+        for name in ("rouge1", "rouge2", "rougeL"):
+            assert ours[name][i] == pytest.approx(expected[name].fmeasure)
+
+
+def reference_corpus_bleu(references, predictions, max_order=4):
+    """Plain Counter version of compute_bleu (the nmt BLEU `evaluate` wraps), one reference per prediction."""
+    def ngrams(tokens, order):
+        return Counter(tuple(tokens[i:i + order]) for i in range(len(tokens) - order + 1))
+
+    matches, possible = [0] * max_order, [0] * max_order
+    for reference, prediction in zip(references, predictions):
+        for order in range(1, max_order + 1):
+            matches[order - 1] += sum((ngrams(prediction, order) & ngrams(reference, order)).values())
+            possible[order - 1] += max(len(prediction) - order + 1, 0)
+    if min(matches) == 0:
+        return 0.0
+    geo_mean = math.exp(sum(math.log(m / p) for m, p in zip(matches, possible)) / max_order)
+    ratio = sum(map(len, predictions)) / sum(map(len, references))
+    return geo_mean * (1.0 if ratio > 1.0 else math.exp(1 - 1 / ratio))
+
+
+def test_matches_reference_corpus_bleu():
+    pairs = [(p, refs[0]) for p, refs in random_pairs(40, seed=4)]
+    engine = MetricsEngine()
+    engine.score([p for p, _ in pairs], [r for _, r in pairs])
+    expected = reference_corpus_bleu([tokenize_13a(r) for _, r in pairs], [tokenize_13a(p) for p, _ in pairs])
+    assert engine.corpus()['bleu'] == pytest.approx(expected)
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from llmkit.pipeline import PipelineStats, Stage, run_pipeline
+
+
+def test_every_item_passes_every_stage():
+    stats = PipelineStats()
+    results = run_pipeline(range(10), [Stage("double", lambda x: x * 2, workers=3),
+                                       Stage("inc", lambda x: x + 1, workers=2)], stats=stats)
+    assert sorted(results) == [x * 2 + 1 for x in range(10)]
+    assert [stats.stages[name].items for name in ("double", "inc")] == [10, 10]
+
+
+def test_single_worker_stages_keep_input_order():
+    results = run_pipeline(range(20), [Stage("a", lambda x: x), Stage("b", lambda x: x)], stats=PipelineStats())
+    assert results == list(range(20))
+
+
+def test_next_item_starts_before_the_previous_one_finishes_downstream():
+    events = []
+    lock = threading.Lock()
+
+    def log(name, seconds):
+        def fn(x):
+            with lock:
+                events.append((name, "start", x))
+            time.sleep(seconds)
+            with lock:
+                events.append((name, "end", x))
+            return x
+        return fn
+
+    run_pipeline(range(3), [Stage("generate", log("generate", 0.02)), Stage("judge", log("judge", 0.05))],
+                 stats=PipelineStats())
+    assert events.index(("generate", "start", 1)) < events.index(("judge", "end", 0))
+
+
+def test_full_queue_blocks_the_producer():
+    stats = PipelineStats()
+    run_pipeline(range(8), [Stage("fast", lambda x: x, workers=2), Stage("slow", lambda x: time.sleep(0.02) or x)],
+                 maxsize=1, stats=stats)
+    slow = stats.stages["slow"]
+    assert slow.depth_max <= 1
+    assert slow.full > 0 and slow.blocked_seconds > 0
+
+
+def test_batch_stage_receives_waiting_items_together():
+    batches = []
+    run_pipeline(range(6), [Stage("slow", lambda x: time.sleep(0.01) or x, workers=3),
+                            Stage("batch", lambda items: batches.append(list(items)) or items, batch=6)],
+                 maxsize=6, stats=PipelineStats())
+    assert sorted(x for batch in batches for x in batch) == list(range(6))
+    assert all(len(batch) <= 6 for batch in batches)
+
+
+def test_stage_error_propagates():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("boom")
+        return x
+
+    with pytest.raises(ValueError, match="boom"):
+        run_pipeline(range(6), [Stage("a", fail_on_three, workers=2), Stage("b", lambda x: x)], stats=PipelineStats())
+
+
+def test_no_items():
+    assert run_pipeline([], [Stage("a", lambda x: x)], stats=PipelineStats()) == []
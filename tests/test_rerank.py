@@ -0,0 +1,81 @@
+import threading
+from types import SimpleNamespace
+
+from llmkit.rerank import CohereReranker, Reranker
+
+
+class FakeCohere:
+    """Scores a document by its trailing number and returns results best-first, like Cohere."""
+
+    def __init__(self):
+        self.requests = []
+
+    def rerank(self, model, query, documents, top_n):
+        self.requests.append(list(documents))
+        results = [SimpleNamespace(index=index, relevance_score=float(document.split()[-1]))
+                   for index, document in enumerate(documents)]
+        results.sort(key=lambda result: result.relevance_score, reverse=True)
+        return SimpleNamespace(results=results[:top_n], meta=None)
+
+
+def documents(count):
+    return [f"doc {number}" for number in range(count)]
+
+
+def test_splits_at_the_per_request_document_limit():
+    client = FakeCohere()
+    reranker = CohereReranker(lambda: client)
+    ranked = reranker.rerank("query", documents(2500))
+    assert [len(request) for request in client.requests] == [1000, 1000, 500]
+    assert ranked[0] == (2499, 2499.0)  # Chunk-relative indices mapped back
+    assert ranked[-1] == (0, 0.0)
+    assert reranker.requests == 3
+
+
+def test_only_new_documents_are_sent_again():
+    client = FakeCohere()
+    reranker = CohereReranker(lambda: client)
+    reranker.rerank("query", documents(3))
+    ranked = reranker.rerank("query", documents(5))
+    assert client.requests[-1] == ["doc 3", "doc 4"]
+    assert [index for index, _ in ranked] == [4, 3, 2, 1, 0]
+    assert (reranker.documents_scored, reranker.cache_hits) == (5, 3)
+
+    reranker.rerank("query", documents(5))
+    assert len(client.requests) == 2
+    reranker.rerank("another query", documents(1))
+    assert len(client.requests) == 3  # Scores are cached per query
+
+
+def test_duplicate_documents_are_scored_once():
+    client = FakeCohere()
+    reranker = CohereReranker(lambda: client)
+    ranked = reranker.rerank("query", ["doc 1", "doc 1", "doc 2"])
+    assert client.requests == [["doc 1", "doc 2"]]
+    assert sorted(ranked) == [(0, 1.0), (1, 1.0), (2, 2.0)]
+
+
+def test_backend_calls_run_concurrently():
+    both_scoring = threading.Barrier(2, timeout=5)
+
+    class Waiting(Reranker):
+        def _score(self, query, documents):
+            both_scoring.wait()  # Breaks (and raises) if the second call cannot get in
+            return [1.0] * len(documents)
+
+    reranker = Waiting()
+    errors = []
+
+    def rerank(query):
+        try:
+            reranker.rerank(query, ["a document"])
+        except threading.BrokenBarrierError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=rerank, args=(query,)) for query in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert reranker.documents_scored == 2
@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from llmkit import scheduler
+from llmkit.scheduler import RateLimiter, TokenBucket
+
+
+def full_bucket(per_minute=60):
+    """A full bucket and the time it was last refilled (1 token per second at 60/minute)."""
+    bucket = TokenBucket(per_minute)
+    return bucket, bucket._updated
+
+
+def test_refills_at_the_per_minute_rate():
+    bucket, start = full_bucket()
+    bucket.take(60, start)
+    assert bucket.wait_time(10, start) == pytest.approx(10.0)
+    assert bucket.wait_time(10, start + 4) == pytest.approx(6.0)
+    assert bucket.wait_time(10, start + 10) == 0.0
+
+
+def test_refill_stops_at_capacity():
+    bucket, start = full_bucket()
+    bucket.take(30, start)
+    bucket.wait_time(0, start + 3600)
+    assert bucket.tokens == pytest.approx(60.0)
+
+
+def test_debt_delays_later_callers():
+    bucket, start = full_bucket()
+    bucket.take(90, start)  # Overrun: tokens go negative
+    assert bucket.wait_time(1, start) == pytest.approx(31.0)
+
+
+def test_oversized_request_only_needs_a_full_bucket():
+    bucket, start = full_bucket()
+    assert bucket.wait_time(500, start) == 0.0
+    bucket.take(30, start)
+    assert bucket.wait_time(500, start) == pytest.approx(30.0)
+
+
+def test_give_back_returns_unused_tokens_up_to_capacity():
+    bucket, start = full_bucket()
+    bucket.take(40, start)
+    bucket.give_back(25, start)
+    assert bucket.tokens == pytest.approx(45.0)
+    bucket.give_back(100, start)
+    assert bucket.tokens == pytest.approx(60.0)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+def flaky(*errors):
+    """A `send` that raises `errors` in turn, then returns the request it was given."""
+    errors = list(errors)
+    calls = []
+
+    def send(**request):
+        calls.append(request)
+        if errors:
+            raise errors.pop(0)
+        return request
+    return send, calls
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry sleeps instead of sleeping, with jitter pinned to its upper bound."""
+    slept = []
+    monkeypatch.setattr(scheduler.time, "sleep", slept.append)
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: high)
+    return slept
+
+
+def test_waiting_requests_go_in_priority_order():
+    limiter = RateLimiter("test")
+    limiter.pause(0.3)  # Hold the queue until every caller is waiting
+    order = []
+    threads = []
+    for priority in ("explore", "judge", "final"):
+        thread = threading.Thread(target=lambda p=priority: order.append(limiter.acquire(priority=p) and p))
+        thread.start()
+        threads.append(thread)
+        while len(limiter._waiters) < len(threads):
+            time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+    assert order == ["final", "judge", "explore"]
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter("test").acquire(priority="urgent")
+
+
+def test_retries_retryable_errors_with_exponential_backoff(sleeps):
+    limiter = RateLimiter("test")
+    send, calls = flaky(StatusError(529), StatusError(429), StatusError(500))
+    response, _ = limiter.call(send, {"model": "m"}, 10, 10, "judge")
+    assert response == {"model": "m"}
+    assert len(calls) == 4
+    assert sleeps == [1.0, 2.0, 4.0]
+    assert limiter.stats()["retries"] == 3
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_retry_after_overrides_backoff_and_pauses_every_caller(sleeps):
+    limiter = RateLimiter("test")
+    send, _ = flaky(StatusError(429, headers={"Retry-After-Ms": "50"}))
+    start = time.monotonic()
+    limiter.call(send, {}, 10, 10, "judge")
+    assert sleeps == [pytest.approx(0.05 + scheduler.BASE_DELAY)]
+    assert time.monotonic() - start >= 0.05  # The retry's own acquire waited out the pause
+    assert limiter._paused_until >= start + 0.05
+
+
+def test_non_retryable_errors_are_raised_at_once(sleeps):
+    send, calls = flaky(StatusError(400))
+    with pytest.raises(StatusError):
+        RateLimiter("test").call(send, {}, 10, 10, "judge")
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_gives_up_after_max_retries(sleeps):
+    send, calls = flaky(*[StatusError(503)] * 5)
+    with pytest.raises(StatusError):
+        RateLimiter("test", max_retries=2).call(send, {}, 10, 10, "judge")
+    assert len(calls) == 3
+
+
+def test_failed_sends_return_their_reserved_output_tokens(sleeps):
+    limiter = RateLimiter("test", output_tokens_per_minute=1000)
+    send, _ = flaky(StatusError(529))
+    limiter.call(send, {}, 10, 400, "judge")
+    assert limiter._buckets["output"].tokens == pytest.approx(600, abs=1)  # Only the successful send is charged
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from llmkit.similarity import EmbeddingScorer, HashingEmbedder, score_async
+from llmkit.telemetry import span, tracer
+
+
+class BlockingScorer:
+    """A synchronous scorer that only finishes once the caller says so."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.thread = None
+
+    def score(self, candidates, references):
+        self.thread = threading.current_thread()
+        assert self.release.wait(5), "score ran on the caller's thread"
+        return {'precision': [1.0] * len(candidates), 'recall': [1.0] * len(candidates), 'f1': [1.0] * len(candidates)}
+
+
+def test_sync_scorers_run_in_the_background():
+    scorer = BlockingScorer()
+    future = score_async(scorer, ["a", "b"], "reference")  # Would deadlock if scored on the spot
+    assert not future.done()
+    scorer.release.set()  # "The judge call finished"
+    assert future.result(timeout=5)['f1'] == [1.0, 1.0]
+    assert scorer.thread is not threading.current_thread()
+
+
+def test_errors_surface_on_result():
+    class Failing:
+        def score(self, candidates, references):
+            raise RuntimeError("model failed to load")
+
+    with pytest.raises(RuntimeError, match="model failed to load"):
+        score_async(Failing(), ["a"], "reference").result(timeout=5)
+
+
+def test_background_spans_nest_under_the_caller():
+    scorer = EmbeddingScorer(HashingEmbedder())
+    with span("caller") as caller:
+        scores = score_async(scorer, ["wireless earbuds", "a cast iron skillet"], "wireless earbuds").result(timeout=5)
+    assert scores['f1'][0] == pytest.approx(1.0)
+    assert scores['f1'][1] < 0.5
+    scored = [finished for finished in tracer.spans if finished.name == "similarity.score"][-1]
+    assert scored.parent_id == caller.span_id
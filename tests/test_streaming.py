@@ -0,0 +1,75 @@
+import random
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from llmkit.streaming import StreamStats, stream_text, trim_to_budget
+
+
+class FakeStreamClient:
+    """`messages.stream` yielding fixed chunks; records how many were consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+        self.messages = SimpleNamespace(stream=self._stream)
+
+    def _generate(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+    @contextmanager
+    def _stream(self, **request):
+        try:
+            yield SimpleNamespace(text_stream=self._generate())
+        finally:
+            self.closed = True
+
+
+def chunked(text, seed):
+    """Split `text` at random points, so chunks start and end mid-word."""
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(text)), 40))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+def run(chunks, word_budget):
+    client = FakeStreamClient(chunks)
+    return client, stream_text(client, word_budget=word_budget, stats=StreamStats(), model="m", messages=[])
+
+
+def test_without_a_budget_the_whole_stream_is_read():
+    text = " ".join(f"word{index}" for index in range(100))
+    client, result = run(chunked(text, seed=1), word_budget=None)
+    assert result['text'] == text
+    assert not result['truncated']
+    assert client.consumed == len(client.chunks)
+
+
+def test_stops_on_the_chunk_that_passes_the_budget():
+    text = " ".join(f"word{index}" for index in range(100))
+    for seed in range(20):
+        chunks = chunked(text, seed)
+        client, result = run(chunks, word_budget=30)
+        assert result['truncated']
+        assert client.closed
+        # The first prefix of chunks holding more than 30 words is exactly what was read
+        read = "".join(chunks[:client.consumed])
+        assert len(read.split()) > 30
+        assert len("".join(chunks[:client.consumed - 1]).split()) <= 30
+        assert result['text'] == " ".join(text.split()[:30])
+
+
+def test_words_split_across_chunks_count_once():
+    client, result = run(["one tw", "o thr", "ee", "  four ", "five"], word_budget=4)
+    assert result['truncated']
+    assert client.consumed == 5  # "five" is the fifth word
+    assert result['text'] == "one two three four"
+
+
+def test_trim_prefers_the_last_full_sentence():
+    text = "The earbuds last all day. Pair them in seconds and enjoy rich bass anywhere"
+    assert trim_to_budget(text, 12) == "The earbuds last all day. Pair them in seconds and enjoy rich"
+    assert trim_to_budget(text, 8) == "The earbuds last all day."
+    assert trim_to_budget(text, 50) == text
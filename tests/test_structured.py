@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llmkit.structured import JudgeParseError, ParseStats, criteria_schema, structured_call, validate
+
+SCHEMA = criteria_schema(["relevance", "fluency"])
+
+
+def tool_response(tool_input, name="submit_scores", stop_reason="tool_use"):
+    block = SimpleNamespace(type="tool_use", name=name, input=tool_input)
+    return SimpleNamespace(content=[block], stop_reason=stop_reason)
+
+
+class ScriptedMessages:
+    """Returns the scripted responses in turn; records requests and forgotten requests."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.forgotten = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+    def forget(self, **request):
+        self.forgotten.append(request)
+
+
+def call(messages, stats, max_retries=2):
+    return structured_call(SimpleNamespace(messages=messages), tool_name="submit_scores", description="Record.",
+                           schema=SCHEMA, max_retries=max_retries, stats=stats, model="m", messages=[])
+
+
+GOOD = {"reasoning": "fine", "relevance": 8, "fluency": 7.5}
+
+
+@pytest.mark.parametrize("value, error", [
+    ({"reasoning": "x", "relevance": 8}, "missing required field 'fluency'"),
+    ({"reasoning": "x", "relevance": 11, "fluency": 5}, "maximum"),
+    ({"reasoning": "x", "relevance": 0, "fluency": 5}, "minimum"),
+    ({"reasoning": "x", "relevance": "8", "fluency": 5}, "expected number"),
+    ({"reasoning": "x", "relevance": True, "fluency": 5}, "expected number"),
+    ({"reasoning": 3, "relevance": 8, "fluency": 5}, "expected string"),
+    (["not", "an", "object"], "expected object"),
+])
+def test_validate_rejects(value, error):
+    with pytest.raises(JudgeParseError, match=error):
+        validate(value, SCHEMA)
+
+
+def test_validate_nested_arrays_integers_and_enums():
+    schema = {"type": "object", "required": ["tags"], "properties": {
+        "tags": {"type": "array", "items": {"type": "string", "enum": ["a", "b"]}},
+        "count": {"type": "integer"},
+    }}
+    validate({"tags": ["a", "b"], "count": 2.0}, schema)
+    with pytest.raises(JudgeParseError, match=r"\$\.tags\[1\]"):
+        validate({"tags": ["a", "c"]}, schema)
+    with pytest.raises(JudgeParseError, match="expected integer"):
+        validate({"tags": [], "count": 2.5}, schema)
+
+
+def test_forces_the_tool_and_returns_its_input():
+    messages = ScriptedMessages(tool_response(GOOD))
+    stats = ParseStats()
+    assert call(messages, stats) == GOOD
+    request = messages.requests[0]
+    assert request["tool_choice"] == {"type": "tool", "name": "submit_scores"}
+    assert request["tools"][0]["input_schema"] == SCHEMA
+    assert (stats.calls, stats.requests, stats.parse_failures) == (1, 1, 0)
+
+
+def test_retries_only_on_parse_failures_and_forgets_the_bad_response():
+    messages = ScriptedMessages(
+        tool_response({"reasoning": "x", "relevance": 12, "fluency": 5}),  # Out of range
+        tool_response(GOOD, stop_reason="max_tokens"),  # Cut off
+        tool_response(GOOD),
+    )
+    stats = ParseStats()
+    assert call(messages, stats) == GOOD
+    assert len(messages.requests) == 3
+    assert len(messages.forgotten) == 2
+    assert (stats.calls, stats.requests, stats.parse_failures, stats.exhausted) == (1, 3, 2, 0)
+
+
+def test_gives_up_after_max_retries():
+    messages = ScriptedMessages(*[tool_response(GOOD, name="other_tool")] * 3)
+    stats = ParseStats()
+    with pytest.raises(JudgeParseError, match="no valid output after 2 attempts"):
+        call(messages, stats, max_retries=1)
+    assert len(messages.requests) == 2
+    assert (stats.calls, stats.exhausted) == (1, 1)
+    assert "1 gave up after retries" in stats.report()
+
+
+def test_api_errors_are_not_retried():
+    class Failing(ScriptedMessages):
+        def create(self, **request):
+            self.requests.append(request)
+            raise ConnectionError("down")
+
+    messages = Failing()
+    with pytest.raises(ConnectionError):
+        call(messages, ParseStats())
+    assert len(messages.requests) == 1